@@ -0,0 +1,47 @@
+import hashlib
+from typing import Any, Dict
+
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.status import HTTP_304_NOT_MODIFIED
+
+# responses need authentication, so only the client may cache them
+BOOK_CACHE_CONTROL = "private, max-age=60"
+LIBRARY_CACHE_CONTROL = "private, max-age=300"
+RACK_LIST_CACHE_CONTROL = "private, max-age=300"
+
+# tables that populate a resource besides its own row, see TableVersionsRepository
+BOOK_POPULATION_TABLES = ("books_to_authors",)
+LIBRARY_POPULATION_TABLES = ("addresses", "libraries_to_addresses")
+RACK_LIST_TABLES = ("racks",)
+
+# tables behind the shared book listings, see app.api.response_cache
+BOOK_LIST_TABLES = ("books", "books_to_authors", "book_items")
+
+
+def make_etag(*parts: Any) -> str:
+    digest = hashlib.sha1(":".join(str(part) for part in parts).encode()).hexdigest()
+    # weak, the same representation may serialize to different bytes across releases
+    return f'W/"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison
+    opaque_tag = etag[2:] if etag.startswith("W/") else etag
+    return any(
+        (tag[2:] if tag.startswith("W/") else tag) == opaque_tag
+        for tag in (tag.strip() for tag in if_none_match.split(","))
+    )
+
+
+def cache_headers(*, etag: str, cache_control: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": cache_control}
+
+
+def not_modified_response(*, etag: str, cache_control: str) -> Response:
+    return Response(status_code=HTTP_304_NOT_MODIFIED, headers=cache_headers(etag=etag, cache_control=cache_control))
@@ -0,0 +1,128 @@
+from collections import defaultdict
+from typing import AbstractSet, Callable, Dict, Iterable, List, Optional
+
+from databases import Database
+from fastapi import Depends, HTTPException, Query, status
+from pydantic import BaseModel
+
+from app.api.dependencies.database import get_database
+from app.api.responses import ORJSONResponse
+from app.db.repositories.book_items import BookItemsRepository
+from app.db.repositories.books import BooksRepository
+from app.db.repositories.libraries import LibrariesRepository
+from app.db.repositories.users import UsersRepository
+from app.models.user import UserPublic
+
+# expandable relation and the foreign key it is resolved from
+RELATION_KEYS = {
+    "book_item": "book_item_id",
+    "book": "book_id",
+    "library": "library_id",
+    "user": "user_id",
+}
+
+
+def get_expand_from_query(*relations: str) -> Callable:
+    """
+    Parse a comma separated `expand` parameter into the set of `relations` to embed in the response.
+    """
+
+    def get_expand(
+        expand: Optional[str] = Query(None, max_length=100, description="Comma separated relations to embed"),
+    ) -> AbstractSet[str]:
+        if expand is None:
+            return frozenset()
+        requested_relations = {relation.strip() for relation in expand.split(",") if relation.strip()}
+        unknown_relations = requested_relations - set(relations)
+        if unknown_relations:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown relations: {', '.join(sorted(unknown_relations))}.",
+            )
+        return frozenset(requested_relations)
+
+    return get_expand
+
+
+class RelationLoader:
+    """
+    Per request batch loader, every relation is fetched with one query for all the ids of a page.
+    """
+
+    def __init__(self, db: Database) -> None:
+        self.book_items_repo = BookItemsRepository(db)
+        self.books_repo = BooksRepository(db)
+        self.libraries_repo = LibrariesRepository(db)
+        self.users_repo = UsersRepository(db)
+        self.loaded: Dict[str, Dict[int, Dict]] = defaultdict(dict)
+
+    async def load(self, relation: str, ids: Iterable[Optional[int]]) -> Dict[int, Dict]:
+        loaded = self.loaded[relation]
+        missing_ids = [id_ for id_ in dict.fromkeys(ids) if id_ is not None and id_ not in loaded]
+        if missing_ids:
+            for obj in await self.fetch(relation, missing_ids):
+                loaded[obj["id"]] = obj
+        return loaded
+
+    async def fetch(self, relation: str, ids: List[int]) -> List[Dict]:
+        if relation == "book_item":
+            return [
+                book_item.dict() for book_item in (await self.book_items_repo.get_book_items_by_ids(ids=ids)).book_items
+            ]
+        if relation == "book":
+            return [book.dict() for book in (await self.books_repo.get_books_by_ids(ids=ids)).books]
+        if relation == "library":
+            return [library.dict() for library in await self.libraries_repo.get_libraries_by_ids(ids=ids)]
+        if relation == "user":
+            return [UserPublic(**user.dict()).dict() for user in await self.users_repo.get_users_by_ids(ids=ids)]
+        raise ValueError(f"Unknown relation: {relation}")
+
+    async def expand(self, rows: List[Dict], expand: AbstractSet[str]) -> None:
+        """
+        Embed the `expand` relations of every row under the relation name, None when the foreign key is not set.
+        """
+        if not expand or not rows:
+            return
+        keys = [{key: row.get(key) for key in RELATION_KEYS.values()} for row in rows]
+
+        # lendings only know their book item, the book and library are reached through it
+        through_book_item = [
+            relation
+            for relation in ("book", "library")
+            if relation in expand and RELATION_KEYS[relation] not in rows[0]
+        ]
+        if "book_item" in expand or through_book_item:
+            book_items = await self.load("book_item", (row_keys["book_item_id"] for row_keys in keys))
+            for row, row_keys in zip(rows, keys):
+                book_item = book_items.get(row_keys["book_item_id"])
+                if "book_item" in expand:
+                    row["book_item"] = book_item
+                for relation in through_book_item:
+                    row_keys[RELATION_KEYS[relation]] = book_item[RELATION_KEYS[relation]] if book_item else None
+
+        for relation in ("book", "library", "user"):
+            if relation not in expand:
+                continue
+            key = RELATION_KEYS[relation]
+            loaded = await self.load(relation, (row_keys[key] for row_keys in keys))
+            for row, row_keys in zip(rows, keys):
+                row[relation] = loaded.get(row_keys[key])
+
+
+def get_relation_loader(db: Database = Depends(get_database)) -> RelationLoader:
+    return RelationLoader(db)
+
+
+async def expanded_model_response(
+    model: BaseModel,
+    *,
+    expand: AbstractSet[str],
+    relation_loader: RelationLoader,
+    list_field: Optional[str] = None,
+) -> ORJSONResponse:
+    """
+    Response of `model` with the `expand` relations embedded in it, or in every item of its `list_field`.
+    """
+    content = model.dict()
+    await relation_loader.expand(content[list_field] if list_field is not None else [content], expand)
+    return ORJSONResponse(content=content)
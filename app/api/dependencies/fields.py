@@ -0,0 +1,42 @@
+from typing import AbstractSet, Callable, Dict, Optional, Type, Union
+
+from fastapi import HTTPException, Query, status
+from pydantic import BaseModel
+
+
+def get_fields_from_query(model: Type[BaseModel]) -> Callable:
+    """
+    Parse a comma separated `fields` parameter into the set of `model` fields to return, None meaning all of them.
+    """
+
+    def get_fields(
+        fields: Optional[str] = Query(None, max_length=200, description="Comma separated fields to return"),
+    ) -> Optional[AbstractSet[str]]:
+        if fields is None:
+            return None
+        requested_fields = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown_fields = requested_fields - set(model.__fields__)
+        if unknown_fields:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown fields: {', '.join(sorted(unknown_fields))}.",
+            )
+        # clients need the id to follow up on anything they got
+        return frozenset(requested_fields | {"id"})
+
+    return get_fields
+
+
+def fields_include(
+    fields: Optional[AbstractSet[str]], *, list_field: Optional[str] = None
+) -> Optional[Union[AbstractSet[str], Dict]]:
+    """
+    `include` argument of BaseModel.dict for a model, or for every item of a `ListOf...` model's `list_field`.
+    """
+    if fields is None or list_field is None:
+        return fields
+    return {list_field: {"__all__": fields}, f"{list_field}_count": True}
+
+
+def fields_key(fields: Optional[AbstractSet[str]]) -> Optional[str]:
+    return ",".join(sorted(fields)) if fields is not None else None
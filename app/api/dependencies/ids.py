@@ -0,0 +1,44 @@
+from typing import List, Optional
+
+from fastapi import HTTPException, Query, status
+
+from app.core.config import MULTI_GET_LIMIT
+
+# ids are postgres integers, anything larger fails the CAST(:ids AS integer[]) of the queries
+MAX_ID = 2 ** 31 - 1
+
+
+def parse_ids(ids: str) -> List[int]:
+    try:
+        parsed_ids = [int(id_) for id_ in ids.split(",") if id_.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ids must be a comma separated list of integers.",
+        )
+    if not parsed_ids or any(not 1 <= id_ <= MAX_ID for id_ in parsed_ids):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=f"Ids must be integers between 1 and {MAX_ID}."
+        )
+    # duplicates are answered once, in the position they were first asked for
+    unique_ids = list(dict.fromkeys(parsed_ids))
+    if len(unique_ids) > MULTI_GET_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MULTI_GET_LIMIT} ids can be fetched at once.",
+        )
+    return unique_ids
+
+
+def get_ids_from_query(
+    ids: Optional[str] = Query(None, max_length=2000, description="Comma separated ids to fetch instead of a page"),
+) -> Optional[List[int]]:
+    if ids is None:
+        return None
+    return parse_ids(ids)
+
+
+def get_required_ids_from_query(
+    ids: str = Query(..., max_length=2000, description="Comma separated ids to fetch"),
+) -> List[int]:
+    return parse_ids(ids)
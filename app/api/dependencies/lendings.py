@@ -38,6 +38,8 @@ async def get_lending_filters_from_query(
     reservation_id: Optional[int] = Query(None, ge=1),
     due_by: Optional[date] = Query(None),
     returned: Optional[bool] = Query(None),
+    has_fee: Optional[bool] = Query(None),
+    order_by_fee: bool = Query(False),
     current_user: UserInDB = Depends(get_current_active_user),
 ) -> Dict:
     lending_filters = {}
@@ -48,7 +50,11 @@ async def get_lending_filters_from_query(
         lending_filters["reservation_id"] = reservation_id
     if due_by:
         lending_filters["due_by"] = due_by
-    if returned:
+    if returned is not None:
         lending_filters["returned"] = returned
+    if has_fee is not None:
+        lending_filters["has_fee"] = has_fee
+    if order_by_fee:
+        lending_filters["order_by_fee"] = order_by_fee
 
     return lending_filters
@@ -0,0 +1,67 @@
+import logging
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.timing import TIMED_METRICS, RequestTimings, request_timings
+
+logger = logging.getLogger(__name__)
+
+
+def server_timing(timings: RequestTimings, total: float) -> str:
+    metrics = [f"{metric};dur={timings.durations[metric] * 1000:.1f}" for metric in TIMED_METRICS]
+    metrics.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(metrics)
+
+
+class ServerTimingMiddleware:
+    """
+    Time every request and its parts, see app.core.timing, and report them in a Server-Timing header
+    and a log line.
+
+    The header is written when the response starts, so it leaves out time spent streaming the body,
+    which the log line includes.
+    """
+
+    def __init__(self, app: ASGIApp, header: bool = True) -> None:
+        self.app = app
+        self.header = header
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = request_timings.set(timings)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.header:
+                    headers = MutableHeaders(raw=message["headers"])
+                    headers.append("Server-Timing", server_timing(timings, time.perf_counter() - start))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_timings.reset(token)
+            log_timings(scope, status_code, timings, time.perf_counter() - start)
+
+
+def log_timings(scope: Scope, status_code: int, timings: RequestTimings, total: float) -> None:
+    fields = {
+        "method": scope["method"],
+        "path": scope["path"],
+        "status": status_code,
+        "total_ms": round(total * 1000, 1),
+        **{f"{metric}_ms": round(timings.durations[metric] * 1000, 1) for metric in TIMED_METRICS},
+        "db_queries": timings.counts["db"],
+    }
+    # key=value pairs for plain handlers, the same fields under `timing` for structured ones
+    logger.info(" ".join(f"{name}={value}" for name, value in fields.items()), extra={"timing": fields})
@@ -0,0 +1,94 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+from starlette.responses import Response
+
+from app.api.responses import ORJSONResponse
+from app.core.config import RESPONSE_CACHE_MAX_ENTRIES
+from app.core.metrics import count_cache_lookup
+
+
+class ResponseCacheBackend(ABC):
+    """
+    Storage for rendered response bodies. Keys already carry the table versions, so a backend
+    never has to find stale entries, only to drop whatever it cannot keep.
+    """
+
+    @abstractmethod
+    def get(self, key: Hashable) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    def set(self, key: Hashable, body: bytes) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+
+class LRUCacheBackend(ResponseCacheBackend):
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        body = self._entries.get(key)
+        if body is not None:
+            self._entries.move_to_end(key)
+        return body
+
+    def set(self, key: Hashable, body: bytes) -> None:
+        self._entries[key] = body
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class ResponseCache:
+    """
+    Process-wide cache of rendered responses shared by every user, for routes whose body depends only
+    on the query and on a few tables.
+
+    Each table has a local version counter, bumped when TABLE_VERSION_CHANNEL reports a write to it.
+    Keys include the counters read before querying, so an entry filled from data older than a
+    notification is stored under versions that are never asked for again.
+    """
+
+    def __init__(self, backend: ResponseCacheBackend) -> None:
+        self.backend = backend
+        self.generation = 0
+        self._versions: Dict[str, int] = {}
+
+    def make_key(self, route_name: str, tables: Iterable[str], params: Dict[str, Any]) -> Tuple:
+        versions = tuple((table, self._versions.get(table, 0)) for table in sorted(tables))
+        normalized_params = tuple(sorted((name, str(value)) for name, value in params.items() if value is not None))
+        return route_name, self.generation, versions, normalized_params
+
+    def get(self, key: Tuple) -> Optional[Response]:
+        body = self.backend.get(key)
+        count_cache_lookup("response", hit=body is not None)
+        if body is None:
+            return None
+        return Response(content=body, media_type=ORJSONResponse.media_type)
+
+    def store(self, key: Tuple, response: Response) -> Response:
+        self.backend.set(key, response.body)
+        return response
+
+    def invalidate_table(self, table_name: str) -> None:
+        self._versions[table_name] = self._versions.get(table_name, 0) + 1
+
+    def invalidate(self, *args) -> None:
+        self.generation += 1
+        self.backend.clear()
+
+
+response_cache = ResponseCache(LRUCacheBackend(RESPONSE_CACHE_MAX_ENTRIES))
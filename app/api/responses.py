@@ -0,0 +1,92 @@
+import csv
+import io
+from datetime import date
+from decimal import Decimal
+from typing import Any, AsyncIterator, Mapping, Sequence
+
+import orjson
+from pydantic import BaseModel
+from starlette.responses import JSONResponse, StreamingResponse
+
+from app.core.timing import timed
+from app.models.export import ExportFormat
+
+# rows are buffered into chunks of about this size, so memory stays flat however many rows are exported
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    # starlette appends the charset to text types
+    ExportFormat.csv: "text/csv",
+}
+
+
+def orjson_default(obj: Any) -> Any:
+    # same as fastapi.encoders.jsonable_encoder, so responses look alike on both paths
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, BaseModel):
+        return obj.dict()
+    raise TypeError
+
+
+class ORJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        with timed("serialize"):
+            return orjson.dumps(content, default=orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def model_response(model: BaseModel, include: Any = None, **kwargs: Any) -> ORJSONResponse:
+    """
+    Serialize an already validated public model directly, skipping the response_model pass FastAPI
+    makes over returned models, which validates them again and walks them with jsonable_encoder.
+    """
+    with timed("serialize"):
+        content = model.dict(include=include)
+    return ORJSONResponse(content=content, **kwargs)
+
+
+async def ndjson_chunks(records: AsyncIterator[Mapping], columns: Sequence[str]) -> AsyncIterator[bytes]:
+    chunk = bytearray()
+    async for record in records:
+        chunk += orjson.dumps({column: record[column] for column in columns}, default=orjson_default)
+        chunk += b"\n"
+        if len(chunk) >= EXPORT_CHUNK_SIZE:
+            yield bytes(chunk)
+            chunk.clear()
+    if chunk:
+        yield bytes(chunk)
+
+
+def csv_value(value: Any) -> Any:
+    if isinstance(value, list):
+        return ";".join(str(item) for item in value)
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+async def csv_chunks(records: AsyncIterator[Mapping], columns: Sequence[str]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    async for record in records:
+        writer.writerow([csv_value(record[column]) for column in columns])
+        if buffer.tell() >= EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def export_response(
+    records: AsyncIterator[Mapping], *, columns: Sequence[str], export_format: ExportFormat, filename: str
+) -> StreamingResponse:
+    chunks = csv_chunks(records, columns) if export_format == ExportFormat.csv else ndjson_chunks(records, columns)
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format.value}"'},
+    )
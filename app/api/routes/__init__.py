@@ -2,6 +2,7 @@ from fastapi import APIRouter
 
 from app.api.routes.auth import router as auth_router
 from app.api.routes.users import router as users_router
+from app.api.routes.me import router as me_router
 from app.api.routes.profiles import router as profiles_router
 from app.api.routes.libraries import router as libraries_router
 from app.api.routes.racks import router as racks_router
@@ -11,11 +12,15 @@ from app.api.routes.book_items import router as book_items_router
 from app.api.routes.reservations import router as reservations_router
 from app.api.routes.lendings import router as lendings_router
 from app.api.routes.system_config import router as system_config_router
+from app.api.routes.fees import router as fees_router
+from app.api.routes.reports import router as reports_router
+from app.api.routes.exports import router as exports_router
 
 router = APIRouter()
 
 router.include_router(auth_router, prefix="/auth", tags=["auth"])
 router.include_router(users_router, prefix="/users", tags=["users"])
+router.include_router(me_router, prefix="/me", tags=["me"])
 router.include_router(profiles_router, prefix="/profiles", tags=["profiles"])
 router.include_router(libraries_router, prefix="/libraries", tags=["libraries"])
 router.include_router(racks_router, prefix="/racks", tags=["racks"])
@@ -25,3 +30,6 @@ router.include_router(book_items_router, prefix="/book_items", tags=["book_items
 router.include_router(reservations_router, prefix="/reservations", tags=["reservations"])
 router.include_router(lendings_router, prefix="/lendings", tags=["lendings"])
 router.include_router(system_config_router, prefix="/system_config", tags=["system_config"])
+router.include_router(fees_router, prefix="/fees", tags=["fees"])
+router.include_router(reports_router, prefix="/reports", tags=["reports"])
+router.include_router(exports_router, prefix="/exports", tags=["exports"])
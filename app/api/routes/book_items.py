@@ -1,15 +1,27 @@
+from typing import List
+
 from fastapi import APIRouter, Depends, Body
 
-from app.api.dependencies.auth import get_current_active_user_with_permissions
+from app.api.dependencies.auth import get_current_active_user, get_current_active_user_with_permissions
 from app.api.dependencies.book_items import get_book_item_by_id_from_path
 from app.api.dependencies.database import get_repository
+from app.api.dependencies.ids import get_required_ids_from_query
 from app.db.repositories.book_items import BookItemsRepository
-from app.models.book_item import BookItemPublic, BookItemInDB, BookItemUpdate, BookItemStatus
+from app.models.book_item import BookItemPublic, BookItemInDB, BookItemUpdate, BookItemStatus, ListOfBookItemsPublic
 from app.models.user import UserInDB, UserRole
 
 router = APIRouter()
 
 
+@router.get("/", response_model=ListOfBookItemsPublic, name="book-items:get-book-items-by-ids")
+async def get_book_items_by_ids(
+    ids: List[int] = Depends(get_required_ids_from_query),
+    current_user: UserInDB = Depends(get_current_active_user),
+    books_items_repo: BookItemsRepository = Depends(get_repository(BookItemsRepository)),
+) -> ListOfBookItemsPublic:
+    return await books_items_repo.get_book_items_by_ids(ids=ids)
+
+
 @router.get("/barcode/{barcode}", response_model=BookItemPublic, name="book-items:get-book-item-by-id")
 async def get_book_item_by_barcode(
     book_item: BookItemInDB = Depends(get_book_item_by_id_from_path),
@@ -1,15 +1,31 @@
-from typing import Optional, Dict
+from typing import AbstractSet, List, Optional, Dict
 
 from fastapi import APIRouter, Body, Depends, Query
+from starlette.requests import Request
+from starlette.responses import Response
 from starlette.status import HTTP_201_CREATED
 
 from app.api.dependencies.auth import get_current_active_user, get_current_active_user_with_permissions
 from app.api.dependencies.book_items import get_book_items_filters_from_query
 from app.api.dependencies.books import get_book_by_id_from_path, get_book_filters_from_query
+from app.api.dependencies.caching import (
+    BOOK_CACHE_CONTROL,
+    BOOK_LIST_TABLES,
+    BOOK_POPULATION_TABLES,
+    cache_headers,
+    etag_matches,
+    make_etag,
+    not_modified_response,
+)
+from app.api.dependencies.ids import get_ids_from_query
+from app.api.dependencies.fields import fields_include, fields_key, get_fields_from_query
 from app.core.config import PAGE_LIMIT
 from app.db.repositories.book_items import BookItemsRepository
 from app.db.repositories.books import BooksRepository
+from app.db.repositories.table_versions import TableVersionsRepository
 from app.api.dependencies.database import get_repository
+from app.api.response_cache import response_cache
+from app.api.responses import model_response
 from app.models.book import BookPublic, BookCreate, BookInDB, ListOfBooksPublic, BookUpdate
 from app.models.book_item import BookItemPublic, BookItemCreate, ListOfBookItemsPublic
 from app.models.user import UserInDB, UserRole
@@ -30,22 +46,53 @@ async def create_new_book(
 async def list_books(
     page: int = Query(1, ge=1),
     book_filters: Dict = Depends(get_book_filters_from_query),
+    fields: Optional[AbstractSet[str]] = Depends(get_fields_from_query(BookPublic)),
+    ids: Optional[List[int]] = Depends(get_ids_from_query),
     current_user: UserInDB = Depends(get_current_active_user),
     books_repo: BooksRepository = Depends(get_repository(BooksRepository)),
-) -> ListOfBooksPublic:
-    return await books_repo.list_books(
-        book_filters=book_filters,
-        limit=PAGE_LIMIT,
-        offset=(page - 1) * PAGE_LIMIT,
+) -> Response:
+    if ids is not None:
+        return model_response(
+            await books_repo.get_books_by_ids(ids=ids, fields=fields),
+            include=fields_include(fields, list_field="books"),
+        )
+    cache_key = response_cache.make_key(
+        "books:list-books", BOOK_LIST_TABLES, {"page": page, "fields": fields_key(fields), **book_filters}
+    )
+    cached_response = response_cache.get(cache_key)
+    if cached_response is not None:
+        return cached_response
+    return response_cache.store(
+        cache_key,
+        model_response(
+            await books_repo.list_books(
+                book_filters=book_filters,
+                limit=PAGE_LIMIT,
+                offset=(page - 1) * PAGE_LIMIT,
+                fields=fields,
+            ),
+            include=fields_include(fields, list_field="books"),
+        ),
     )
 
 
 @router.get("/{book_id}/", response_model=BookPublic, name="books:get-book-by-id")
 async def get_book_by_id(
+    request: Request,
     book: BookInDB = Depends(get_book_by_id_from_path),
+    fields: Optional[AbstractSet[str]] = Depends(get_fields_from_query(BookPublic)),
     books_repo: BooksRepository = Depends(get_repository(BooksRepository)),
-) -> BookPublic:
-    return await books_repo.populate_book(book=book)
+    table_versions_repo: TableVersionsRepository = Depends(get_repository(TableVersionsRepository)),
+) -> Response:
+    versions = await table_versions_repo.get_versions(table_names=BOOK_POPULATION_TABLES)
+    etag = make_etag("book", book.id, book.updated_at.isoformat(), fields_key(fields), *versions.values())
+    if etag_matches(request, etag):
+        return not_modified_response(etag=etag, cache_control=BOOK_CACHE_CONTROL)
+    return model_response(
+        await books_repo.populate_book(book=book, fields=fields),
+        include=fields_include(fields),
+        headers=cache_headers(etag=etag, cache_control=BOOK_CACHE_CONTROL),
+    )
 
 
 @router.put(
@@ -94,14 +141,16 @@ async def get_book_items(
     book_items_filters: Dict = Depends(get_book_items_filters_from_query),
     book: BookInDB = Depends(get_book_by_id_from_path),
     books_items_repo: BookItemsRepository = Depends(get_repository(BookItemsRepository)),
-) -> ListOfBookItemsPublic:
+) -> Response:
     if library_id:
         book_items_filters["library_id"] = library_id
     if rack_id:
         book_items_filters["rack_id"] = rack_id
     book_items_filters["book_id"] = book.id
-    return await books_items_repo.list_book_items(
-        book_items_filters=book_items_filters,
-        limit=PAGE_LIMIT,
-        offset=(page - 1) * PAGE_LIMIT,
+    return model_response(
+        await books_items_repo.list_book_items(
+            book_items_filters=book_items_filters,
+            limit=PAGE_LIMIT,
+            offset=(page - 1) * PAGE_LIMIT,
+        )
     )
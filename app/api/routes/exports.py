@@ -0,0 +1,70 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from starlette.responses import StreamingResponse
+
+from app.api.dependencies.auth import get_current_active_user_with_permissions
+from app.api.dependencies.database import get_repository
+from app.api.responses import export_response
+from app.db.repositories.exports import (
+    BOOK_EXPORT_COLUMNS,
+    BOOK_ITEM_EXPORT_COLUMNS,
+    LENDING_EXPORT_COLUMNS,
+    USER_EXPORT_COLUMNS,
+    ExportsRepository,
+)
+from app.models.export import ExportFormat
+from app.models.user import UserInDB, UserRole
+
+router = APIRouter()
+
+
+@router.get("/books/", name="exports:export-books")
+async def export_books(
+    export_format: ExportFormat = Query(ExportFormat.ndjson, alias="format"),
+    current_user: UserInDB = Depends(get_current_active_user_with_permissions(UserRole.librarian)),
+    exports_repo: ExportsRepository = Depends(get_repository(ExportsRepository)),
+) -> StreamingResponse:
+    return export_response(
+        exports_repo.iterate_books(), columns=BOOK_EXPORT_COLUMNS, export_format=export_format, filename="books"
+    )
+
+
+@router.get("/book_items/", name="exports:export-book-items")
+async def export_book_items(
+    export_format: ExportFormat = Query(ExportFormat.ndjson, alias="format"),
+    library_id: Optional[int] = Query(None, ge=1),
+    current_user: UserInDB = Depends(get_current_active_user_with_permissions(UserRole.librarian)),
+    exports_repo: ExportsRepository = Depends(get_repository(ExportsRepository)),
+) -> StreamingResponse:
+    return export_response(
+        exports_repo.iterate_book_items(library_id=library_id),
+        columns=BOOK_ITEM_EXPORT_COLUMNS,
+        export_format=export_format,
+        filename="book_items",
+    )
+
+
+@router.get("/lendings/", name="exports:export-lendings")
+async def export_lendings(
+    export_format: ExportFormat = Query(ExportFormat.ndjson, alias="format"),
+    current_user: UserInDB = Depends(get_current_active_user_with_permissions(UserRole.librarian)),
+    exports_repo: ExportsRepository = Depends(get_repository(ExportsRepository)),
+) -> StreamingResponse:
+    return export_response(
+        exports_repo.iterate_lendings(),
+        columns=LENDING_EXPORT_COLUMNS,
+        export_format=export_format,
+        filename="lendings",
+    )
+
+
+@router.get("/users/", name="exports:export-users")
+async def export_users(
+    export_format: ExportFormat = Query(ExportFormat.ndjson, alias="format"),
+    current_user: UserInDB = Depends(get_current_active_user_with_permissions(UserRole.admin)),
+    exports_repo: ExportsRepository = Depends(get_repository(ExportsRepository)),
+) -> StreamingResponse:
+    return export_response(
+        exports_repo.iterate_users(), columns=USER_EXPORT_COLUMNS, export_format=export_format, filename="users"
+    )
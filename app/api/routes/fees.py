@@ -0,0 +1,43 @@
+from decimal import Decimal
+from typing import List
+
+from fastapi import APIRouter, Depends, Path, Query
+
+from app.api.dependencies.auth import get_current_active_user_with_permissions
+from app.api.dependencies.database import get_repository
+from app.core.config import PAGE_LIMIT
+from app.db.repositories.fees import FeesRepository
+from app.models.fee import LibraryFeeTotalPublic, ListOfFeeLedgerEntriesPublic, ListOfUserFeeBalancesPublic
+from app.models.user import UserInDB, UserRole
+
+router = APIRouter()
+
+
+@router.get("/balances/", response_model=ListOfUserFeeBalancesPublic, name="fees:list-user-fee-balances")
+async def list_user_fee_balances(
+    page: int = Query(1, ge=1),
+    min_balance: Decimal = Query(0, ge=0),
+    current_user: UserInDB = Depends(get_current_active_user_with_permissions(UserRole.librarian)),
+    fees_repo: FeesRepository = Depends(get_repository(FeesRepository)),
+) -> ListOfUserFeeBalancesPublic:
+    return await fees_repo.list_user_fee_balances(
+        min_balance=min_balance, limit=PAGE_LIMIT, offset=(page - 1) * PAGE_LIMIT
+    )
+
+
+@router.get("/libraries/", response_model=List[LibraryFeeTotalPublic], name="fees:list-library-fee-totals")
+async def list_library_fee_totals(
+    current_user: UserInDB = Depends(get_current_active_user_with_permissions(UserRole.librarian)),
+    fees_repo: FeesRepository = Depends(get_repository(FeesRepository)),
+) -> List[LibraryFeeTotalPublic]:
+    return await fees_repo.list_library_fee_totals()
+
+
+@router.get("/users/{user_id}/ledger/", response_model=ListOfFeeLedgerEntriesPublic, name="fees:list-user-fee-ledger")
+async def list_user_fee_ledger(
+    user_id: int = Path(..., ge=1),
+    page: int = Query(1, ge=1),
+    current_user: UserInDB = Depends(get_current_active_user_with_permissions(UserRole.librarian)),
+    fees_repo: FeesRepository = Depends(get_repository(FeesRepository)),
+) -> ListOfFeeLedgerEntriesPublic:
+    return await fees_repo.list_user_fee_ledger(user_id=user_id, limit=PAGE_LIMIT, offset=(page - 1) * PAGE_LIMIT)
@@ -1,10 +1,17 @@
-from typing import Dict, Optional
+from typing import AbstractSet, Dict, Optional
 
 from fastapi import Depends, Body, Query, APIRouter
+from starlette.responses import Response
 from starlette.status import HTTP_201_CREATED
 
 from app.api.dependencies.auth import get_current_active_user_with_permissions, get_current_active_user
 from app.api.dependencies.database import get_repository
+from app.api.dependencies.expand import (
+    RelationLoader,
+    get_expand_from_query,
+    get_relation_loader,
+    expanded_model_response,
+)
 from app.api.dependencies.lendings import (
     get_lending_by_id_from_path,
     verify_lending_access,
@@ -12,11 +19,21 @@ from app.api.dependencies.lendings import (
 )
 from app.core.config import PAGE_LIMIT
 from app.db.repositories.lendings import LendingsRepository
-from app.models.lending import LendingPublic, LendingInDB, ListOfLendingsPublic, LendingCreate
+from app.models.lending import (
+    LendingPublic,
+    LendingInDB,
+    ListOfLendingsPublic,
+    LendingCreate,
+    LendingBatchCreate,
+    LendingBatchComplete,
+    LendingBatchResultPublic,
+)
 from app.models.user import UserInDB, UserRole
 
 router = APIRouter()
 
+get_lending_expand = get_expand_from_query("book", "book_item", "library", "user")
+
 
 @router.post("/", response_model=LendingPublic, name="lendings:create-lending", status_code=HTTP_201_CREATED)
 async def create_new_lending(
@@ -27,20 +44,45 @@ async def create_new_lending(
     return await lendings_repo.create_lending(new_lending=new_lending)
 
 
+@router.post("/batch", response_model=LendingBatchResultPublic, name="lendings:create-lendings-batch")
+async def create_lendings_batch(
+    lendings_batch: LendingBatchCreate = Body(..., embed=True),
+    current_user: UserInDB = Depends(get_current_active_user_with_permissions(UserRole.librarian)),
+    lendings_repo: LendingsRepository = Depends(get_repository(LendingsRepository)),
+) -> LendingBatchResultPublic:
+    return await lendings_repo.create_lendings_batch(lendings_batch=lendings_batch)
+
+
+@router.put("/batch/complete", response_model=LendingBatchResultPublic, name="lendings:complete-lendings-batch")
+async def complete_lendings_batch(
+    lendings_batch: LendingBatchComplete = Body(..., embed=True),
+    current_user: UserInDB = Depends(get_current_active_user_with_permissions(UserRole.librarian)),
+    lendings_repo: LendingsRepository = Depends(get_repository(LendingsRepository)),
+) -> LendingBatchResultPublic:
+    return await lendings_repo.complete_lendings_batch(lendings_batch=lendings_batch)
+
+
 @router.get("/", response_model=ListOfLendingsPublic, name="lendings:list-lendings")
 async def list_lendings(
     page: int = Query(1, ge=1),
     user_id: Optional[int] = Query(None, ge=1),
     lending_filters: Dict = Depends(get_lending_filters_from_query),
+    expand: AbstractSet[str] = Depends(get_lending_expand),
     current_user: UserInDB = Depends(get_current_active_user_with_permissions(UserRole.librarian)),
     lendings_repo: LendingsRepository = Depends(get_repository(LendingsRepository)),
-) -> ListOfLendingsPublic:
+    relation_loader: RelationLoader = Depends(get_relation_loader),
+) -> Response:
     if user_id:
         lending_filters["user_id"] = user_id
-    return await lendings_repo.list_lendings(
-        lending_filters=lending_filters,
-        limit=PAGE_LIMIT,
-        offset=(page - 1) * PAGE_LIMIT,
+    return await expanded_model_response(
+        await lendings_repo.list_lendings(
+            lending_filters=lending_filters,
+            limit=PAGE_LIMIT,
+            offset=(page - 1) * PAGE_LIMIT,
+        ),
+        expand=expand,
+        relation_loader=relation_loader,
+        list_field="lendings",
     )
 
 
@@ -48,14 +90,21 @@ async def list_lendings(
 async def list_lendings_for_current_user(
     page: int = Query(1, ge=1),
     lending_filters: Dict = Depends(get_lending_filters_from_query),
+    expand: AbstractSet[str] = Depends(get_lending_expand),
     current_user: UserInDB = Depends(get_current_active_user),
     lendings_repo: LendingsRepository = Depends(get_repository(LendingsRepository)),
-) -> ListOfLendingsPublic:
+    relation_loader: RelationLoader = Depends(get_relation_loader),
+) -> Response:
     lending_filters["user_id"] = current_user.id
-    return await lendings_repo.list_lendings(
-        lending_filters=lending_filters,
-        limit=PAGE_LIMIT,
-        offset=(page - 1) * PAGE_LIMIT,
+    return await expanded_model_response(
+        await lendings_repo.list_lendings(
+            lending_filters=lending_filters,
+            limit=PAGE_LIMIT,
+            offset=(page - 1) * PAGE_LIMIT,
+        ),
+        expand=expand,
+        relation_loader=relation_loader,
+        list_field="lendings",
     )
 
 
@@ -67,8 +116,10 @@ async def list_lendings_for_current_user(
 )
 async def get_lending_by_id(
     lending: LendingInDB = Depends(get_lending_by_id_from_path),
-) -> LendingPublic:
-    return lending
+    expand: AbstractSet[str] = Depends(get_lending_expand),
+    relation_loader: RelationLoader = Depends(get_relation_loader),
+) -> Response:
+    return await expanded_model_response(lending, expand=expand, relation_loader=relation_loader)
 
 
 @router.put("/{lending_id}/complete", response_model=LendingPublic, name="lendings:complete-lending-by-id")
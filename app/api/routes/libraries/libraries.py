@@ -1,19 +1,37 @@
-from typing import Dict, Optional
+from typing import AbstractSet, Dict, List, Optional
 
 from fastapi import APIRouter, status, Body, Depends, Query
+from starlette.requests import Request
+from starlette.responses import Response
 
 from app.api.dependencies.book_items import get_book_items_filters_from_query
 from app.api.dependencies.books import get_book_filters_from_query
+from app.api.dependencies.caching import (
+    BOOK_LIST_TABLES,
+    LIBRARY_CACHE_CONTROL,
+    LIBRARY_POPULATION_TABLES,
+    RACK_LIST_CACHE_CONTROL,
+    RACK_LIST_TABLES,
+    cache_headers,
+    etag_matches,
+    make_etag,
+    not_modified_response,
+)
 
 from app.api.dependencies.auth import get_current_active_user_with_permissions, get_current_active_user
 from app.api.dependencies.database import get_repository
+from app.api.dependencies.ids import get_ids_from_query
+from app.api.dependencies.fields import fields_include, fields_key, get_fields_from_query
+from app.api.response_cache import response_cache
+from app.api.responses import model_response
 from app.api.dependencies.libraries import get_library_by_id_from_path
 from app.core.config import PAGE_LIMIT
 from app.db.repositories.book_items import BookItemsRepository
 from app.db.repositories.books import BooksRepository
 from app.db.repositories.libraries import LibrariesRepository
 from app.db.repositories.racks import RacksRepository
-from app.models.book import ListOfBooksPublic
+from app.db.repositories.table_versions import TableVersionsRepository
+from app.models.book import BookPublic, ListOfBooksPublic
 from app.models.book_item import ListOfBookItemsPublic
 from app.models.library import LibraryPublic, LibraryCreate, ListOfLibrariesPublic, LibraryInDB, LibraryUpdate
 from app.models.rack import ListOfRacksPublic, RackPublic, RackCreate
@@ -34,21 +52,45 @@ async def create_new_library(
 @router.get("/", response_model=ListOfLibrariesPublic, name="libraries:list-libraries")
 async def list_libraries(
     page: int = Query(1, ge=1),
+    fields: Optional[AbstractSet[str]] = Depends(get_fields_from_query(LibraryPublic)),
+    ids: Optional[List[int]] = Depends(get_ids_from_query),
     current_user: UserInDB = Depends(get_current_active_user),
     libraries_repo: LibrariesRepository = Depends(get_repository(LibrariesRepository)),
-) -> ListOfLibrariesPublic:
-    return ListOfLibrariesPublic(
-        libraries=await libraries_repo.list_libraries(limit=PAGE_LIMIT, offset=(page - 1) * PAGE_LIMIT),
-        libraries_count=await libraries_repo.libraries_count(),
+) -> Response:
+    if ids is not None:
+        libraries = await libraries_repo.get_libraries_by_ids(ids=ids)
+        return model_response(
+            ListOfLibrariesPublic(libraries=libraries, libraries_count=len(libraries)),
+            include=fields_include(fields, list_field="libraries"),
+        )
+    return model_response(
+        ListOfLibrariesPublic(
+            libraries=await libraries_repo.list_libraries(
+                limit=PAGE_LIMIT, offset=(page - 1) * PAGE_LIMIT, fields=fields
+            ),
+            libraries_count=await libraries_repo.libraries_count(),
+        ),
+        include=fields_include(fields, list_field="libraries"),
     )
 
 
 @router.get("/{library_id}/", response_model=LibraryPublic, name="libraries:get-library-by-id")
 async def get_library_by_id(
+    request: Request,
     library: LibraryInDB = Depends(get_library_by_id_from_path),
+    fields: Optional[AbstractSet[str]] = Depends(get_fields_from_query(LibraryPublic)),
     libraries_repo: LibrariesRepository = Depends(get_repository(LibrariesRepository)),
-) -> LibraryPublic:
-    return await libraries_repo.populate_library(library=library)
+    table_versions_repo: TableVersionsRepository = Depends(get_repository(TableVersionsRepository)),
+) -> Response:
+    versions = await table_versions_repo.get_versions(table_names=LIBRARY_POPULATION_TABLES)
+    etag = make_etag("library", library.id, library.updated_at.isoformat(), fields_key(fields), *versions.values())
+    if etag_matches(request, etag):
+        return not_modified_response(etag=etag, cache_control=LIBRARY_CACHE_CONTROL)
+    return model_response(
+        await libraries_repo.populate_library(library=library, fields=fields),
+        include=fields_include(fields),
+        headers=cache_headers(etag=etag, cache_control=LIBRARY_CACHE_CONTROL),
+    )
 
 
 @router.put(
@@ -79,12 +121,19 @@ async def delete_library_by_id(
 
 @router.get("/{library_id}/racks/", response_model=ListOfRacksPublic, name="libraries:list-library-racks")
 async def list_library_racks(
+    request: Request,
     library: LibraryInDB = Depends(get_library_by_id_from_path),
     current_user: UserInDB = Depends(get_current_active_user),
     racks_repo: RacksRepository = Depends(get_repository(RacksRepository)),
-) -> ListOfRacksPublic:
-    return ListOfRacksPublic(
-        racks=await racks_repo.list_library_racks(library=library),
+    table_versions_repo: TableVersionsRepository = Depends(get_repository(TableVersionsRepository)),
+) -> Response:
+    versions = await table_versions_repo.get_versions(table_names=RACK_LIST_TABLES)
+    etag = make_etag("racks", library.id, *versions.values())
+    if etag_matches(request, etag):
+        return not_modified_response(etag=etag, cache_control=RACK_LIST_CACHE_CONTROL)
+    return model_response(
+        ListOfRacksPublic(racks=await racks_repo.list_library_racks(library=library)),
+        headers=cache_headers(etag=etag, cache_control=RACK_LIST_CACHE_CONTROL),
     )
 
 
@@ -104,11 +153,26 @@ async def create_rack(
 async def list_library_books(
     page: int = Query(1, ge=1),
     book_filters: Dict = Depends(get_book_filters_from_query),
+    fields: Optional[AbstractSet[str]] = Depends(get_fields_from_query(BookPublic)),
     library: LibraryInDB = Depends(get_library_by_id_from_path),
     books_repo: BooksRepository = Depends(get_repository(BooksRepository)),
-) -> ListOfBooksPublic:
+) -> Response:
     book_filters["library_id"] = library.id
-    return await books_repo.list_books(book_filters=book_filters, limit=PAGE_LIMIT, offset=(page - 1) * PAGE_LIMIT)
+    cache_key = response_cache.make_key(
+        "libraries:list-library-books", BOOK_LIST_TABLES, {"page": page, "fields": fields_key(fields), **book_filters}
+    )
+    cached_response = response_cache.get(cache_key)
+    if cached_response is not None:
+        return cached_response
+    return response_cache.store(
+        cache_key,
+        model_response(
+            await books_repo.list_books(
+                book_filters=book_filters, limit=PAGE_LIMIT, offset=(page - 1) * PAGE_LIMIT, fields=fields
+            ),
+            include=fields_include(fields, list_field="books"),
+        ),
+    )
 
 
 @router.get("/{library_id}/books/items", response_model=ListOfBookItemsPublic, name="libraries:list-library-book-items")
@@ -118,10 +182,12 @@ async def list_library_book_items(
     book_items_filters: Dict = Depends(get_book_items_filters_from_query),
     library: LibraryInDB = Depends(get_library_by_id_from_path),
     book_items_repo: BookItemsRepository = Depends(get_repository(BookItemsRepository)),
-) -> ListOfBookItemsPublic:
+) -> Response:
     book_items_filters["library_id"] = library.id
     if rack_id:
         book_items_filters["rack_id"] = rack_id
-    return await book_items_repo.list_book_items(
-        book_items_filters=book_items_filters, limit=PAGE_LIMIT, offset=(page - 1) * PAGE_LIMIT
+    return model_response(
+        await book_items_repo.list_book_items(
+            book_items_filters=book_items_filters, limit=PAGE_LIMIT, offset=(page - 1) * PAGE_LIMIT
+        )
     )
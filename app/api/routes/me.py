@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends
+from starlette.responses import Response
+
+from app.api.dependencies.auth import get_current_active_user
+from app.api.dependencies.database import get_repository
+from app.db.repositories.patron_summary import PatronSummaryRepository
+from app.models.patron_summary import PatronSummaryPublic
+from app.models.user import UserInDB
+
+router = APIRouter()
+
+
+@router.get("/summary/", response_model=PatronSummaryPublic, name="me:get-summary")
+async def get_current_user_summary(
+    current_user: UserInDB = Depends(get_current_active_user),
+    patron_summary_repo: PatronSummaryRepository = Depends(get_repository(PatronSummaryRepository)),
+) -> Response:
+    summary_json = await patron_summary_repo.get_patron_summary_json(user_id=current_user.id)
+    return Response(content=summary_json, media_type="application/json")
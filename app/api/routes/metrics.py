@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from prometheus_client import CONTENT_TYPE_LATEST
+from starlette.responses import Response
+
+from app.core.metrics import render_metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", name="metrics:get-metrics", include_in_schema=False)
+async def get_metrics() -> Response:
+    # the content type already names its charset, which starlette would append again to a media type
+    return Response(content=render_metrics(), headers={"Content-Type": CONTENT_TYPE_LATEST})
@@ -0,0 +1,38 @@
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from app.api.dependencies.auth import get_current_active_user_with_permissions
+from app.api.dependencies.database import get_repository
+from app.db.repositories.circulation_rollups import CirculationRollupsRepository
+from app.models.circulation import CirculationDailyStatsPublic, CirculationReportGrouping
+from app.models.user import UserInDB, UserRole
+
+router = APIRouter()
+
+MAX_REPORT_DAYS = 366
+
+
+@router.get("/circulation/", response_model=List[CirculationDailyStatsPublic], name="reports:get-circulation-report")
+async def get_circulation_report(
+    start_date: date = Query(...),
+    end_date: date = Query(...),
+    library_id: Optional[int] = Query(None, ge=1),
+    group_by: CirculationReportGrouping = Query(CirculationReportGrouping.library),
+    current_user: UserInDB = Depends(get_current_active_user_with_permissions(UserRole.librarian)),
+    circulation_rollups_repo: CirculationRollupsRepository = Depends(get_repository(CirculationRollupsRepository)),
+) -> List[CirculationDailyStatsPublic]:
+    if end_date < start_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="End date must not be before start date.",
+        )
+    if (end_date - start_date).days >= MAX_REPORT_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Reports cover at most {MAX_REPORT_DAYS} days.",
+        )
+    return await circulation_rollups_repo.list_daily_stats(
+        start_date=start_date, end_date=end_date, library_id=library_id, group_by=group_by
+    )
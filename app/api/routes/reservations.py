@@ -1,10 +1,17 @@
-from typing import Dict, Optional
+from typing import AbstractSet, Dict, Optional
 
 from fastapi import APIRouter, Body, Depends, Query
+from starlette.responses import Response
 from starlette.status import HTTP_201_CREATED
 
 from app.api.dependencies.auth import get_current_active_user_with_permissions, get_current_active_user
 from app.api.dependencies.database import get_repository
+from app.api.dependencies.expand import (
+    RelationLoader,
+    get_expand_from_query,
+    get_relation_loader,
+    expanded_model_response,
+)
 from app.api.dependencies.reservations import (
     verify_reservation_access,
     get_reservation_by_id_from_path,
@@ -24,6 +31,8 @@ from app.models.user import UserRole, UserInDB
 
 router = APIRouter()
 
+get_reservation_expand = get_expand_from_query("book", "book_item", "library", "user")
+
 
 @router.post(
     "/", response_model=ReservationPublic, name="reservations:create-reservation", status_code=HTTP_201_CREATED
@@ -58,15 +67,22 @@ async def list_reservations(
     page: int = Query(1, ge=1),
     user_id: Optional[int] = Query(None, ge=1),
     reservation_filters: Dict = Depends(get_reservation_filters_from_query),
+    expand: AbstractSet[str] = Depends(get_reservation_expand),
     current_user: UserInDB = Depends(get_current_active_user_with_permissions(UserRole.librarian)),
     reservations_repo: ReservationsRepository = Depends(get_repository(ReservationsRepository)),
-) -> ListOfReservationsPublic:
+    relation_loader: RelationLoader = Depends(get_relation_loader),
+) -> Response:
     if user_id:
         reservation_filters["user_id"] = user_id
-    return await reservations_repo.list_reservations(
-        reservation_filters=reservation_filters,
-        limit=PAGE_LIMIT,
-        offset=(page - 1) * PAGE_LIMIT,
+    return await expanded_model_response(
+        await reservations_repo.list_reservations(
+            reservation_filters=reservation_filters,
+            limit=PAGE_LIMIT,
+            offset=(page - 1) * PAGE_LIMIT,
+        ),
+        expand=expand,
+        relation_loader=relation_loader,
+        list_field="reservations",
     )
 
 
@@ -74,14 +90,21 @@ async def list_reservations(
 async def list_reservations_for_current_user(
     page: int = Query(1, ge=1),
     reservation_filters: Dict = Depends(get_reservation_filters_from_query),
+    expand: AbstractSet[str] = Depends(get_reservation_expand),
     current_user: UserInDB = Depends(get_current_active_user),
     reservations_repo: ReservationsRepository = Depends(get_repository(ReservationsRepository)),
-) -> ListOfReservationsPublic:
+    relation_loader: RelationLoader = Depends(get_relation_loader),
+) -> Response:
     reservation_filters["user_id"] = current_user.id
-    return await reservations_repo.list_reservations(
-        reservation_filters=reservation_filters,
-        limit=PAGE_LIMIT,
-        offset=(page - 1) * PAGE_LIMIT,
+    return await expanded_model_response(
+        await reservations_repo.list_reservations(
+            reservation_filters=reservation_filters,
+            limit=PAGE_LIMIT,
+            offset=(page - 1) * PAGE_LIMIT,
+        ),
+        expand=expand,
+        relation_loader=relation_loader,
+        list_field="reservations",
     )
 
 
@@ -93,8 +116,10 @@ async def list_reservations_for_current_user(
 )
 async def get_reservation_by_id(
     reservation: ReservationInDB = Depends(get_reservation_by_id_from_path),
-) -> ReservationPublic:
-    return reservation
+    expand: AbstractSet[str] = Depends(get_reservation_expand),
+    relation_loader: RelationLoader = Depends(get_relation_loader),
+) -> Response:
+    return await expanded_model_response(reservation, expand=expand, relation_loader=relation_loader)
 
 
 @router.put(
@@ -1,3 +1,5 @@
+from typing import List, Optional
+
 from fastapi import APIRouter, Depends, Body, HTTPException, status, Query
 from starlette.status import HTTP_201_CREATED
 
@@ -7,9 +9,12 @@ from app.api.dependencies.auth import (
     get_current_active_user_with_permissions,
 )
 from app.api.dependencies.database import get_repository
+from app.api.dependencies.ids import get_ids_from_query
 from app.api.dependencies.users import get_user_by_username_from_path
 from app.core.config import PAGE_LIMIT
+from app.db.repositories.circulation_counters import CirculationCountersRepository
 from app.db.repositories.users import UsersRepository
+from app.models.circulation import UserCirculationPublic
 from app.models.user import (
     UserPublic,
     UserInDB,
@@ -46,9 +51,13 @@ async def register_new_user(
 @router.get("/", response_model=ListOfUsersPublic, name="users:list-users")
 async def list_users(
     page: int = Query(1, ge=1),
+    ids: Optional[List[int]] = Depends(get_ids_from_query),
     current_user: UserInDB = Depends(get_current_active_user_with_permissions(UserRole.librarian)),
     user_repo: UsersRepository = Depends(get_repository(UsersRepository)),
 ) -> ListOfUsersPublic:
+    if ids is not None:
+        users = await user_repo.get_users_by_ids(ids=ids)
+        return ListOfUsersPublic(users=users, users_count=len(users))
     return ListOfUsersPublic(
         users=await user_repo.list_users(limit=PAGE_LIMIT, offset=(page - 1) * PAGE_LIMIT),
         users_count=await user_repo.users_count(),
@@ -60,6 +69,14 @@ async def get_currently_authenticated_user(current_user: UserInDB = Depends(get_
     return current_user
 
 
+@router.get("/me/circulation/", response_model=UserCirculationPublic, name="users:get-current-user-circulation")
+async def get_current_user_circulation(
+    current_user: UserInDB = Depends(get_current_active_user),
+    circulation_counters_repo: CirculationCountersRepository = Depends(get_repository(CirculationCountersRepository)),
+) -> UserCirculationPublic:
+    return await circulation_counters_repo.get_user_circulation(user_id=current_user.id)
+
+
 @router.get("/{username}/", response_model=UserPublic, name="users:get-user")
 async def get_user_by_username(
     user: UserInDB = Depends(get_user_by_username_from_path),
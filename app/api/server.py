@@ -6,11 +6,16 @@ from app.core import config, tasks
 
 from app.api.errors.http_eror import http_error_handler
 from app.api.errors.validation_error import http422_error_handler
+from app.api.middleware.compression import CompressionMiddleware
+from app.api.middleware.metrics import MetricsMiddleware
+from app.api.middleware.timing import ServerTimingMiddleware
+from app.api.responses import ORJSONResponse
 from app.api.routes import router as api_router
+from app.api.routes.metrics import router as metrics_router
 
 
 def get_application():
-    app = FastAPI(title=config.PROJECT_NAME, version=config.VERSION)
+    app = FastAPI(title=config.PROJECT_NAME, version=config.VERSION, default_response_class=ORJSONResponse)
 
     app.add_middleware(
         CORSMiddleware,
@@ -19,15 +24,20 @@ def get_application():
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    app.add_middleware(CompressionMiddleware, minimum_size=config.COMPRESSION_MINIMUM_SIZE)
+    app.add_middleware(MetricsMiddleware)
+    # outermost, so the total covers the other middleware too
+    app.add_middleware(ServerTimingMiddleware, header=config.SERVER_TIMING_HEADER)
 
     app.add_event_handler("startup", tasks.create_start_app_handler(app))
-    app.add_event_handler("startup", tasks.create_daily_cleanup_handler(app))
     app.add_event_handler("shutdown", tasks.create_stop_app_handler(app))
 
     app.add_exception_handler(HTTPException, http_error_handler)
     app.add_exception_handler(RequestValidationError, http422_error_handler)
 
     app.include_router(api_router, prefix=config.API_PREFIX)
+    # outside of the API prefix, where scrapers look by default
+    app.include_router(metrics_router)
 
     return app
 
@@ -12,6 +12,35 @@ API_PREFIX = "/api"
 SECRET_KEY = config("SECRET_KEY", cast=Secret)
 
 PAGE_LIMIT = config("PAGE_LIMIT", cast=int, default=20)
+# most ids accepted by one ?ids= multi-get request
+MULTI_GET_LIMIT = config("MULTI_GET_LIMIT", cast=int, default=100)
+
+# rendered catalog listings kept per process, see app.api.response_cache
+RESPONSE_CACHE_MAX_ENTRIES = config("RESPONSE_CACHE_MAX_ENTRIES", cast=int, default=1024)
+
+# smaller complete bodies are sent uncompressed, streamed bodies are always compressed
+COMPRESSION_MINIMUM_SIZE = config("COMPRESSION_MINIMUM_SIZE", cast=int, default=1024)
+
+# request timings are always logged, the Server-Timing header can be left out of responses
+SERVER_TIMING_HEADER = config("SERVER_TIMING_HEADER", cast=bool, default=True)
+
+# how often the event loop lag reported on /metrics is sampled
+EVENT_LOOP_LAG_INTERVAL_SECONDS = config("EVENT_LOOP_LAG_INTERVAL_SECONDS", cast=float, default=0.5)
+
+RESERVATION_EXPIRY_BATCH_SIZE = config("RESERVATION_EXPIRY_BATCH_SIZE", cast=int, default=1000)
+FEE_ACCRUAL_BATCH_SIZE = config("FEE_ACCRUAL_BATCH_SIZE", cast=int, default=1000)
+
+# cron expressions, in UTC
+RESERVATION_EXPIRY_SCHEDULE = config("RESERVATION_EXPIRY_SCHEDULE", cast=str, default="5 0 * * *")
+HOLD_MATCHING_SCHEDULE = config("HOLD_MATCHING_SCHEDULE", cast=str, default="*/15 * * * *")
+FEE_ACCRUAL_SCHEDULE = config("FEE_ACCRUAL_SCHEDULE", cast=str, default="15 0 * * *")
+CIRCULATION_ROLLUP_SCHEDULE = config("CIRCULATION_ROLLUP_SCHEDULE", cast=str, default="*/30 * * * *")
+PARTITION_MAINTENANCE_SCHEDULE = config("PARTITION_MAINTENANCE_SCHEDULE", cast=str, default="0 3 1 * *")
+SCHEDULER_JITTER_SECONDS = config("SCHEDULER_JITTER_SECONDS", cast=float, default=30.0)
+
+# yearly lendings and reservations partitions, archiving is off while 0
+PARTITION_PRECREATE_YEARS = config("PARTITION_PRECREATE_YEARS", cast=int, default=2)
+PARTITION_ARCHIVE_AFTER_YEARS = config("PARTITION_ARCHIVE_AFTER_YEARS", cast=int, default=0)
 
 ACCESS_TOKEN_EXPIRE_MINUTES = config("ACCESS_TOKEN_EXPIRE_MINUTES", cast=int, default=7 * 24 * 60)  # one week
 JWT_ALGORITHM = config("JWT_ALGORITHM", cast=str, default="HS256")
@@ -0,0 +1,80 @@
+import asyncio
+import os
+from typing import Optional
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+# With several workers, PROMETHEUS_MULTIPROC_DIR has to point every worker of a node to the same empty
+# directory before they start. Each one then writes its samples there, and /metrics adds them all up.
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR") or os.environ.get("prometheus_multiproc_dir"))
+
+DB_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+JOB_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 1800.0, 3600.0)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+HTTP_REQUESTS = Counter("aslib_http_requests_total", "HTTP requests served.", ["method", "route", "status"])
+HTTP_REQUEST_DURATION = Histogram(
+    "aslib_http_request_duration_seconds", "Time serving HTTP requests.", ["method", "route"]
+)
+DB_QUERY_DURATION = Histogram(
+    "aslib_db_query_duration_seconds", "Time running database queries.", ["operation"], buckets=DB_BUCKETS
+)
+DB_POOL_WAIT = Histogram(
+    "aslib_db_pool_wait_seconds", "Time waiting for a connection from the database pool.", buckets=DB_BUCKETS
+)
+DB_POOL_CONNECTIONS_IN_USE = Gauge(
+    "aslib_db_pool_connections_in_use", "Database pool connections taken.", multiprocess_mode="livesum"
+)
+DB_POOL_MAX_SIZE = Gauge("aslib_db_pool_max_size", "Database pool size limit.", multiprocess_mode="livesum")
+JOB_DURATION = Histogram(
+    "aslib_job_duration_seconds", "Time running scheduled jobs.", ["job", "status"], buckets=JOB_BUCKETS
+)
+CACHE_REQUESTS = Counter("aslib_cache_requests_total", "In-process cache lookups.", ["cache", "result"])
+EVENT_LOOP_LAG = Histogram(
+    "aslib_event_loop_lag_seconds", "How late the event loop runs a timer callback.", buckets=LAG_BUCKETS
+)
+
+
+def count_cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def render_metrics() -> bytes:
+    if not MULTIPROCESS:
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
+
+
+def mark_process_dead() -> None:
+    # drops the live gauges of a stopped worker
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class EventLoopLagMonitor:
+    """
+    Sleep `interval` seconds over and over, recording how much later than asked the loop wakes up.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._task: Optional[asyncio.Future] = None
+
+    def start(self) -> None:
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_event_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            EVENT_LOOP_LAG.observe(max(loop.time() - start - self.interval, 0.0))
@@ -0,0 +1,135 @@
+import asyncio
+import contextvars
+import datetime
+import heapq
+import logging
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from databases import Database
+
+from app.db.repositories.reservations import ReservationsRepository
+
+logger = logging.getLogger(__name__)
+
+EXPIRY_RETRY_INTERVAL = datetime.timedelta(minutes=1)
+
+
+class ReservationExpiryTimer:
+    """
+    Heap of waiting reservation deadlines that expires each reservation right after its due date ends.
+
+    Every worker keeps its own heap, fed by RESERVATION_DUE_CHANGED_CHANNEL. Entries removed or moved are
+    left in the heap and skipped when they surface. Workers racing on the same deadline are harmless, as
+    the expiry query skips locked rows and only touches reservations that are still waiting.
+
+    Reservations the query skipped are retried after EXPIRY_RETRY_INTERVAL, unless a notification moved
+    or removed them while they were being expired.
+    """
+
+    def __init__(self, db: Database) -> None:
+        self.db = db
+        self._heap: List[Tuple[datetime.datetime, int]] = []
+        self._deadlines: Dict[int, datetime.datetime] = {}
+        self._expiring: Set[int] = set()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Future] = None
+
+    @staticmethod
+    def deadline_for(due_date: datetime.date) -> datetime.datetime:
+        # a reservation is due through its due date, same as cancel_due_reservations
+        return datetime.datetime.combine(due_date + datetime.timedelta(days=1), datetime.time.min)
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    async def load(self) -> None:
+        reservations_repo = ReservationsRepository(self.db)
+        due_dates = await reservations_repo.list_waiting_reservation_due_dates()
+        self._deadlines = {
+            reservation_id: self.deadline_for(due_date) for reservation_id, due_date in due_dates.items()
+        }
+        self._heap = [(deadline, reservation_id) for reservation_id, deadline in self._deadlines.items()]
+        heapq.heapify(self._heap)
+        self._wakeup.set()
+
+    def schedule(self, reservation_id: int, due_date: datetime.date) -> None:
+        self._expiring.discard(reservation_id)
+        deadline = self.deadline_for(due_date)
+        if self._deadlines.get(reservation_id) == deadline:
+            return
+        self._deadlines[reservation_id] = deadline
+        heapq.heappush(self._heap, (deadline, reservation_id))
+        self._wakeup.set()
+
+    def unschedule(self, reservation_id: int) -> None:
+        self._deadlines.pop(reservation_id, None)
+        self._expiring.discard(reservation_id)
+
+    def handle_notification(self, payload: str) -> None:
+        reservation_id, _, due_date = payload.partition(":")
+        if due_date:
+            self.schedule(int(reservation_id), datetime.date.fromisoformat(due_date))
+        else:
+            self.unschedule(int(reservation_id))
+
+    def start(self) -> None:
+        # a fresh context gives the timer its own database connection
+        self._task = contextvars.Context().run(asyncio.ensure_future, self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def pop_due(self, now: datetime.datetime) -> List[int]:
+        due_reservation_ids = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, reservation_id = heapq.heappop(self._heap)
+            if self._deadlines.get(reservation_id) == deadline:
+                del self._deadlines[reservation_id]
+                self._expiring.add(reservation_id)
+                due_reservation_ids.append(reservation_id)
+        return due_reservation_ids
+
+    def requeue(self, reservation_ids: Iterable[int], retry_at: datetime.datetime) -> None:
+        for reservation_id in reservation_ids:
+            if reservation_id in self._expiring:
+                self._expiring.discard(reservation_id)
+                self._deadlines[reservation_id] = retry_at
+                heapq.heappush(self._heap, (retry_at, reservation_id))
+
+    def seconds_until_next(self, now: datetime.datetime) -> Optional[float]:
+        while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        if self._heap:
+            return max((self._heap[0][0] - now).total_seconds(), 0)
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            timeout = self.seconds_until_next(datetime.datetime.now())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                continue
+            except asyncio.TimeoutError:
+                pass
+
+            due_reservation_ids = self.pop_due(datetime.datetime.now())
+            if not due_reservation_ids:
+                continue
+            try:
+                reservations_repo = ReservationsRepository(self.db)
+                expired = await reservations_repo.expire_reservations(reservation_ids=due_reservation_ids)
+            except Exception:
+                logger.exception("Failed to expire reservations %s, retrying shortly", due_reservation_ids)
+                self.requeue(due_reservation_ids, datetime.datetime.now() + EXPIRY_RETRY_INTERVAL)
+                continue
+            # rows locked by another transaction were skipped, and that transaction may yet roll back
+            self._expiring.difference_update(expired.reservation_ids)
+            self.requeue(due_reservation_ids, datetime.datetime.now() + EXPIRY_RETRY_INTERVAL)
+            logger.info(
+                "Expired %s due reservations, released %s book items",
+                expired.reservations_count,
+                expired.book_items_count,
+            )
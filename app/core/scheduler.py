@@ -0,0 +1,165 @@
+import asyncio
+import contextvars
+import logging
+import os
+import random
+import socket
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, FrozenSet, List, Optional
+
+from databases import Database
+
+from app.core.metrics import JOB_DURATION
+from app.db.repositories.job_runs import JobRunsRepository
+from app.models.job_run import JobRunInDB, JobRunStatus
+
+logger = logging.getLogger(__name__)
+
+JobFunction = Callable[[], Awaitable[None]]
+
+# (min, max) of minute, hour, day of month, month and day of week (both 0 and 7 are sunday)
+CRON_FIELD_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+
+def parse_cron_field(field: str, minimum: int, maximum: int) -> FrozenSet[int]:
+    values = set()
+    for part in field.split(","):
+        value_range, _, step = part.partition("/")
+        if value_range == "*":
+            start, end = minimum, maximum
+        elif "-" in value_range:
+            start, end = (int(value) for value in value_range.split("-", 1))
+        else:
+            start = int(value_range)
+            end = maximum if step else start
+        step = int(step) if step else 1
+        if not minimum <= start <= end <= maximum or step < 1:
+            raise ValueError(f"Invalid cron field {field!r}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+class CronSchedule:
+    """
+    Standard five field cron expression, evaluated in UTC so that every node agrees on the scheduled times.
+    """
+
+    def __init__(self, expression: str) -> None:
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression {expression!r} must have five fields")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            parse_cron_field(field, *field_range) for field, field_range in zip(fields, CRON_FIELD_RANGES)
+        )
+        self.weekdays = frozenset(weekday % 7 for weekday in weekdays)
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def day_matches(self, moment: datetime) -> bool:
+        day_match = moment.day in self.days
+        weekday_match = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_match and weekday_match
+        # like cron, restricting both day fields matches either of them
+        return day_match or weekday_match
+
+    def next_after(self, moment: datetime) -> datetime:
+        moment = moment.astimezone(timezone.utc).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=5 * 366)
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self.day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError(f"Cron expression {self.expression!r} never matches")
+
+
+class ScheduledJob:
+    def __init__(self, name: str, schedule: CronSchedule, func: JobFunction, jitter: float) -> None:
+        self.name = name
+        self.schedule = schedule
+        self.func = func
+        self.jitter = jitter
+
+
+class Scheduler:
+    """
+    Runs every job on all workers' clocks, but only one worker executes each scheduled slot.
+
+    Workers wake up at the cron time plus a random jitter and race for a session advisory lock on the job.
+    The winner claims the slot in `job_runs`, which is unique per job and scheduled time, so a worker that
+    wakes up after the winner released the lock finds the slot taken and skips it.
+    """
+
+    def __init__(self, db: Database, *, default_jitter: float = 30.0) -> None:
+        self.db = db
+        self.default_jitter = default_jitter
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self._tasks: List[asyncio.Future] = []
+
+    def add_job(self, name: str, cron: str, func: JobFunction, *, jitter: Optional[float] = None) -> None:
+        if name in self.jobs:
+            raise ValueError(f"Job {name!r} is already scheduled")
+        self.jobs[name] = ScheduledJob(
+            name, CronSchedule(cron), func, self.default_jitter if jitter is None else jitter
+        )
+
+    def start(self) -> None:
+        for job in self.jobs.values():
+            # a fresh context gives each job loop its own database connection
+            self._tasks.append(contextvars.Context().run(asyncio.ensure_future, self._run_forever(job)))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run_forever(self, job: ScheduledJob) -> None:
+        while True:
+            now = datetime.now(timezone.utc)
+            scheduled_for = job.schedule.next_after(now)
+            await asyncio.sleep((scheduled_for - now).total_seconds() + random.uniform(0, job.jitter))
+            try:
+                await self.run_job(job, scheduled_for=scheduled_for)
+            except Exception:
+                logger.exception("Scheduled job %s failed to run", job.name)
+
+    async def run_job(self, job: ScheduledJob, *, scheduled_for: datetime) -> Optional[JobRunInDB]:
+        job_runs_repo = JobRunsRepository(self.db)
+        async with self.db.connection():
+            if not await job_runs_repo.try_lock_job(job_name=job.name):
+                return None
+            try:
+                job_run = await job_runs_repo.claim_job_run(
+                    job_name=job.name, scheduled_for=scheduled_for, worker=self.worker
+                )
+                if not job_run:
+                    return None
+
+                started = time.monotonic()
+                status, error = JobRunStatus.succeeded, None
+                try:
+                    await job.func()
+                except Exception as e:
+                    logger.exception("Scheduled job %s failed", job.name)
+                    status, error = JobRunStatus.failed, repr(e)
+                duration = time.monotonic() - started
+                JOB_DURATION.labels(job.name, status.value).observe(duration)
+                return await job_runs_repo.finish_job_run(
+                    job_run=job_run,
+                    status=status,
+                    duration_ms=int(duration * 1000),
+                    error=error,
+                )
+            finally:
+                await job_runs_repo.unlock_job(job_name=job.name)
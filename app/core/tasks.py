@@ -1,16 +1,65 @@
+import logging
 from typing import Callable
 from fastapi import FastAPI
-from fastapi_utils.tasks import repeat_every
 
-from app.db.repositories.reservations import ReservationsRepository
+from app.core.config import (
+    RESERVATION_EXPIRY_SCHEDULE,
+    HOLD_MATCHING_SCHEDULE,
+    FEE_ACCRUAL_SCHEDULE,
+    CIRCULATION_ROLLUP_SCHEDULE,
+    PARTITION_MAINTENANCE_SCHEDULE,
+    SCHEDULER_JITTER_SECONDS,
+    EVENT_LOOP_LAG_INTERVAL_SECONDS,
+    PARTITION_PRECREATE_YEARS,
+    PARTITION_ARCHIVE_AFTER_YEARS,
+)
+from app.api.response_cache import response_cache
+from app.core.metrics import EventLoopLagMonitor, mark_process_dead
+from app.core.reservation_expiry import ReservationExpiryTimer
+from app.core.scheduler import Scheduler
+from app.db.repositories.circulation_rollups import CirculationRollupsRepository
+from app.db.repositories.fees import FeesRepository
+from app.db.repositories.partitions import PartitionsRepository
+from app.db.repositories.reservations import (
+    BOOK_ITEM_AVAILABLE_CHANNEL,
+    RESERVATION_DUE_CHANGED_CHANNEL,
+    ReservationsRepository,
+)
+from app.db.repositories.system_config import SYSTEM_CONFIG_CHANNEL, system_config_cache
+from app.db.repositories.table_versions import TABLE_VERSION_CHANNEL
 from app.db.repositories.users import UsersRepository
 from app.db.tasks import connect_to_db, close_db_connection
 from app.models.user import UserCreate, UserRole
 
+logger = logging.getLogger(__name__)
+
 
 def create_start_app_handler(app: FastAPI) -> Callable:
     async def start_app() -> None:
+        app.state._event_loop_lag = EventLoopLagMonitor(EVENT_LOOP_LAG_INTERVAL_SECONDS)
+        app.state._event_loop_lag.start()
+
         await connect_to_db(app)
+        notifications = app.state._db_notifications
+        await notifications.subscribe(SYSTEM_CONFIG_CHANNEL, system_config_cache.invalidate)
+        notifications.on_connection_reset(system_config_cache.invalidate)
+        system_config_cache.invalidate()
+
+        await notifications.subscribe(TABLE_VERSION_CHANNEL, response_cache.invalidate_table)
+        notifications.on_connection_reset(response_cache.invalidate)
+        response_cache.invalidate()
+
+        match_book_item = create_hold_matching_handler(app)
+        await notifications.subscribe(BOOK_ITEM_AVAILABLE_CHANNEL, match_book_item)
+        notifications.on_connection_reset(create_hold_matching_sweep_handler(app))
+
+        reservation_expiry = ReservationExpiryTimer(app.state._db)
+        await notifications.subscribe(RESERVATION_DUE_CHANGED_CHANNEL, reservation_expiry.handle_notification)
+        notifications.on_connection_reset(reservation_expiry.load)
+        await reservation_expiry.load()
+        reservation_expiry.start()
+        app.state._reservation_expiry = reservation_expiry
+
         user_repo = UsersRepository(app.state._db)
         if not await user_repo.get_user_by_username(username="admin"):
             await user_repo.register_new_user(
@@ -19,20 +68,90 @@ def create_start_app_handler(app: FastAPI) -> Callable:
                 )
             )
 
+        app.state._scheduler = create_scheduler(app)
+        app.state._scheduler.start()
+
     return start_app
 
 
 def create_stop_app_handler(app: FastAPI) -> Callable:
     async def stop_app() -> None:
+        await app.state._scheduler.stop()
+        await app.state._reservation_expiry.stop()
         await close_db_connection(app)
+        await app.state._event_loop_lag.stop()
+        mark_process_dead()
 
     return stop_app
 
 
-def create_daily_cleanup_handler(app: FastAPI) -> Callable:
-    @repeat_every(seconds=60 * 60 * 24)  # 1 day
-    async def daily_cleanup() -> None:
+def create_scheduler(app: FastAPI) -> Scheduler:
+    scheduler = Scheduler(app.state._db, default_jitter=SCHEDULER_JITTER_SECONDS)
+    scheduler.add_job("expire_due_reservations", RESERVATION_EXPIRY_SCHEDULE, create_reservation_expiry_job(app))
+    scheduler.add_job("match_available_book_items", HOLD_MATCHING_SCHEDULE, create_hold_matching_sweep_handler(app))
+    scheduler.add_job("accrue_fees", FEE_ACCRUAL_SCHEDULE, create_fee_accrual_job(app))
+    scheduler.add_job("rollup_circulation", CIRCULATION_ROLLUP_SCHEDULE, create_circulation_rollup_job(app))
+    scheduler.add_job("maintain_partitions", PARTITION_MAINTENANCE_SCHEDULE, create_partition_maintenance_job(app))
+    return scheduler
+
+
+def create_reservation_expiry_job(app: FastAPI) -> Callable:
+    async def expire_due_reservations() -> None:
+        reservations_repo = ReservationsRepository(app.state._db)
+        expired = await reservations_repo.cancel_due_reservations()
+        logger.info(
+            "Expired %s due reservations, released %s book items",
+            expired.reservations_count,
+            expired.book_items_count,
+        )
+
+    return expire_due_reservations
+
+
+def create_fee_accrual_job(app: FastAPI) -> Callable:
+    async def accrue_fees() -> None:
+        fees_repo = FeesRepository(app.state._db)
+        accrual = await fees_repo.accrue_fees()
+        logger.info("Accrued %s in fees over %s overdue lendings", accrual.amount, accrual.lendings_count)
+
+    return accrue_fees
+
+
+def create_circulation_rollup_job(app: FastAPI) -> Callable:
+    async def rollup_circulation() -> None:
+        circulation_rollups_repo = CirculationRollupsRepository(app.state._db)
+        refresh = await circulation_rollups_repo.refresh_rollups()
+        logger.info("Rolled up circulation for %s days", len(refresh.days))
+
+    return rollup_circulation
+
+
+def create_partition_maintenance_job(app: FastAPI) -> Callable:
+    async def maintain_partitions() -> None:
+        partitions_repo = PartitionsRepository(app.state._db)
+        maintenance = await partitions_repo.maintain_partitions(
+            years_ahead=PARTITION_PRECREATE_YEARS, archive_after_years=PARTITION_ARCHIVE_AFTER_YEARS
+        )
+        logger.info("Created partitions %s, archived partitions %s", maintenance.created, maintenance.archived)
+
+    return maintain_partitions
+
+
+def create_hold_matching_handler(app: FastAPI) -> Callable:
+    async def match_book_item(payload: str) -> None:
+        reservations_repo = ReservationsRepository(app.state._db)
+        reservation = await reservations_repo.match_book_item(book_item_id=int(payload))
+        if reservation:
+            logger.info("Matched book item %s to reservation %s", reservation.book_item_id, reservation.id)
+
+    return match_book_item
+
+
+def create_hold_matching_sweep_handler(app: FastAPI) -> Callable:
+    # catches up on items whose notifications were missed or skipped while locked
+    async def match_available_book_items() -> None:
         reservations_repo = ReservationsRepository(app.state._db)
-        await reservations_repo.cancel_due_reservations()
+        matched_count = await reservations_repo.match_available_book_items()
+        logger.info("Matched %s available book items to pending reservations", matched_count)
 
-    return daily_cleanup
+    return match_available_book_items
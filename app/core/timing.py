@@ -0,0 +1,40 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+# parts of a request timed apart from its total, see app.api.middleware.timing
+TIMED_METRICS = ("db", "pool", "hash", "serialize")
+
+
+class RequestTimings:
+    """
+    Seconds spent, and number of times spent, in each of the timed parts of one request.
+
+    Parts run concurrently within a request add up, so they can exceed the request total.
+    """
+
+    def __init__(self) -> None:
+        self.durations: Dict[str, float] = dict.fromkeys(TIMED_METRICS, 0.0)
+        self.counts: Dict[str, int] = dict.fromkeys(TIMED_METRICS, 0)
+
+    def add(self, metric: str, duration: float, *, count: int = 1) -> None:
+        self.durations[metric] += duration
+        self.counts[metric] += count
+
+
+# timings of the request being served, None outside of requests
+request_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def timed(metric: str, *, count: int = 1) -> Iterator[None]:
+    timings = request_timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(metric, time.perf_counter() - start, count=count)
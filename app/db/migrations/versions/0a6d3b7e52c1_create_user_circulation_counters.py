@@ -0,0 +1,178 @@
+"""create_user_circulation_counters
+
+Revision ID: 0a6d3b7e52c1
+Revises: f2c8d5a0e913
+Create Date: 2021-06-21 11:08:19.730442
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = "0a6d3b7e52c1"
+down_revision = "f2c8d5a0e913"
+branch_labels = None
+depends_on = None
+
+
+def add_system_config_limits() -> None:
+    op.add_column(
+        "system_config", sa.Column("max_active_lendings", sa.Integer, server_default=sa.text("10"), nullable=False)
+    )
+    op.add_column(
+        "system_config", sa.Column("max_active_reservations", sa.Integer, server_default=sa.text("5"), nullable=False)
+    )
+
+
+def create_user_circulation_counters_table() -> None:
+    op.create_table(
+        "user_circulation_counters",
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("active_lendings", sa.Integer, server_default=sa.text("0"), nullable=False),
+        sa.Column("active_reservations", sa.Integer, server_default=sa.text("0"), nullable=False),
+    )
+    op.execute(
+        """
+        INSERT INTO user_circulation_counters (user_id, active_lendings, active_reservations)
+        SELECT
+            U.id,
+            (SELECT count(*) FROM lendings LE WHERE LE.user_id = U.id AND LE.return_date IS NULL),
+            (SELECT count(*) FROM reservations R WHERE R.user_id = U.id AND R.status IN ('pending', 'waiting'))
+        FROM users U;
+        """
+    )
+
+
+# Counter rows are locked by the upsert, so concurrent checkouts of one user are checked one after another.
+# Limits raise AL400, see app.db.repositories.base.db_function_errors_as_http
+def create_change_circulation_counters_function() -> None:
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION change_circulation_counters(
+            _user_id integer, _lendings_delta integer, _reservations_delta integer
+        )
+            RETURNS void AS
+        $$
+        DECLARE
+            _counters user_circulation_counters%ROWTYPE;
+            _config   system_config%ROWTYPE;
+        BEGIN
+            IF _user_id IS NULL THEN
+                RETURN;
+            END IF;
+            IF _lendings_delta <= 0 AND _reservations_delta <= 0 THEN
+                -- no insert, the user may be in the middle of being deleted
+                UPDATE user_circulation_counters
+                SET active_lendings = active_lendings + _lendings_delta,
+                    active_reservations = active_reservations + _reservations_delta
+                WHERE user_id = _user_id;
+                RETURN;
+            END IF;
+
+            INSERT INTO user_circulation_counters AS C (user_id, active_lendings, active_reservations)
+            VALUES (_user_id, GREATEST(_lendings_delta, 0), GREATEST(_reservations_delta, 0))
+            ON CONFLICT (user_id) DO UPDATE
+            SET active_lendings = C.active_lendings + _lendings_delta,
+                active_reservations = C.active_reservations + _reservations_delta
+            RETURNING * INTO _counters;
+
+            SELECT * INTO _config FROM system_config;
+            IF _lendings_delta > 0 AND _counters.active_lendings > _config.max_active_lendings THEN
+                RAISE EXCEPTION 'User has reached the limit of % active lendings.', _config.max_active_lendings
+                    USING ERRCODE = 'AL400';
+            END IF;
+            IF _reservations_delta > 0 AND _counters.active_reservations > _config.max_active_reservations THEN
+                RAISE EXCEPTION 'User has reached the limit of % active reservations.', _config.max_active_reservations
+                    USING ERRCODE = 'AL400';
+            END IF;
+        END;
+        $$ LANGUAGE plpgsql;
+        """
+    )
+
+
+def create_counter_triggers() -> None:
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION count_lending_circulation()
+            RETURNS TRIGGER AS
+        $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                IF OLD.return_date IS NULL THEN
+                    PERFORM change_circulation_counters(OLD.user_id, -1, 0);
+                END IF;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                IF NEW.return_date IS NULL THEN
+                    PERFORM change_circulation_counters(NEW.user_id, 1, 0);
+                END IF;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ language 'plpgsql';
+        """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION count_reservation_circulation()
+            RETURNS TRIGGER AS
+        $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                IF OLD.status IN ('pending', 'waiting') THEN
+                    PERFORM change_circulation_counters(OLD.user_id, 0, -1);
+                END IF;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                IF NEW.status IN ('pending', 'waiting') THEN
+                    PERFORM change_circulation_counters(NEW.user_id, 0, 1);
+                END IF;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ language 'plpgsql';
+        """
+    )
+    for table, function, counted_column in (
+        ("lendings", "count_lending_circulation", "return_date"),
+        ("reservations", "count_reservation_circulation", "status"),
+    ):
+        op.execute(
+            f"""
+            CREATE TRIGGER {function}
+                AFTER INSERT OR DELETE
+                ON {table}
+                FOR EACH ROW
+            EXECUTE PROCEDURE {function}();
+            """
+        )
+        op.execute(
+            f"""
+            CREATE TRIGGER {function}_update
+                AFTER UPDATE OF {counted_column}, user_id
+                ON {table}
+                FOR EACH ROW
+                WHEN (OLD.{counted_column} IS DISTINCT FROM NEW.{counted_column} OR OLD.user_id IS DISTINCT FROM NEW.user_id)
+            EXECUTE PROCEDURE {function}();
+            """
+        )
+
+
+def upgrade() -> None:
+    add_system_config_limits()
+    create_user_circulation_counters_table()
+    create_change_circulation_counters_function()
+    create_counter_triggers()
+
+
+def downgrade() -> None:
+    for table, function in (("lendings", "count_lending_circulation"), ("reservations", "count_reservation_circulation")):
+        op.execute(f"DROP TRIGGER {function}_update ON {table}")
+        op.execute(f"DROP TRIGGER {function} ON {table}")
+        op.execute(f"DROP FUNCTION {function}")
+    op.execute("DROP FUNCTION change_circulation_counters")
+    op.drop_table("user_circulation_counters")
+    op.drop_column("system_config", "max_active_reservations")
+    op.drop_column("system_config", "max_active_lendings")
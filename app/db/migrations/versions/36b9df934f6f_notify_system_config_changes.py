@@ -0,0 +1,170 @@
+"""notify_system_config_changes
+
+Revision ID: 36b9df934f6f
+Revises: 7d4df7f80327
+Create Date: 2021-06-09 10:22:57.904113
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic
+revision = "36b9df934f6f"
+down_revision = "7d4df7f80327"
+branch_labels = None
+depends_on = None
+
+
+# reservation functions take due days from the application's cached system config,
+# downgrade restores the system_config subselects
+FULFILL_RESERVATION_FUNCTION = """
+    CREATE OR REPLACE FUNCTION fulfill_reservation(_reservation_id integer, _book_item_id integer{due_day_argument})
+        RETURNS reservations AS
+    $$
+    DECLARE
+        _reservation reservations%ROWTYPE;
+        _book_item   book_items%ROWTYPE;
+    BEGIN
+        SELECT * INTO _reservation FROM reservations WHERE id = _reservation_id FOR UPDATE;
+        IF NOT FOUND THEN
+            RAISE EXCEPTION 'No reservation found with that id.' USING ERRCODE = 'AL404';
+        END IF;
+        IF _reservation.status <> 'pending' THEN
+            RAISE EXCEPTION 'Reservation is already %.', _reservation.status USING ERRCODE = 'AL400';
+        END IF;
+        IF _reservation.book_item_id IS NOT NULL THEN
+            RAISE EXCEPTION 'Reservation is already fulfilled.' USING ERRCODE = 'AL400';
+        END IF;
+
+        SELECT * INTO _book_item FROM book_items WHERE id = _book_item_id FOR UPDATE;
+        IF NOT FOUND THEN
+            RAISE EXCEPTION 'No book item found with that id.' USING ERRCODE = 'AL404';
+        END IF;
+        IF _book_item.status <> 'available' THEN
+            RAISE EXCEPTION 'Given book item is unavailable.' USING ERRCODE = 'AL400';
+        END IF;
+        IF _book_item.library_id IS DISTINCT FROM _reservation.library_id THEN
+            RAISE EXCEPTION 'Given book item does not belong to reservation library.' USING ERRCODE = 'AL400';
+        END IF;
+
+        UPDATE book_items SET status = 'reserved' WHERE id = _book_item.id;
+
+        UPDATE reservations
+        SET book_item_id = _book_item.id,
+            status = 'waiting',
+            due_date = current_date + {due_day} * INTERVAL '1 day'
+        WHERE id = _reservation.id
+        RETURNING * INTO _reservation;
+
+        RETURN _reservation;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+COMPLETE_RESERVATION_FUNCTION = """
+    CREATE OR REPLACE FUNCTION complete_reservation(_reservation_id integer{due_day_argument})
+        RETURNS lendings AS
+    $$
+    DECLARE
+        _reservation reservations%ROWTYPE;
+        _book_item   book_items%ROWTYPE;
+        _user        users%ROWTYPE;
+        _lending     lendings%ROWTYPE;
+    BEGIN
+        SELECT * INTO _reservation FROM reservations WHERE id = _reservation_id FOR UPDATE;
+        IF NOT FOUND THEN
+            RAISE EXCEPTION 'No reservation found with that id.' USING ERRCODE = 'AL404';
+        END IF;
+        IF _reservation.status IN ('cancelled', 'completed') THEN
+            RAISE EXCEPTION 'Reservation is already %.', _reservation.status USING ERRCODE = 'AL400';
+        END IF;
+
+        SELECT * INTO _book_item FROM book_items WHERE id = _reservation.book_item_id FOR UPDATE;
+        IF NOT FOUND OR _book_item.status IN ('lost', 'written_off') THEN
+            RAISE EXCEPTION 'Reserved book item is unavailable.' USING ERRCODE = 'AL400';
+        END IF;
+
+        SELECT * INTO _user FROM users WHERE id = _reservation.user_id;
+        IF NOT FOUND THEN
+            RAISE EXCEPTION 'No user found with that id.' USING ERRCODE = 'AL404';
+        END IF;
+        IF _user.status <> 'active' THEN
+            RAISE EXCEPTION 'Given user is not active.' USING ERRCODE = 'AL400';
+        END IF;
+
+        UPDATE book_items SET status = 'available' WHERE id = _book_item.id;
+        UPDATE reservations SET status = 'completed' WHERE id = _reservation.id;
+
+        INSERT INTO lendings (user_id, book_item_id, reservation_id, due_date)
+        VALUES (_user.id, _book_item.id, _reservation.id, current_date + {due_day} * INTERVAL '1 day')
+        RETURNING * INTO _lending;
+
+        RETURN _lending;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+
+def create_system_config_notify_trigger() -> None:
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_system_config_changed()
+            RETURNS TRIGGER AS
+        $$
+        BEGIN
+            PERFORM pg_notify('system_config_changed', '');
+            RETURN NULL;
+        END;
+        $$ language 'plpgsql';
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER notify_system_config_changed
+            AFTER INSERT OR UPDATE OR DELETE
+            ON system_config
+            FOR EACH STATEMENT
+        EXECUTE PROCEDURE notify_system_config_changed();
+        """
+    )
+
+
+def replace_reservation_functions(*, parametrized: bool) -> None:
+    op.execute("DROP FUNCTION IF EXISTS fulfill_reservation(integer, integer)")
+    op.execute("DROP FUNCTION IF EXISTS fulfill_reservation(integer, integer, integer)")
+    op.execute("DROP FUNCTION IF EXISTS complete_reservation(integer)")
+    op.execute("DROP FUNCTION IF EXISTS complete_reservation(integer, integer)")
+
+    if parametrized:
+        op.execute(
+            FULFILL_RESERVATION_FUNCTION.format(
+                due_day_argument=", _reservation_due_day integer", due_day="_reservation_due_day"
+            )
+        )
+        op.execute(
+            COMPLETE_RESERVATION_FUNCTION.format(
+                due_day_argument=", _lending_due_day integer", due_day="_lending_due_day"
+            )
+        )
+    else:
+        op.execute(
+            FULFILL_RESERVATION_FUNCTION.format(
+                due_day_argument="", due_day="(SELECT reservation_due_day FROM system_config)"
+            )
+        )
+        op.execute(
+            COMPLETE_RESERVATION_FUNCTION.format(
+                due_day_argument="", due_day="(SELECT lending_due_day FROM system_config)"
+            )
+        )
+
+
+def upgrade() -> None:
+    create_system_config_notify_trigger()
+    replace_reservation_functions(parametrized=True)
+
+
+def downgrade() -> None:
+    replace_reservation_functions(parametrized=False)
+    op.execute("DROP TRIGGER notify_system_config_changed ON system_config")
+    op.execute("DROP FUNCTION notify_system_config_changed")
@@ -0,0 +1,123 @@
+"""add_hold_queue_matching
+
+Revision ID: 5c0e7a1b9d42
+Revises: 36b9df934f6f
+Create Date: 2021-06-11 16:03:12.551890
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = "5c0e7a1b9d42"
+down_revision = "36b9df934f6f"
+branch_labels = None
+depends_on = None
+
+
+def create_lendings_book_item_status_triggers() -> None:
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION loan_lending_book_item()
+            RETURNS TRIGGER AS
+        $$
+        BEGIN
+            UPDATE book_items SET status = 'loaned' WHERE id = NEW.book_item_id;
+            RETURN NULL;
+        END;
+        $$ language 'plpgsql';
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER loan_lending_book_item
+            AFTER INSERT
+            ON lendings
+            FOR EACH ROW
+        EXECUTE PROCEDURE loan_lending_book_item();
+        """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION return_lending_book_item()
+            RETURNS TRIGGER AS
+        $$
+        BEGIN
+            UPDATE book_items SET status = 'available' WHERE id = NEW.book_item_id AND status = 'loaned';
+            RETURN NULL;
+        END;
+        $$ language 'plpgsql';
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER return_lending_book_item
+            AFTER UPDATE OF return_date
+            ON lendings
+            FOR EACH ROW
+            WHEN (OLD.return_date IS NULL AND NEW.return_date IS NOT NULL)
+        EXECUTE PROCEDURE return_lending_book_item();
+        """
+    )
+
+
+def create_book_item_available_notify_trigger() -> None:
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_book_item_available()
+            RETURNS TRIGGER AS
+        $$
+        BEGIN
+            PERFORM pg_notify('book_item_available', NEW.id::text);
+            RETURN NULL;
+        END;
+        $$ language 'plpgsql';
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER notify_book_item_available_insert
+            AFTER INSERT
+            ON book_items
+            FOR EACH ROW
+            WHEN (NEW.status = 'available')
+        EXECUTE PROCEDURE notify_book_item_available();
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER notify_book_item_available_update
+            AFTER UPDATE OF status
+            ON book_items
+            FOR EACH ROW
+            WHEN (NEW.status = 'available' AND OLD.status IS DISTINCT FROM NEW.status)
+        EXECUTE PROCEDURE notify_book_item_available();
+        """
+    )
+
+
+def create_pending_reservations_index() -> None:
+    op.create_index(
+        "ix_reservations_pending_queue",
+        "reservations",
+        ["book_id", "library_id", "created_at", "id"],
+        postgresql_where=sa.text("status = 'pending' AND book_item_id IS NULL"),
+    )
+
+
+def upgrade() -> None:
+    create_lendings_book_item_status_triggers()
+    create_book_item_available_notify_trigger()
+    create_pending_reservations_index()
+
+
+def downgrade() -> None:
+    op.drop_index("ix_reservations_pending_queue", table_name="reservations")
+    op.execute("DROP TRIGGER notify_book_item_available_update ON book_items")
+    op.execute("DROP TRIGGER notify_book_item_available_insert ON book_items")
+    op.execute("DROP FUNCTION notify_book_item_available")
+    op.execute("DROP TRIGGER return_lending_book_item ON lendings")
+    op.execute("DROP FUNCTION return_lending_book_item")
+    op.execute("DROP TRIGGER loan_lending_book_item ON lendings")
+    op.execute("DROP FUNCTION loan_lending_book_item")
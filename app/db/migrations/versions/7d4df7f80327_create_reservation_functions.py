@@ -0,0 +1,139 @@
+"""create_reservation_functions
+
+Revision ID: 7d4df7f80327
+Revises: d648aa1eaf21
+Create Date: 2021-06-05 13:40:08.615230
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic
+revision = "7d4df7f80327"
+down_revision = "d648aa1eaf21"
+branch_labels = None
+depends_on = None
+
+
+def fix_lendings_reservation_foreign_key() -> None:
+    # lendings.reservation_id was created pointing at libraries.id
+    op.drop_constraint("lendings_reservation_id_fkey", "lendings", type_="foreignkey")
+    op.create_foreign_key(
+        "lendings_reservation_id_fkey", "lendings", "reservations", ["reservation_id"], ["id"], ondelete="SET NULL"
+    )
+
+
+# Errors are raised with SQLSTATE AL<http status>, see app.db.repositories.base.db_function_errors_as_http
+def create_fulfill_reservation_function() -> None:
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION fulfill_reservation(_reservation_id integer, _book_item_id integer)
+            RETURNS reservations AS
+        $$
+        DECLARE
+            _reservation reservations%ROWTYPE;
+            _book_item   book_items%ROWTYPE;
+        BEGIN
+            SELECT * INTO _reservation FROM reservations WHERE id = _reservation_id FOR UPDATE;
+            IF NOT FOUND THEN
+                RAISE EXCEPTION 'No reservation found with that id.' USING ERRCODE = 'AL404';
+            END IF;
+            IF _reservation.status <> 'pending' THEN
+                RAISE EXCEPTION 'Reservation is already %.', _reservation.status USING ERRCODE = 'AL400';
+            END IF;
+            IF _reservation.book_item_id IS NOT NULL THEN
+                RAISE EXCEPTION 'Reservation is already fulfilled.' USING ERRCODE = 'AL400';
+            END IF;
+
+            SELECT * INTO _book_item FROM book_items WHERE id = _book_item_id FOR UPDATE;
+            IF NOT FOUND THEN
+                RAISE EXCEPTION 'No book item found with that id.' USING ERRCODE = 'AL404';
+            END IF;
+            IF _book_item.status <> 'available' THEN
+                RAISE EXCEPTION 'Given book item is unavailable.' USING ERRCODE = 'AL400';
+            END IF;
+            IF _book_item.library_id IS DISTINCT FROM _reservation.library_id THEN
+                RAISE EXCEPTION 'Given book item does not belong to reservation library.' USING ERRCODE = 'AL400';
+            END IF;
+
+            UPDATE book_items SET status = 'reserved' WHERE id = _book_item.id;
+
+            UPDATE reservations
+            SET book_item_id = _book_item.id,
+                status = 'waiting',
+                due_date = current_date + (SELECT reservation_due_day FROM system_config) * INTERVAL '1 day'
+            WHERE id = _reservation.id
+            RETURNING * INTO _reservation;
+
+            RETURN _reservation;
+        END;
+        $$ LANGUAGE plpgsql;
+        """
+    )
+
+
+def create_complete_reservation_function() -> None:
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION complete_reservation(_reservation_id integer)
+            RETURNS lendings AS
+        $$
+        DECLARE
+            _reservation reservations%ROWTYPE;
+            _book_item   book_items%ROWTYPE;
+            _user        users%ROWTYPE;
+            _lending     lendings%ROWTYPE;
+        BEGIN
+            SELECT * INTO _reservation FROM reservations WHERE id = _reservation_id FOR UPDATE;
+            IF NOT FOUND THEN
+                RAISE EXCEPTION 'No reservation found with that id.' USING ERRCODE = 'AL404';
+            END IF;
+            IF _reservation.status IN ('cancelled', 'completed') THEN
+                RAISE EXCEPTION 'Reservation is already %.', _reservation.status USING ERRCODE = 'AL400';
+            END IF;
+
+            SELECT * INTO _book_item FROM book_items WHERE id = _reservation.book_item_id FOR UPDATE;
+            IF NOT FOUND OR _book_item.status IN ('lost', 'written_off') THEN
+                RAISE EXCEPTION 'Reserved book item is unavailable.' USING ERRCODE = 'AL400';
+            END IF;
+
+            SELECT * INTO _user FROM users WHERE id = _reservation.user_id;
+            IF NOT FOUND THEN
+                RAISE EXCEPTION 'No user found with that id.' USING ERRCODE = 'AL404';
+            END IF;
+            IF _user.status <> 'active' THEN
+                RAISE EXCEPTION 'Given user is not active.' USING ERRCODE = 'AL400';
+            END IF;
+
+            UPDATE book_items SET status = 'available' WHERE id = _book_item.id;
+            UPDATE reservations SET status = 'completed' WHERE id = _reservation.id;
+
+            INSERT INTO lendings (user_id, book_item_id, reservation_id, due_date)
+            VALUES (
+                _user.id,
+                _book_item.id,
+                _reservation.id,
+                current_date + (SELECT lending_due_day FROM system_config) * INTERVAL '1 day'
+            )
+            RETURNING * INTO _lending;
+
+            RETURN _lending;
+        END;
+        $$ LANGUAGE plpgsql;
+        """
+    )
+
+
+def upgrade() -> None:
+    fix_lendings_reservation_foreign_key()
+    create_fulfill_reservation_function()
+    create_complete_reservation_function()
+
+
+def downgrade() -> None:
+    op.execute("DROP FUNCTION complete_reservation(integer)")
+    op.execute("DROP FUNCTION fulfill_reservation(integer, integer)")
+    op.drop_constraint("lendings_reservation_id_fkey", "lendings", type_="foreignkey")
+    op.create_foreign_key(
+        "lendings_reservation_id_fkey", "lendings", "libraries", ["reservation_id"], ["id"], ondelete="SET NULL"
+    )
@@ -0,0 +1,66 @@
+"""notify_table_version_changes
+
+Revision ID: a8c2f6d91e47
+Revises: e5f1a8c3b702
+Create Date: 2021-06-25 16:03:11.472906
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic
+revision = "a8c2f6d91e47"
+down_revision = "e5f1a8c3b702"
+branch_labels = None
+depends_on = None
+
+
+BUMP_TABLE_VERSION_FUNCTION = """
+    CREATE OR REPLACE FUNCTION bump_table_version()
+        RETURNS TRIGGER AS
+    $$
+    BEGIN
+        INSERT INTO table_versions AS TV (table_name)
+        VALUES (TG_TABLE_NAME)
+        ON CONFLICT (table_name) DO UPDATE
+        SET version = TV.version + 1,
+            updated_at = now();
+        {notify}
+        RETURN NULL;
+    END;
+    $$ language 'plpgsql';
+"""
+
+# identical payloads are folded into one notification per transaction
+NOTIFY_TABLE_VERSION_CHANGED = "PERFORM pg_notify('table_version_changed', TG_TABLE_NAME);"
+
+
+def create_book_items_version_triggers() -> None:
+    op.execute("INSERT INTO table_versions (table_name) VALUES ('book_items')")
+    # checkouts and returns only touch status, which no catalog listing shows
+    op.execute("""
+        CREATE TRIGGER bump_book_items_version
+            AFTER INSERT OR DELETE OR TRUNCATE
+            ON book_items
+            FOR EACH STATEMENT
+        EXECUTE PROCEDURE bump_table_version();
+        """)
+    op.execute("""
+        CREATE TRIGGER bump_book_items_version_update
+            AFTER UPDATE OF book_id, library_id, rack_id
+            ON book_items
+            FOR EACH STATEMENT
+        EXECUTE PROCEDURE bump_table_version();
+        """)
+
+
+def upgrade() -> None:
+    op.execute(BUMP_TABLE_VERSION_FUNCTION.format(notify=NOTIFY_TABLE_VERSION_CHANGED))
+    create_book_items_version_triggers()
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER bump_book_items_version_update ON book_items")
+    op.execute("DROP TRIGGER bump_book_items_version ON book_items")
+    op.execute("DELETE FROM table_versions WHERE table_name = 'book_items'")
+    op.execute(BUMP_TABLE_VERSION_FUNCTION.format(notify=""))
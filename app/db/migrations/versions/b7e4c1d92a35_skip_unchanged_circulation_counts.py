@@ -0,0 +1,72 @@
+"""skip_unchanged_circulation_counts
+
+Revision ID: b7e4c1d92a35
+Revises: a8c2f6d91e47
+Create Date: 2021-06-28 10:42:37.915204
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic
+revision = "b7e4c1d92a35"
+down_revision = "a8c2f6d91e47"
+branch_labels = None
+depends_on = None
+
+
+COUNTER_FUNCTION = """
+    CREATE OR REPLACE FUNCTION {function}()
+        RETURNS TRIGGER AS
+    $$
+    BEGIN{skip_unchanged}
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            IF {old_counted} THEN
+                PERFORM change_circulation_counters(OLD.user_id, {decrement});
+            END IF;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            IF {new_counted} THEN
+                PERFORM change_circulation_counters(NEW.user_id, {increment});
+            END IF;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ language 'plpgsql';
+"""
+
+# e.g. a reservation going from pending to waiting, which must not fail for a user above a lowered limit
+SKIP_UNCHANGED = """
+        IF TG_OP = 'UPDATE' AND OLD.user_id IS NOT DISTINCT FROM NEW.user_id AND {old_counted} AND {new_counted} THEN
+            RETURN NULL;
+        END IF;"""
+
+COUNTERS = (
+    ("count_lending_circulation", "{row}.return_date IS NULL", "-1, 0", "1, 0"),
+    ("count_reservation_circulation", "{row}.status IN ('pending', 'waiting')", "0, -1", "0, 1"),
+)
+
+
+def create_counter_functions(skip_unchanged: bool) -> None:
+    for function, counted, decrement, increment in COUNTERS:
+        old_counted, new_counted = counted.format(row="OLD"), counted.format(row="NEW")
+        op.execute(
+            COUNTER_FUNCTION.format(
+                function=function,
+                skip_unchanged=SKIP_UNCHANGED.format(old_counted=old_counted, new_counted=new_counted)
+                if skip_unchanged
+                else "",
+                old_counted=old_counted,
+                new_counted=new_counted,
+                decrement=decrement,
+                increment=increment,
+            )
+        )
+
+
+def upgrade() -> None:
+    create_counter_functions(skip_unchanged=True)
+
+
+def downgrade() -> None:
+    create_counter_functions(skip_unchanged=False)
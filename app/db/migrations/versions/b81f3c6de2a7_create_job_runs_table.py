@@ -0,0 +1,42 @@
+"""create_job_runs_table
+
+Revision ID: b81f3c6de2a7
+Revises: 5c0e7a1b9d42
+Create Date: 2021-06-14 12:41:05.372016
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = "b81f3c6de2a7"
+down_revision = "5c0e7a1b9d42"
+branch_labels = None
+depends_on = None
+
+
+def create_job_runs_table() -> None:
+    op.create_table(
+        "job_runs",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("job_name", sa.Text, nullable=False),
+        sa.Column("scheduled_for", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("status", sa.Text, nullable=False),
+        sa.Column("worker", sa.Text, nullable=False),
+        sa.Column("started_at", sa.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("finished_at", sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column("duration_ms", sa.Integer, nullable=True),
+        sa.Column("error", sa.Text, nullable=True),
+        # a scheduled slot is claimed exactly once across all workers
+        sa.UniqueConstraint("job_name", "scheduled_for", name="uq_job_runs_job_name_scheduled_for"),
+    )
+    op.create_index("ix_job_runs_job_name_started_at", "job_runs", ["job_name", "started_at"])
+
+
+def upgrade() -> None:
+    create_job_runs_table()
+
+
+def downgrade() -> None:
+    op.drop_table("job_runs")
@@ -0,0 +1,153 @@
+"""create_fee_ledger
+
+Revision ID: c3e91f4a7d28
+Revises: 0a6d3b7e52c1
+Create Date: 2021-06-22 09:41:52.310871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = "c3e91f4a7d28"
+down_revision = "0a6d3b7e52c1"
+branch_labels = None
+depends_on = None
+
+
+def add_fee_columns() -> None:
+    # part of a lending's fee already written to the ledger
+    op.add_column("lendings", sa.Column("accrued_fee", sa.Numeric, server_default=sa.text("0"), nullable=False))
+    op.add_column(
+        "user_circulation_counters",
+        sa.Column("fee_balance", sa.Numeric, server_default=sa.text("0"), nullable=False),
+    )
+    op.create_index("ix_user_circulation_counters_fee_balance", "user_circulation_counters", ["fee_balance"])
+
+
+def create_fee_ledger_table() -> None:
+    op.create_table(
+        "fee_ledger",
+        sa.Column("id", sa.BigInteger, primary_key=True),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        # lendings are partitioned, so there is no foreign key to them
+        sa.Column("lending_id", sa.Integer, nullable=False),
+        sa.Column("library_id", sa.Integer, sa.ForeignKey("libraries.id", ondelete="SET NULL"), nullable=True),
+        sa.Column("amount", sa.Numeric, nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_fee_ledger_user_id_created_at", "fee_ledger", ["user_id", "created_at"])
+    # covers the per library totals report with an index only scan
+    op.create_index("ix_fee_ledger_library_id_amount", "fee_ledger", ["library_id", "amount"])
+    op.create_index("ix_fee_ledger_lending_id", "fee_ledger", ["lending_id"])
+
+
+def backfill_fee_ledger() -> None:
+    op.execute(
+        """
+        UPDATE lendings LE
+        SET accrued_fee = CASE
+            WHEN LE.fee IS NOT NULL THEN LE.fee
+            ELSE (current_date - LE.due_date) * (SELECT lending_daily_fee FROM system_config)
+        END
+        WHERE LE.fee IS NOT NULL
+            OR (LE.return_date IS NULL AND LE.due_date < current_date);
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO fee_ledger (user_id, lending_id, library_id, amount)
+        SELECT LE.user_id, LE.id, BI.library_id, LE.accrued_fee
+        FROM lendings LE
+        LEFT JOIN book_items BI ON BI.id = LE.book_item_id
+        WHERE LE.user_id IS NOT NULL
+            AND LE.accrued_fee <> 0;
+        """
+    )
+    op.execute(
+        """
+        UPDATE user_circulation_counters C
+        SET fee_balance = B.fee_balance
+        FROM (SELECT user_id, sum(amount) AS fee_balance FROM fee_ledger GROUP BY user_id) B
+        WHERE C.user_id = B.user_id;
+        """
+    )
+
+
+def create_fee_triggers() -> None:
+    # every path that freezes a fee on completion also settles it in the ledger
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION settle_lending_fee()
+            RETURNS TRIGGER AS
+        $$
+        BEGIN
+            NEW.accrued_fee = NEW.fee;
+            RETURN NEW;
+        END;
+        $$ language 'plpgsql';
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER settle_lending_fee
+            BEFORE UPDATE OF fee
+            ON lendings
+            FOR EACH ROW
+            WHEN (NEW.fee IS NOT NULL AND NEW.fee IS DISTINCT FROM OLD.fee)
+        EXECUTE PROCEDURE settle_lending_fee();
+        """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION record_fee_ledger_entry()
+            RETURNS TRIGGER AS
+        $$
+        DECLARE
+            _amount numeric := NEW.accrued_fee - OLD.accrued_fee;
+        BEGIN
+            IF NEW.user_id IS NULL THEN
+                RETURN NULL;
+            END IF;
+            INSERT INTO fee_ledger (user_id, lending_id, library_id, amount)
+            VALUES (NEW.user_id, NEW.id, (SELECT library_id FROM book_items WHERE id = NEW.book_item_id), _amount);
+
+            INSERT INTO user_circulation_counters AS C (user_id, fee_balance)
+            VALUES (NEW.user_id, _amount)
+            ON CONFLICT (user_id) DO UPDATE
+            SET fee_balance = C.fee_balance + _amount;
+            RETURN NULL;
+        END;
+        $$ language 'plpgsql';
+        """
+    )
+    # no column list, accrued_fee is also changed by settle_lending_fee
+    op.execute(
+        """
+        CREATE TRIGGER record_fee_ledger_entry
+            AFTER UPDATE
+            ON lendings
+            FOR EACH ROW
+            WHEN (OLD.accrued_fee IS DISTINCT FROM NEW.accrued_fee)
+        EXECUTE PROCEDURE record_fee_ledger_entry();
+        """
+    )
+
+
+def upgrade() -> None:
+    add_fee_columns()
+    create_fee_ledger_table()
+    backfill_fee_ledger()
+    create_fee_triggers()
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER record_fee_ledger_entry ON lendings")
+    op.execute("DROP FUNCTION record_fee_ledger_entry")
+    op.execute("DROP TRIGGER settle_lending_fee ON lendings")
+    op.execute("DROP FUNCTION settle_lending_fee")
+    op.drop_table("fee_ledger")
+    op.drop_index("ix_user_circulation_counters_fee_balance", table_name="user_circulation_counters")
+    op.drop_column("user_circulation_counters", "fee_balance")
+    op.drop_column("lendings", "accrued_fee")
@@ -0,0 +1,81 @@
+"""add_foreign_key_and_status_indexes
+
+Revision ID: d648aa1eaf21
+Revises: 8a9272ba5a3a
+Create Date: 2021-06-02 19:12:41.218745
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = "d648aa1eaf21"
+down_revision = "8a9272ba5a3a"
+branch_labels = None
+depends_on = None
+
+
+def create_book_items_indexes() -> None:
+    op.create_index("ix_book_items_book_id", "book_items", ["book_id"])
+    op.create_index("ix_book_items_library_id_status", "book_items", ["library_id", "status"])
+    op.create_index("ix_book_items_rack_id", "book_items", ["rack_id"], postgresql_where=sa.text("rack_id IS NOT NULL"))
+
+
+def create_reservations_indexes() -> None:
+    op.create_index("ix_reservations_status_due_date", "reservations", ["status", "due_date"])
+    op.create_index("ix_reservations_user_id", "reservations", ["user_id"])
+    op.create_index(
+        "ix_reservations_book_item_id",
+        "reservations",
+        ["book_item_id"],
+        postgresql_where=sa.text("book_item_id IS NOT NULL"),
+    )
+
+
+def create_lendings_indexes() -> None:
+    op.create_index("ix_lendings_user_id", "lendings", ["user_id"])
+    op.create_index("ix_lendings_book_item_id", "lendings", ["book_item_id"])
+    op.create_index(
+        "ix_lendings_reservation_id",
+        "lendings",
+        ["reservation_id"],
+        postgresql_where=sa.text("reservation_id IS NOT NULL"),
+    )
+    op.create_index(
+        "ix_lendings_due_date_active",
+        "lendings",
+        ["due_date"],
+        postgresql_where=sa.text("return_date IS NULL"),
+    )
+
+
+def create_profiles_indexes() -> None:
+    op.create_index("ix_profiles_user_id", "profiles", ["user_id"])
+
+
+def create_racks_indexes() -> None:
+    op.create_index("ix_racks_library_id", "racks", ["library_id"])
+
+
+def upgrade() -> None:
+    create_book_items_indexes()
+    create_reservations_indexes()
+    create_lendings_indexes()
+    create_profiles_indexes()
+    create_racks_indexes()
+
+
+def downgrade() -> None:
+    op.drop_index("ix_racks_library_id", table_name="racks")
+    op.drop_index("ix_profiles_user_id", table_name="profiles")
+    op.drop_index("ix_lendings_due_date_active", table_name="lendings")
+    op.drop_index("ix_lendings_reservation_id", table_name="lendings")
+    op.drop_index("ix_lendings_book_item_id", table_name="lendings")
+    op.drop_index("ix_lendings_user_id", table_name="lendings")
+    op.drop_index("ix_reservations_book_item_id", table_name="reservations")
+    op.drop_index("ix_reservations_user_id", table_name="reservations")
+    op.drop_index("ix_reservations_status_due_date", table_name="reservations")
+    op.drop_index("ix_book_items_rack_id", table_name="book_items")
+    op.drop_index("ix_book_items_library_id_status", table_name="book_items")
+    op.drop_index("ix_book_items_book_id", table_name="book_items")
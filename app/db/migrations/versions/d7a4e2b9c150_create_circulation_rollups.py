@@ -0,0 +1,96 @@
+"""create_circulation_rollups
+
+Revision ID: d7a4e2b9c150
+Revises: c3e91f4a7d28
+Create Date: 2021-06-23 14:12:05.584219
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = "d7a4e2b9c150"
+down_revision = "c3e91f4a7d28"
+branch_labels = None
+depends_on = None
+
+
+def fix_reservations_modtime_trigger() -> None:
+    # was created on book_items, so reservations.updated_at never moved and could not serve as a watermark
+    op.execute("DROP TRIGGER update_reservations_modtime ON book_items")
+    op.execute(
+        """
+        CREATE TRIGGER update_reservations_modtime
+            BEFORE UPDATE
+            ON reservations
+            FOR EACH ROW
+        EXECUTE PROCEDURE update_updated_at_column();
+        """
+    )
+
+
+def create_watermark_indexes() -> None:
+    for table in ("lendings", "reservations"):
+        op.create_index(f"ix_{table}_updated_at", table, ["updated_at"])
+        op.create_index(f"ix_{table}_created_at", table, ["created_at"])
+    op.create_index(
+        "ix_lendings_return_date",
+        "lendings",
+        ["return_date"],
+        postgresql_where=sa.text("return_date IS NOT NULL"),
+    )
+
+
+def create_circulation_daily_stats_table() -> None:
+    # no foreign keys, rollups outlive the libraries and racks they count
+    op.create_table(
+        "circulation_daily_stats",
+        sa.Column("id", sa.BigInteger, primary_key=True),
+        sa.Column("day", sa.Date, nullable=False),
+        sa.Column("library_id", sa.Integer, nullable=True),
+        sa.Column("rack_id", sa.Integer, nullable=True),
+        sa.Column("loans", sa.Integer, server_default=sa.text("0"), nullable=False),
+        sa.Column("returns", sa.Integer, server_default=sa.text("0"), nullable=False),
+        sa.Column("holds_placed", sa.Integer, server_default=sa.text("0"), nullable=False),
+        sa.Column("holds_expired", sa.Integer, server_default=sa.text("0"), nullable=False),
+        sa.Column("overdue", sa.Integer, server_default=sa.text("0"), nullable=False),
+    )
+    op.create_index("ix_circulation_daily_stats_day_library_id", "circulation_daily_stats", ["day", "library_id"])
+    op.create_index("ix_circulation_daily_stats_library_id_day", "circulation_daily_stats", ["library_id", "day"])
+
+
+def create_rollup_watermarks_table() -> None:
+    op.create_table(
+        "rollup_watermarks",
+        sa.Column("name", sa.Text, primary_key=True),
+        sa.Column("watermark", sa.TIMESTAMP(timezone=True), nullable=False),
+    )
+    # the first rollup run covers every day with circulation
+    op.execute("INSERT INTO rollup_watermarks (name, watermark) VALUES ('circulation_daily_stats', '-infinity')")
+
+
+def upgrade() -> None:
+    fix_reservations_modtime_trigger()
+    create_watermark_indexes()
+    create_circulation_daily_stats_table()
+    create_rollup_watermarks_table()
+
+
+def downgrade() -> None:
+    op.drop_table("rollup_watermarks")
+    op.drop_table("circulation_daily_stats")
+    op.drop_index("ix_lendings_return_date", table_name="lendings")
+    for table in ("lendings", "reservations"):
+        op.drop_index(f"ix_{table}_created_at", table_name=table)
+        op.drop_index(f"ix_{table}_updated_at", table_name=table)
+    op.execute("DROP TRIGGER update_reservations_modtime ON reservations")
+    op.execute(
+        """
+        CREATE TRIGGER update_reservations_modtime
+            BEFORE UPDATE
+            ON book_items
+            FOR EACH ROW
+        EXECUTE PROCEDURE update_updated_at_column();
+        """
+    )
@@ -0,0 +1,52 @@
+"""notify_reservation_due_changes
+
+Revision ID: e4a92c7f1b30
+Revises: b81f3c6de2a7
+Create Date: 2021-06-16 09:12:48.661204
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic
+revision = "e4a92c7f1b30"
+down_revision = "b81f3c6de2a7"
+branch_labels = None
+depends_on = None
+
+
+def create_reservation_due_notify_trigger() -> None:
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_reservation_due_changed()
+            RETURNS TRIGGER AS
+        $$
+        BEGIN
+            PERFORM pg_notify(
+                'reservation_due_changed',
+                NEW.id || ':' || CASE WHEN NEW.status = 'waiting' THEN COALESCE(NEW.due_date::text, '') ELSE '' END
+            );
+            RETURN NULL;
+        END;
+        $$ language 'plpgsql';
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER notify_reservation_due_changed
+            AFTER UPDATE OF status, due_date
+            ON reservations
+            FOR EACH ROW
+            WHEN (OLD.status IS DISTINCT FROM NEW.status OR OLD.due_date IS DISTINCT FROM NEW.due_date)
+        EXECUTE PROCEDURE notify_reservation_due_changed();
+        """
+    )
+
+
+def upgrade() -> None:
+    create_reservation_due_notify_trigger()
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER notify_reservation_due_changed ON reservations")
+    op.execute("DROP FUNCTION notify_reservation_due_changed")
@@ -0,0 +1,84 @@
+"""create_table_versions
+
+Revision ID: e5f1a8c3b702
+Revises: d7a4e2b9c150
+Create Date: 2021-06-24 10:27:48.905162
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = "e5f1a8c3b702"
+down_revision = "d7a4e2b9c150"
+branch_labels = None
+depends_on = None
+
+
+# rarely written catalog tables, frequently written ones would contend on their version row
+VERSIONED_TABLES = (
+    "books",
+    "authors",
+    "books_to_authors",
+    "libraries",
+    "addresses",
+    "libraries_to_addresses",
+    "racks",
+)
+
+
+def create_table_versions_table() -> None:
+    op.create_table(
+        "table_versions",
+        sa.Column("table_name", sa.Text, primary_key=True),
+        sa.Column("version", sa.BigInteger, server_default=sa.text("1"), nullable=False),
+        sa.Column("updated_at", sa.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.execute(
+        f"""
+        INSERT INTO table_versions (table_name)
+        VALUES {", ".join(f"('{table}')" for table in VERSIONED_TABLES)};
+        """
+    )
+
+
+def create_table_version_triggers() -> None:
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION bump_table_version()
+            RETURNS TRIGGER AS
+        $$
+        BEGIN
+            INSERT INTO table_versions AS TV (table_name)
+            VALUES (TG_TABLE_NAME)
+            ON CONFLICT (table_name) DO UPDATE
+            SET version = TV.version + 1,
+                updated_at = now();
+            RETURN NULL;
+        END;
+        $$ language 'plpgsql';
+        """
+    )
+    for table in VERSIONED_TABLES:
+        op.execute(
+            f"""
+            CREATE TRIGGER bump_{table}_version
+                AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE
+                ON {table}
+                FOR EACH STATEMENT
+            EXECUTE PROCEDURE bump_table_version();
+            """
+        )
+
+
+def upgrade() -> None:
+    create_table_versions_table()
+    create_table_version_triggers()
+
+
+def downgrade() -> None:
+    for table in VERSIONED_TABLES:
+        op.execute(f"DROP TRIGGER bump_{table}_version ON {table}")
+    op.execute("DROP FUNCTION bump_table_version")
+    op.drop_table("table_versions")
@@ -0,0 +1,268 @@
+"""partition_lendings_and_reservations
+
+Revision ID: f2c8d5a0e913
+Revises: e4a92c7f1b30
+Create Date: 2021-06-18 15:27:33.104877
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = "f2c8d5a0e913"
+down_revision = "e4a92c7f1b30"
+branch_labels = None
+depends_on = None
+
+
+# yearly partitions by created_at, created ahead of time by the partition maintenance job
+PARTITIONED_TABLES = ("reservations", "lendings")
+PRECREATED_YEARS = 2
+
+# the reservation functions return the table row types, so they are recreated along with the tables
+FULFILL_RESERVATION_FUNCTION = """
+    CREATE OR REPLACE FUNCTION fulfill_reservation(_reservation_id integer, _book_item_id integer, _reservation_due_day integer)
+        RETURNS reservations AS
+    $$
+    DECLARE
+        _reservation reservations%ROWTYPE;
+        _book_item   book_items%ROWTYPE;
+    BEGIN
+        SELECT * INTO _reservation FROM reservations WHERE id = _reservation_id FOR UPDATE;
+        IF NOT FOUND THEN
+            RAISE EXCEPTION 'No reservation found with that id.' USING ERRCODE = 'AL404';
+        END IF;
+        IF _reservation.status <> 'pending' THEN
+            RAISE EXCEPTION 'Reservation is already %.', _reservation.status USING ERRCODE = 'AL400';
+        END IF;
+        IF _reservation.book_item_id IS NOT NULL THEN
+            RAISE EXCEPTION 'Reservation is already fulfilled.' USING ERRCODE = 'AL400';
+        END IF;
+
+        SELECT * INTO _book_item FROM book_items WHERE id = _book_item_id FOR UPDATE;
+        IF NOT FOUND THEN
+            RAISE EXCEPTION 'No book item found with that id.' USING ERRCODE = 'AL404';
+        END IF;
+        IF _book_item.status <> 'available' THEN
+            RAISE EXCEPTION 'Given book item is unavailable.' USING ERRCODE = 'AL400';
+        END IF;
+        IF _book_item.library_id IS DISTINCT FROM _reservation.library_id THEN
+            RAISE EXCEPTION 'Given book item does not belong to reservation library.' USING ERRCODE = 'AL400';
+        END IF;
+
+        UPDATE book_items SET status = 'reserved' WHERE id = _book_item.id;
+
+        UPDATE reservations
+        SET book_item_id = _book_item.id,
+            status = 'waiting',
+            due_date = current_date + _reservation_due_day * INTERVAL '1 day'
+        WHERE id = _reservation.id
+        RETURNING * INTO _reservation;
+
+        RETURN _reservation;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+COMPLETE_RESERVATION_FUNCTION = """
+    CREATE OR REPLACE FUNCTION complete_reservation(_reservation_id integer, _lending_due_day integer)
+        RETURNS lendings AS
+    $$
+    DECLARE
+        _reservation reservations%ROWTYPE;
+        _book_item   book_items%ROWTYPE;
+        _user        users%ROWTYPE;
+        _lending     lendings%ROWTYPE;
+    BEGIN
+        SELECT * INTO _reservation FROM reservations WHERE id = _reservation_id FOR UPDATE;
+        IF NOT FOUND THEN
+            RAISE EXCEPTION 'No reservation found with that id.' USING ERRCODE = 'AL404';
+        END IF;
+        IF _reservation.status IN ('cancelled', 'completed') THEN
+            RAISE EXCEPTION 'Reservation is already %.', _reservation.status USING ERRCODE = 'AL400';
+        END IF;
+
+        SELECT * INTO _book_item FROM book_items WHERE id = _reservation.book_item_id FOR UPDATE;
+        IF NOT FOUND OR _book_item.status IN ('lost', 'written_off') THEN
+            RAISE EXCEPTION 'Reserved book item is unavailable.' USING ERRCODE = 'AL400';
+        END IF;
+
+        SELECT * INTO _user FROM users WHERE id = _reservation.user_id;
+        IF NOT FOUND THEN
+            RAISE EXCEPTION 'No user found with that id.' USING ERRCODE = 'AL404';
+        END IF;
+        IF _user.status <> 'active' THEN
+            RAISE EXCEPTION 'Given user is not active.' USING ERRCODE = 'AL400';
+        END IF;
+
+        UPDATE book_items SET status = 'available' WHERE id = _book_item.id;
+        UPDATE reservations SET status = 'completed' WHERE id = _reservation.id;
+
+        INSERT INTO lendings (user_id, book_item_id, reservation_id, due_date)
+        VALUES (_user.id, _book_item.id, _reservation.id, current_date + _lending_due_day * INTERVAL '1 day')
+        RETURNING * INTO _lending;
+
+        RETURN _lending;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+
+def drop_reservation_functions() -> None:
+    op.execute("DROP FUNCTION fulfill_reservation(integer, integer, integer)")
+    op.execute("DROP FUNCTION complete_reservation(integer, integer)")
+
+
+def create_reservation_functions() -> None:
+    op.execute(FULFILL_RESERVATION_FUNCTION)
+    op.execute(COMPLETE_RESERVATION_FUNCTION)
+
+
+def copy_table(table: str, *, partitioned: bool) -> None:
+    """
+    Copy rows into `<table>_copy`, moving the id sequence over so it survives dropping the original.
+    """
+    partitioning = "PARTITION BY RANGE (created_at)" if partitioned else ""
+    op.execute(f"CREATE TABLE {table}_copy (LIKE {table} INCLUDING DEFAULTS) {partitioning}")
+
+    if partitioned:
+        first_year, last_year = op.get_bind().execute(
+            f"""
+            SELECT
+                extract(year FROM COALESCE(min(created_at), now()) AT TIME ZONE 'UTC')::integer,
+                extract(year FROM now() AT TIME ZONE 'UTC')::integer + {PRECREATED_YEARS}
+            FROM {table}
+            """
+        ).first()
+        for year in range(first_year, last_year + 1):
+            op.execute(
+                f"""
+                CREATE TABLE {table}_y{year} PARTITION OF {table}_copy
+                FOR VALUES FROM ('{year}-01-01 00:00:00+00') TO ('{year + 1}-01-01 00:00:00+00')
+                """
+            )
+
+    op.execute(f"INSERT INTO {table}_copy SELECT * FROM {table}")
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}_copy.id")
+
+
+def replace_tables_with_copies(*, partitioned: bool) -> None:
+    for table in PARTITIONED_TABLES:
+        copy_table(table, partitioned=partitioned)
+    for table in reversed(PARTITIONED_TABLES):
+        op.execute(f"DROP TABLE {table}")
+    for table in PARTITIONED_TABLES:
+        op.execute(f"ALTER TABLE {table}_copy RENAME TO {table}")
+        # partitioned primary keys must contain the partition key, ids stay unique through the shared sequence
+        op.create_primary_key(f"{table}_pkey", table, ["id", "created_at"] if partitioned else ["id"])
+
+
+def create_foreign_keys(*, partitioned: bool) -> None:
+    for table, column, referenced_table in (
+        ("reservations", "book_id", "books"),
+        ("reservations", "library_id", "libraries"),
+        ("reservations", "user_id", "users"),
+        ("reservations", "book_item_id", "book_items"),
+        ("lendings", "user_id", "users"),
+        ("lendings", "book_item_id", "book_items"),
+    ):
+        op.create_foreign_key(f"{table}_{column}_fkey", table, referenced_table, [column], ["id"], ondelete="SET NULL")
+    if not partitioned:
+        # a foreign key to a partitioned table would have to include its created_at
+        op.create_foreign_key(
+            "lendings_reservation_id_fkey", "lendings", "reservations", ["reservation_id"], ["id"], ondelete="SET NULL"
+        )
+
+
+def create_indexes() -> None:
+    op.create_index("ix_reservations_status_due_date", "reservations", ["status", "due_date"])
+    op.create_index("ix_reservations_user_id", "reservations", ["user_id"])
+    op.create_index(
+        "ix_reservations_book_item_id",
+        "reservations",
+        ["book_item_id"],
+        postgresql_where=sa.text("book_item_id IS NOT NULL"),
+    )
+    op.create_index(
+        "ix_reservations_pending_queue",
+        "reservations",
+        ["book_id", "library_id", "created_at", "id"],
+        postgresql_where=sa.text("status = 'pending' AND book_item_id IS NULL"),
+    )
+    op.create_index("ix_lendings_user_id", "lendings", ["user_id"])
+    op.create_index("ix_lendings_book_item_id", "lendings", ["book_item_id"])
+    op.create_index(
+        "ix_lendings_reservation_id",
+        "lendings",
+        ["reservation_id"],
+        postgresql_where=sa.text("reservation_id IS NOT NULL"),
+    )
+    op.create_index(
+        "ix_lendings_due_date_active",
+        "lendings",
+        ["due_date"],
+        postgresql_where=sa.text("return_date IS NULL"),
+    )
+
+
+def create_triggers() -> None:
+    op.execute(
+        """
+        CREATE TRIGGER notify_reservation_due_changed
+            AFTER UPDATE OF status, due_date
+            ON reservations
+            FOR EACH ROW
+            WHEN (OLD.status IS DISTINCT FROM NEW.status OR OLD.due_date IS DISTINCT FROM NEW.due_date)
+        EXECUTE PROCEDURE notify_reservation_due_changed();
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER update_lendings_modtime
+            BEFORE UPDATE
+            ON lendings
+            FOR EACH ROW
+        EXECUTE PROCEDURE update_updated_at_column();
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER loan_lending_book_item
+            AFTER INSERT
+            ON lendings
+            FOR EACH ROW
+        EXECUTE PROCEDURE loan_lending_book_item();
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER return_lending_book_item
+            AFTER UPDATE OF return_date
+            ON lendings
+            FOR EACH ROW
+            WHEN (OLD.return_date IS NULL AND NEW.return_date IS NOT NULL)
+        EXECUTE PROCEDURE return_lending_book_item();
+        """
+    )
+
+
+def rebuild_tables(*, partitioned: bool) -> None:
+    drop_reservation_functions()
+    replace_tables_with_copies(partitioned=partitioned)
+    create_foreign_keys(partitioned=partitioned)
+    create_indexes()
+    create_triggers()
+    create_reservation_functions()
+
+
+def upgrade() -> None:
+    # detached partitions are moved here by the partition maintenance job
+    op.execute("CREATE SCHEMA IF NOT EXISTS archive")
+    rebuild_tables(partitioned=True)
+
+
+def downgrade() -> None:
+    rebuild_tables(partitioned=False)
+    # fails while archived partitions exist, they have to be restored or dropped by hand
+    op.execute("DROP SCHEMA archive")
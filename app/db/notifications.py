@@ -0,0 +1,103 @@
+import asyncio
+import contextvars
+import inspect
+import logging
+from collections import defaultdict
+from typing import Callable, DefaultDict, List, Optional, Set
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+NotificationCallback = Callable[[str], None]
+
+
+class DatabaseNotifications:
+    """
+    Dedicated connection that LISTENs on postgres channels and hands NOTIFY payloads to in-process callbacks.
+
+    Callbacks registered with `on_connection_reset` run whenever the connection is lost or re-established,
+    since notifications sent in between are missed.
+    """
+
+    def __init__(self, url: str, reconnect_interval: float = 5.0) -> None:
+        self.url = url
+        self.reconnect_interval = reconnect_interval
+        self._connection: Optional[asyncpg.Connection] = None
+        self._subscribers: DefaultDict[str, List[NotificationCallback]] = defaultdict(list)
+        self._reset_callbacks: List[Callable[[], None]] = []
+        self._tasks: Set[asyncio.Future] = set()
+        self._closing = False
+
+    @property
+    def connected(self) -> bool:
+        return self._connection is not None and not self._connection.is_closed()
+
+    async def connect(self) -> None:
+        self._closing = False
+        connection = await asyncpg.connect(str(self.url))
+        connection.add_termination_listener(self._on_termination)
+        for channel in self._subscribers:
+            await connection.add_listener(channel, self._dispatch)
+        self._connection = connection
+
+    async def disconnect(self) -> None:
+        self._closing = True
+        for task in list(self._tasks):
+            task.cancel()
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    async def subscribe(self, channel: str, callback: NotificationCallback) -> None:
+        if channel not in self._subscribers and self.connected:
+            await self._connection.add_listener(channel, self._dispatch)
+        self._subscribers[channel].append(callback)
+
+    def on_connection_reset(self, callback: Callable[[], None]) -> None:
+        self._reset_callbacks.append(callback)
+
+    def _run_callback(self, callback: Callable, *args) -> None:
+        try:
+            result = callback(*args)
+        except Exception:
+            logger.exception("Database notification callback failed")
+            return
+        if inspect.isawaitable(result):
+            # a fresh context makes `databases` give every handler its own pooled connection
+            self._track(contextvars.Context().run(asyncio.ensure_future, result))
+
+    def _track(self, task: asyncio.Future) -> None:
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        task.add_done_callback(self._log_failure)
+
+    @staticmethod
+    def _log_failure(task: asyncio.Future) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Database notification callback failed", exc_info=task.exception())
+
+    def _dispatch(self, connection: asyncpg.Connection, pid: int, channel: str, payload: str) -> None:
+        for callback in self._subscribers[channel]:
+            self._run_callback(callback, payload)
+
+    def _on_termination(self, connection: asyncpg.Connection) -> None:
+        self._connection = None
+        if self._closing:
+            return
+        logger.warning("--- DB NOTIFICATIONS CONNECTION LOST ---")
+        for callback in self._reset_callbacks:
+            self._run_callback(callback)
+        self._track(asyncio.ensure_future(self._reconnect()))
+
+    async def _reconnect(self) -> None:
+        while not self._closing:
+            try:
+                await self.connect()
+            except Exception as e:
+                logger.warning(e)
+                await asyncio.sleep(self.reconnect_interval)
+                continue
+            for callback in self._reset_callbacks:
+                self._run_callback(callback)
+            return
@@ -1,4 +1,69 @@
+import asyncio
+import functools
+import random
+from contextlib import contextmanager
+from typing import AbstractSet, Awaitable, Callable, Iterator, List, Mapping, Optional, Sequence, TypeVar
+
+from asyncpg.exceptions import DeadlockDetectedError, PostgresError, SerializationError
 from databases import Database
+from fastapi import HTTPException
+
+# SQLSTATE class raised by our database functions, e.g. AL404 is re-raised as HTTP 404
+DB_FUNCTION_ERROR_CLASS = "AL"
+
+# errors after which the whole transaction can safely be run again
+RETRYABLE_CONFLICT_ERRORS = (DeadlockDetectedError, SerializationError)
+
+T = TypeVar("T")
+
+
+def select_columns(columns: Sequence[str], fields: Optional[AbstractSet[str]] = None, *, alias: str = "") -> str:
+    """
+    SELECT list of `columns` narrowed down to the requested `fields`, all of them when `fields` is None.
+    """
+    prefix = f"{alias}." if alias else ""
+    return ", ".join(f"{prefix}{column}" for column in columns if fields is None or column in fields)
+
+
+def in_ids_order(records: Sequence[Mapping], ids: Sequence[int]) -> List[Mapping]:
+    """
+    Reorder the records of an `id = ANY(:ids)` query as `ids` were given, leaving out ids that were not found.
+    """
+    records_by_id = {record["id"]: record for record in records}
+    return [records_by_id[id_] for id_ in ids if id_ in records_by_id]
+
+
+@contextmanager
+def db_function_errors_as_http() -> Iterator[None]:
+    try:
+        yield
+    except PostgresError as e:
+        if not (e.sqlstate or "").startswith(DB_FUNCTION_ERROR_CLASS):
+            raise
+        raise HTTPException(status_code=int(e.sqlstate[len(DB_FUNCTION_ERROR_CLASS) :]), detail=e.message)
+
+
+def retry_on_conflict(attempts: int = 3, backoff: float = 0.05) -> Callable:
+    """
+    Re-run a repository method that owns its transaction when postgres aborts it for a lock conflict.
+
+    Must not wrap methods called inside an outer transaction, as that transaction is aborted as well.
+    """
+
+    def decorator(method: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @functools.wraps(method)
+        async def wrapper(*args, **kwargs) -> T:
+            for attempt in range(1, attempts + 1):
+                try:
+                    return await method(*args, **kwargs)
+                except RETRYABLE_CONFLICT_ERRORS:
+                    if attempt == attempts:
+                        raise
+                    await asyncio.sleep(backoff * attempt * random.uniform(0.5, 1.5))
+
+        return wrapper
+
+    return decorator
 
 
 class BaseRepository:
@@ -1,9 +1,9 @@
-from typing import Dict
+from typing import Dict, List
 
 from databases import Database
 from fastapi import HTTPException, status
 
-from app.db.repositories.base import BaseRepository
+from app.db.repositories.base import BaseRepository, in_ids_order
 from app.db.repositories.libraries import LibrariesRepository
 from app.db.repositories.racks import RacksRepository
 from app.models.book import BookInDB
@@ -48,6 +48,12 @@ LIST_BOOK_ITEMS_QUERY_START = """
     FROM book_items BI
 """
 
+GET_BOOK_ITEMS_BY_IDS_QUERY = """
+    SELECT id, barcode, condition, status, book_id, library_id, rack_id, created_at, updated_at
+    FROM book_items
+    WHERE id = ANY(CAST(:ids AS integer[]));
+"""
+
 UPDATE_BOOK_ITEM_BY_ID_QUERY = """
     UPDATE book_items
     SET barcode = :barcode,
@@ -164,6 +170,13 @@ class BookItemsRepository(BaseRepository):
             book_items_count=book_item_records[0].get("query_count") if book_item_records else 0,
         )
 
+    async def get_book_items_by_ids(self, *, ids: List[int]) -> ListOfBookItemsPublic:
+        book_item_records = await self.db.fetch_all(query=GET_BOOK_ITEMS_BY_IDS_QUERY, values={"ids": ids})
+        return ListOfBookItemsPublic(
+            book_items=[BookItemInDB(**book_item_record) for book_item_record in in_ids_order(book_item_records, ids)],
+            book_items_count=len(book_item_records),
+        )
+
     async def get_book_item_by_id(self, *, id: int) -> BookItemInDB:
         book_item_record = await self.db.fetch_one(query=GET_BOOK_ITEM_BY_ID_QUERY, values={"id": id})
         if book_item_record:
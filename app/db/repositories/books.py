@@ -1,11 +1,11 @@
-from typing import List, Dict
+from typing import AbstractSet, List, Dict, Optional
 
 from databases import Database
 from fastapi import HTTPException
 from starlette import status
 
 from app.db.repositories.authors import AuthorsRepository
-from app.db.repositories.base import BaseRepository
+from app.db.repositories.base import BaseRepository, in_ids_order, select_columns
 from app.models.book import BookCreate, BookPublic, BookInDB, BookUpdate, ListOfBooksPublic
 
 CREATE_BOOK_QUERY = """
@@ -26,21 +26,34 @@ GET_BOOK_BY_ISBN_QUERY = """
     WHERE isbn = :isbn;
 """
 
+BOOK_COLUMNS = (
+    "id",
+    "isbn",
+    "title",
+    "description",
+    "publisher",
+    "page_count",
+    "publish_date",
+    "created_at",
+    "updated_at",
+)
+
 LIST_BOOKS_QUERY_START = """
-    SELECT 
-        B.id,
-        B.isbn,
-        B.title,
-        B.description,
-        B.publisher,
-        B.page_count,
-        B.publish_date,
-        B.created_at,
-        B.updated_at,
+    SELECT
+        {columns},
         count(*) OVER() AS query_count
     FROM books B
 """
 
+GET_BOOKS_BY_IDS_QUERY = """
+    SELECT {columns}
+    FROM books B
+    WHERE B.id = ANY(CAST(:ids AS integer[]));
+"""
+
+# authors of each book in the same query, instead of one populate_book query per book
+BOOK_AUTHORS_COLUMN = "ARRAY(SELECT BA.author_name FROM books_to_authors BA WHERE BA.book_id = B.id) AS authors"
+
 UPDATE_BOOK_BY_ID_QUERY = """
     UPDATE books
     SET isbn = :isbn,
@@ -77,10 +90,13 @@ REMOVE_BOOK_AUTHOR_QUERY = """
 """
 
 
-async def list_books_filtered_query(book_filters: Dict, add_semicolon=True):
+async def list_books_filtered_query(book_filters: Dict, add_semicolon=True, fields: Optional[AbstractSet[str]] = None):
     where_query_parts = []
     join_query_parts = []
-    query = LIST_BOOKS_QUERY_START
+    columns = select_columns(BOOK_COLUMNS, fields, alias="B")
+    if fields is None or "authors" in fields:
+        columns += f", {BOOK_AUTHORS_COLUMN}"
+    query = LIST_BOOKS_QUERY_START.format(columns=columns)
 
     if book_filters.get("inisbn"):
         where_query_parts.append("B.isbn ILIKE :inisbn")
@@ -177,25 +193,51 @@ class BooksRepository(BaseRepository):
         book_filters: Dict = None,
         limit: int = 20,
         offset: int = 0,
+        fields: Optional[AbstractSet[str]] = None,
     ) -> ListOfBooksPublic:
+        """
+        List books, selecting and populating only the requested `fields`. Fields left out keep their defaults.
+        """
         if book_filters is None:
             book_filters = {}
 
         book_filters["limit"] = limit
         book_filters["offset"] = offset
 
-        list_books_query = await list_books_filtered_query(book_filters=book_filters, add_semicolon=False)
+        list_books_query = await list_books_filtered_query(
+            book_filters=book_filters, add_semicolon=False, fields=fields
+        )
 
         book_records = await self.db.fetch_all(
             query=list_books_query,
             values=book_filters,
         )
 
+        populate = fields is None or "authors" in fields
         return ListOfBooksPublic(
-            books=[await self.populate_book(book=BookInDB(**book_record)) for book_record in book_records],
+            books=[
+                BookPublic(**book_record) if populate else BookPublic(**book_record, authors=[])
+                for book_record in book_records
+            ],
             books_count=book_records[0].get("query_count") if book_records else 0,
         )
 
+    async def get_books_by_ids(self, *, ids: List[int], fields: Optional[AbstractSet[str]] = None) -> ListOfBooksPublic:
+        columns = select_columns(BOOK_COLUMNS, fields, alias="B")
+        populate = fields is None or "authors" in fields
+        if populate:
+            columns += f", {BOOK_AUTHORS_COLUMN}"
+        book_records = await self.db.fetch_all(
+            query=GET_BOOKS_BY_IDS_QUERY.format(columns=columns), values={"ids": ids}
+        )
+        return ListOfBooksPublic(
+            books=[
+                BookPublic(**book_record) if populate else BookPublic(**book_record, authors=[])
+                for book_record in in_ids_order(book_records, ids)
+            ],
+            books_count=len(book_records),
+        )
+
     async def update_book(self, *, book: BookInDB, book_update: BookUpdate, populate: bool = True) -> BookInDB:
         async with self.db.transaction():
             if not book_update.title:
@@ -232,8 +274,8 @@ class BooksRepository(BaseRepository):
         author_rows = await self.db.fetch_all(query=GET_BOOK_AUTHORS_BY_ID_QUERY, values={"book_id": book.id})
         return [author.get("author_name") for author in author_rows]
 
-    async def populate_book(self, *, book: BookInDB) -> BookPublic:
+    async def populate_book(self, *, book: BookInDB, fields: Optional[AbstractSet[str]] = None) -> BookPublic:
         return BookPublic(
             **book.dict(),
-            authors=await self.get_book_authors(book=book),
+            authors=await self.get_book_authors(book=book) if fields is None or "authors" in fields else [],
         )
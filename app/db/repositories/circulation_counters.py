@@ -0,0 +1,30 @@
+from databases import Database
+
+from app.db.repositories.base import BaseRepository
+from app.db.repositories.system_config import SystemConfigRepository
+from app.models.circulation import UserCirculationCounters, UserCirculationPublic
+
+# maintained by triggers on lendings and reservations, see change_circulation_counters
+GET_USER_CIRCULATION_COUNTERS_QUERY = """
+    SELECT active_lendings, active_reservations
+    FROM user_circulation_counters
+    WHERE user_id = :user_id;
+"""
+
+
+class CirculationCountersRepository(BaseRepository):
+    def __init__(self, db: Database) -> None:
+        super().__init__(db)
+        self.system_config_repo = SystemConfigRepository(db)
+
+    async def get_user_circulation(self, *, user_id: int) -> UserCirculationPublic:
+        counters_record = await self.db.fetch_one(
+            query=GET_USER_CIRCULATION_COUNTERS_QUERY, values={"user_id": user_id}
+        )
+        counters = UserCirculationCounters(**counters_record) if counters_record else UserCirculationCounters()
+        system_config = await self.system_config_repo.get_config()
+        return UserCirculationPublic(
+            **counters.dict(),
+            max_active_lendings=system_config.max_active_lendings,
+            max_active_reservations=system_config.max_active_reservations,
+        )
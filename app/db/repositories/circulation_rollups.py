@@ -0,0 +1,173 @@
+import datetime
+from typing import List, Optional
+
+from app.db.repositories.base import BaseRepository
+from app.models.circulation import (
+    CirculationDailyStatsPublic,
+    CirculationReportGrouping,
+    CirculationRollupRefreshPublic,
+)
+
+CIRCULATION_DAILY_STATS_WATERMARK = "circulation_daily_stats"
+
+# changes committed by transactions older than this may still be invisible when the watermark moves past them
+WATERMARK_LAG = datetime.timedelta(minutes=5)
+
+# days are UTC, same as the created_at partitions
+GET_WATERMARK_QUERY = """
+    SELECT watermark, now() - CAST(:lag AS interval) AS until
+    FROM rollup_watermarks
+    WHERE name = :name;
+"""
+
+UPDATE_WATERMARK_QUERY = """
+    UPDATE rollup_watermarks
+    SET watermark = :watermark
+    WHERE name = :name;
+"""
+
+LIST_CHANGED_DAYS_QUERY = """
+    SELECT day
+    FROM (
+        SELECT (created_at AT TIME ZONE 'UTC')::date AS day
+        FROM lendings
+        WHERE updated_at > :since AND updated_at <= :until
+        UNION
+        SELECT return_date
+        FROM lendings
+        WHERE updated_at > :since AND updated_at <= :until AND return_date IS NOT NULL
+        UNION
+        SELECT (created_at AT TIME ZONE 'UTC')::date
+        FROM reservations
+        WHERE updated_at > :since AND updated_at <= :until
+        UNION
+        SELECT (updated_at AT TIME ZONE 'UTC')::date
+        FROM reservations
+        WHERE updated_at > :since AND updated_at <= :until AND status = 'cancelled'
+    ) D
+    ORDER BY day;
+"""
+
+DELETE_DAILY_STATS_QUERY = """
+    DELETE FROM circulation_daily_stats
+    WHERE day = :day;
+"""
+
+# overdue is the number of lendings past their due date at the end of the day
+INSERT_DAILY_STATS_QUERY = """
+    INSERT INTO circulation_daily_stats (day, library_id, rack_id, loans, returns, holds_placed, holds_expired, overdue)
+    SELECT
+        CAST(:day AS date),
+        E.library_id,
+        E.rack_id,
+        sum(E.loans),
+        sum(E.returns),
+        sum(E.holds_placed),
+        sum(E.holds_expired),
+        sum(E.overdue)
+    FROM (
+        SELECT BI.library_id, BI.rack_id, 1 AS loans, 0 AS returns, 0 AS holds_placed, 0 AS holds_expired, 0 AS overdue
+        FROM lendings LE
+        LEFT JOIN book_items BI ON BI.id = LE.book_item_id
+        WHERE LE.created_at >= :day_start AND LE.created_at < :day_end
+        UNION ALL
+        SELECT BI.library_id, BI.rack_id, 0, 1, 0, 0, 0
+        FROM lendings LE
+        LEFT JOIN book_items BI ON BI.id = LE.book_item_id
+        WHERE LE.return_date = CAST(:day AS date)
+        UNION ALL
+        SELECT R.library_id, BI.rack_id, 0, 0, 1, 0, 0
+        FROM reservations R
+        LEFT JOIN book_items BI ON BI.id = R.book_item_id
+        WHERE R.created_at >= :day_start AND R.created_at < :day_end
+        UNION ALL
+        SELECT R.library_id, BI.rack_id, 0, 0, 0, 1, 0
+        FROM reservations R
+        LEFT JOIN book_items BI ON BI.id = R.book_item_id
+        WHERE R.updated_at >= :day_start AND R.updated_at < :day_end
+            AND R.status = 'cancelled'
+            AND R.due_date < CAST(:day AS date)
+        UNION ALL
+        SELECT BI.library_id, BI.rack_id, 0, 0, 0, 0, 1
+        FROM lendings LE
+        LEFT JOIN book_items BI ON BI.id = LE.book_item_id
+        WHERE LE.due_date < CAST(:day AS date)
+            AND (LE.return_date IS NULL OR LE.return_date > CAST(:day AS date))
+    ) E
+    GROUP BY E.library_id, E.rack_id;
+"""
+
+LIST_DAILY_STATS_QUERY_TEMPLATE = """
+    SELECT
+        day,
+        library_id,
+        {rack_column} AS rack_id,
+        sum(loans) AS loans,
+        sum(returns) AS returns,
+        sum(holds_placed) AS holds_placed,
+        sum(holds_expired) AS holds_expired,
+        sum(overdue) AS overdue
+    FROM circulation_daily_stats
+    WHERE day BETWEEN :start_date AND :end_date
+        AND (CAST(:library_id AS integer) IS NULL OR library_id = :library_id)
+    GROUP BY day, library_id, 3
+    ORDER BY day, library_id, 3;
+"""
+
+LIST_DAILY_STATS_QUERIES = {
+    CirculationReportGrouping.library: LIST_DAILY_STATS_QUERY_TEMPLATE.format(rack_column="NULL::integer"),
+    CirculationReportGrouping.rack: LIST_DAILY_STATS_QUERY_TEMPLATE.format(rack_column="rack_id"),
+}
+
+
+class CirculationRollupsRepository(BaseRepository):
+    """
+    Daily circulation aggregates, the raw tables are only read when refreshing them.
+    """
+
+    async def list_changed_days(self, *, since: datetime.datetime, until: datetime.datetime) -> List[datetime.date]:
+        day_records = await self.db.fetch_all(query=LIST_CHANGED_DAYS_QUERY, values={"since": since, "until": until})
+        return [day_record["day"] for day_record in day_records]
+
+    async def rollup_day(self, *, day: datetime.date) -> None:
+        day_start = datetime.datetime.combine(day, datetime.time.min, tzinfo=datetime.timezone.utc)
+        async with self.db.transaction():
+            await self.db.execute(query=DELETE_DAILY_STATS_QUERY, values={"day": day})
+            await self.db.execute(
+                query=INSERT_DAILY_STATS_QUERY,
+                values={"day": day, "day_start": day_start, "day_end": day_start + datetime.timedelta(days=1)},
+            )
+
+    async def refresh_rollups(self) -> CirculationRollupRefreshPublic:
+        """
+        Recompute the days touched by rows updated since the watermark, and always today and yesterday,
+        whose overdue counts move without any row changing.
+        """
+        watermark_record = await self.db.fetch_one(
+            query=GET_WATERMARK_QUERY, values={"name": CIRCULATION_DAILY_STATS_WATERMARK, "lag": WATERMARK_LAG}
+        )
+        until = watermark_record["until"]
+        today = datetime.datetime.now(datetime.timezone.utc).date()
+        days = set(await self.list_changed_days(since=watermark_record["watermark"], until=until))
+        days.update((today - datetime.timedelta(days=1), today))
+
+        for day in sorted(days):
+            await self.rollup_day(day=day)
+        await self.db.execute(
+            query=UPDATE_WATERMARK_QUERY, values={"name": CIRCULATION_DAILY_STATS_WATERMARK, "watermark": until}
+        )
+        return CirculationRollupRefreshPublic(days=sorted(days))
+
+    async def list_daily_stats(
+        self,
+        *,
+        start_date: datetime.date,
+        end_date: datetime.date,
+        library_id: Optional[int] = None,
+        group_by: CirculationReportGrouping = CirculationReportGrouping.library,
+    ) -> List[CirculationDailyStatsPublic]:
+        stats_records = await self.db.fetch_all(
+            query=LIST_DAILY_STATS_QUERIES[group_by],
+            values={"start_date": start_date, "end_date": end_date, "library_id": library_id},
+        )
+        return [CirculationDailyStatsPublic(**stats_record) for stats_record in stats_records]
@@ -0,0 +1,104 @@
+from typing import AsyncIterator, Mapping, Optional
+
+from app.db.repositories.base import BaseRepository
+
+# exports read through a server-side cursor, so every query streams in primary key order without a sort
+BOOK_EXPORT_COLUMNS = (
+    "id",
+    "isbn",
+    "title",
+    "description",
+    "publisher",
+    "page_count",
+    "publish_date",
+    "authors",
+    "created_at",
+    "updated_at",
+)
+
+EXPORT_BOOKS_QUERY = """
+    SELECT
+        B.id,
+        B.isbn,
+        B.title,
+        B.description,
+        B.publisher,
+        B.page_count,
+        B.publish_date,
+        ARRAY(
+            SELECT BA.author_name FROM books_to_authors BA WHERE BA.book_id = B.id ORDER BY BA.author_name
+        ) AS authors,
+        B.created_at,
+        B.updated_at
+    FROM books B
+    ORDER BY B.id;
+"""
+
+BOOK_ITEM_EXPORT_COLUMNS = (
+    "id",
+    "barcode",
+    "condition",
+    "status",
+    "book_id",
+    "library_id",
+    "rack_id",
+    "created_at",
+    "updated_at",
+)
+
+EXPORT_BOOK_ITEMS_QUERY = """
+    SELECT id, barcode, condition, status, book_id, library_id, rack_id, created_at, updated_at
+    FROM book_items
+    WHERE CAST(:library_id AS integer) IS NULL OR library_id = :library_id
+    ORDER BY id;
+"""
+
+LENDING_EXPORT_COLUMNS = (
+    "id",
+    "user_id",
+    "book_item_id",
+    "reservation_id",
+    "due_date",
+    "return_date",
+    "fee",
+    "created_at",
+    "updated_at",
+)
+
+EXPORT_LENDINGS_QUERY = """
+    SELECT id, user_id, book_item_id, reservation_id, due_date, return_date, fee, created_at, updated_at
+    FROM lendings
+    ORDER BY id;
+"""
+
+USER_EXPORT_COLUMNS = (
+    "id",
+    "username",
+    "email",
+    "email_verified",
+    "role",
+    "status",
+    "library_card_number",
+    "created_at",
+    "updated_at",
+)
+
+EXPORT_USERS_QUERY = """
+    SELECT id, username, email, email_verified, role, status, library_card_number, created_at, updated_at
+    FROM users
+    ORDER BY id;
+"""
+
+
+class ExportsRepository(BaseRepository):
+    def iterate_books(self) -> AsyncIterator[Mapping]:
+        return self.db.iterate(query=EXPORT_BOOKS_QUERY)
+
+    def iterate_book_items(self, *, library_id: Optional[int] = None) -> AsyncIterator[Mapping]:
+        return self.db.iterate(query=EXPORT_BOOK_ITEMS_QUERY, values={"library_id": library_id})
+
+    def iterate_lendings(self) -> AsyncIterator[Mapping]:
+        return self.db.iterate(query=EXPORT_LENDINGS_QUERY)
+
+    def iterate_users(self) -> AsyncIterator[Mapping]:
+        return self.db.iterate(query=EXPORT_USERS_QUERY)
@@ -0,0 +1,125 @@
+from decimal import Decimal
+from typing import List
+
+from databases import Database
+
+from app.core.config import FEE_ACCRUAL_BATCH_SIZE
+from app.db.repositories.base import BaseRepository
+from app.db.repositories.lendings import LENDING_FEE_EXPRESSION
+from app.db.repositories.system_config import SystemConfigRepository
+from app.models.fee import (
+    FeeAccrualPublic,
+    FeeLedgerEntryInDB,
+    LibraryFeeTotalPublic,
+    ListOfFeeLedgerEntriesPublic,
+    UserFeeBalancePublic,
+    ListOfUserFeeBalancesPublic,
+)
+
+# ledger entries and balances are written by the record_fee_ledger_entry trigger
+ACCRUE_FEES_QUERY = f"""
+    WITH overdue_lendings AS (
+        SELECT LE.id, LE.created_at, LE.accrued_fee
+        FROM lendings LE
+        WHERE LE.return_date IS NULL
+            AND LE.due_date < current_date
+            AND LE.accrued_fee <> {LENDING_FEE_EXPRESSION}
+        ORDER BY LE.id
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    ), accrued_lendings AS (
+        UPDATE lendings LE
+        SET accrued_fee = {LENDING_FEE_EXPRESSION}
+        FROM overdue_lendings OL
+        WHERE LE.id = OL.id
+            AND LE.created_at = OL.created_at
+        RETURNING LE.accrued_fee - OL.accrued_fee AS amount
+    )
+    SELECT count(*) AS lendings_count, COALESCE(sum(amount), 0) AS amount
+    FROM accrued_lendings;
+"""
+
+LIST_USER_FEE_BALANCES_QUERY = """
+    SELECT
+        C.user_id,
+        U.username,
+        U.library_card_number,
+        C.fee_balance,
+        count(*) OVER() AS query_count
+    FROM user_circulation_counters C
+    JOIN users U ON U.id = C.user_id
+    WHERE C.fee_balance > 0
+        AND C.fee_balance >= CAST(:min_balance AS numeric)
+    ORDER BY C.fee_balance DESC, C.user_id
+    LIMIT :limit
+    OFFSET :offset;
+"""
+
+LIST_LIBRARY_FEE_TOTALS_QUERY = """
+    SELECT T.library_id, L.name AS library_name, T.outstanding_fees
+    FROM (
+        SELECT library_id, sum(amount) AS outstanding_fees
+        FROM fee_ledger
+        GROUP BY library_id
+    ) T
+    LEFT JOIN libraries L ON L.id = T.library_id
+    ORDER BY T.outstanding_fees DESC, T.library_id;
+"""
+
+LIST_USER_FEE_LEDGER_QUERY = """
+    SELECT id, user_id, lending_id, library_id, amount, created_at, count(*) OVER() AS query_count
+    FROM fee_ledger
+    WHERE user_id = :user_id
+    ORDER BY created_at DESC, id DESC
+    LIMIT :limit
+    OFFSET :offset;
+"""
+
+
+class FeesRepository(BaseRepository):
+    def __init__(self, db: Database) -> None:
+        super().__init__(db)
+        self.system_config_repo = SystemConfigRepository(db)
+
+    async def accrue_fees(self, *, batch_size: int = FEE_ACCRUAL_BATCH_SIZE) -> FeeAccrualPublic:
+        """
+        Bring accrued_fee of overdue lendings up to date, writing the difference to the fee ledger.
+        """
+        system_config = await self.system_config_repo.get_config()
+        accrual = FeeAccrualPublic(lendings_count=0, amount=0)
+        while True:
+            batch_record = await self.db.fetch_one(
+                query=ACCRUE_FEES_QUERY,
+                values={"lending_daily_fee": system_config.lending_daily_fee, "batch_size": batch_size},
+            )
+            accrual.lendings_count += batch_record["lendings_count"]
+            accrual.amount += batch_record["amount"]
+            if batch_record["lendings_count"] < batch_size:
+                return accrual
+
+    async def list_user_fee_balances(
+        self, *, min_balance: Decimal, limit: int = 20, offset: int = 0
+    ) -> ListOfUserFeeBalancesPublic:
+        balance_records = await self.db.fetch_all(
+            query=LIST_USER_FEE_BALANCES_QUERY,
+            values={"min_balance": min_balance, "limit": limit, "offset": offset},
+        )
+        return ListOfUserFeeBalancesPublic(
+            balances=[UserFeeBalancePublic(**balance_record) for balance_record in balance_records],
+            balances_count=balance_records[0].get("query_count") if balance_records else 0,
+        )
+
+    async def list_library_fee_totals(self) -> List[LibraryFeeTotalPublic]:
+        total_records = await self.db.fetch_all(query=LIST_LIBRARY_FEE_TOTALS_QUERY)
+        return [LibraryFeeTotalPublic(**total_record) for total_record in total_records]
+
+    async def list_user_fee_ledger(
+        self, *, user_id: int, limit: int = 20, offset: int = 0
+    ) -> ListOfFeeLedgerEntriesPublic:
+        entry_records = await self.db.fetch_all(
+            query=LIST_USER_FEE_LEDGER_QUERY, values={"user_id": user_id, "limit": limit, "offset": offset}
+        )
+        return ListOfFeeLedgerEntriesPublic(
+            entries=[FeeLedgerEntryInDB(**entry_record) for entry_record in entry_records],
+            entries_count=entry_records[0].get("query_count") if entry_records else 0,
+        )
@@ -0,0 +1,71 @@
+from datetime import datetime
+from typing import Optional
+
+from app.db.repositories.base import BaseRepository
+from app.models.job_run import JobRunInDB, JobRunStatus
+
+# first key of the two-key advisory locks held by scheduler leaders, the second one is hashtext(job_name)
+JOB_ADVISORY_LOCK_CLASS = 7_301
+
+TRY_LOCK_JOB_QUERY = """
+    SELECT pg_try_advisory_lock(:lock_class, hashtext(:job_name));
+"""
+
+UNLOCK_JOB_QUERY = """
+    SELECT pg_advisory_unlock(:lock_class, hashtext(:job_name));
+"""
+
+CLAIM_JOB_RUN_QUERY = """
+    INSERT INTO job_runs (job_name, scheduled_for, status, worker)
+    VALUES (:job_name, :scheduled_for, :status, :worker)
+    ON CONFLICT (job_name, scheduled_for) DO NOTHING
+    RETURNING id, job_name, scheduled_for, status, worker, started_at, finished_at, duration_ms, error;
+"""
+
+FINISH_JOB_RUN_QUERY = """
+    UPDATE job_runs
+    SET status = :status,
+        finished_at = now(),
+        duration_ms = :duration_ms,
+        error = :error
+    WHERE id = :id
+    RETURNING id, job_name, scheduled_for, status, worker, started_at, finished_at, duration_ms, error;
+"""
+
+
+class JobRunsRepository(BaseRepository):
+    """
+    Advisory locks are session level, so lock, claim, job and unlock must share one connection.
+    """
+
+    async def try_lock_job(self, *, job_name: str) -> bool:
+        return await self.db.fetch_val(
+            query=TRY_LOCK_JOB_QUERY, values={"lock_class": JOB_ADVISORY_LOCK_CLASS, "job_name": job_name}
+        )
+
+    async def unlock_job(self, *, job_name: str) -> None:
+        await self.db.fetch_val(
+            query=UNLOCK_JOB_QUERY, values={"lock_class": JOB_ADVISORY_LOCK_CLASS, "job_name": job_name}
+        )
+
+    async def claim_job_run(self, *, job_name: str, scheduled_for: datetime, worker: str) -> Optional[JobRunInDB]:
+        job_run_record = await self.db.fetch_one(
+            query=CLAIM_JOB_RUN_QUERY,
+            values={
+                "job_name": job_name,
+                "scheduled_for": scheduled_for,
+                "status": JobRunStatus.running,
+                "worker": worker,
+            },
+        )
+        if job_run_record:
+            return JobRunInDB(**job_run_record)
+
+    async def finish_job_run(
+        self, *, job_run: JobRunInDB, status: JobRunStatus, duration_ms: int, error: Optional[str] = None
+    ) -> JobRunInDB:
+        job_run_record = await self.db.fetch_one(
+            query=FINISH_JOB_RUN_QUERY,
+            values={"id": job_run.id, "status": status, "duration_ms": duration_ms, "error": error},
+        )
+        return JobRunInDB(**job_run_record)
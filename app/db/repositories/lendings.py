@@ -1,31 +1,65 @@
-from datetime import date
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 
 from databases import Database
 from fastapi import HTTPException
 from starlette import status
 
-from app.db.repositories.base import BaseRepository
+from app.db.repositories.base import BaseRepository, db_function_errors_as_http, retry_on_conflict
 from app.db.repositories.book_items import BookItemsRepository
 from app.db.repositories.system_config import SystemConfigRepository
 from app.db.repositories.users import UsersRepository
-from app.models.book_item import BookItemStatus
-from app.models.lending import LendingCreate, LendingInDB, ListOfLendingsPublic
-from app.models.user import UserStatus
+from app.models.lending import (
+    LendingCreate,
+    LendingInDB,
+    ListOfLendingsPublic,
+    LendingBatchCreate,
+    LendingBatchComplete,
+    LendingBatchItemStatus,
+    LendingBatchItemResult,
+    LendingBatchResultPublic,
+)
+from app.models.user import UserInDB, UserStatus
 
+# the row lock makes concurrent checkouts of one item wait, then re-check its status and insert nothing
 CREATE_LENDING_QUERY = """
+    WITH available_book_item AS (
+        SELECT id
+        FROM book_items
+        WHERE id = :book_item_id
+            AND status = 'available'
+        FOR UPDATE
+    )
     INSERT INTO lendings (user_id, book_item_id, reservation_id, due_date)
-    VALUES (:user_id, :book_item_id, :reservation_id, current_date + (SELECT lending_due_day from system_config) * INTERVAL '1 day')
+    SELECT :user_id, ABI.id, :reservation_id, current_date + CAST(:lending_due_day AS integer) * INTERVAL '1 day'
+    FROM available_book_item ABI
     RETURNING id, user_id, book_item_id, reservation_id, due_date, return_date, fee, created_at, updated_at;
 """
 
-GET_LENDING_BY_ID_QUERY = """
-    SELECT id, user_id, book_item_id, reservation_id, due_date, return_date, fee, created_at, updated_at
-    FROM lendings
-    WHERE id = :id;
+# fee is frozen once a lending is completed, until then it accrues daily past the due date
+LENDING_FEE_EXPRESSION = """
+    CASE
+        WHEN LE.fee IS NOT NULL THEN LE.fee
+        WHEN COALESCE(LE.return_date, current_date) > LE.due_date
+            THEN (COALESCE(LE.return_date, current_date) - LE.due_date) * CAST(:lending_daily_fee AS numeric)
+    END
 """
 
-LIST_LENDINGS_QUERY_START = """
+GET_LENDING_BY_ID_QUERY = f"""
+    SELECT
+        LE.id,
+        LE.user_id,
+        LE.book_item_id,
+        LE.reservation_id,
+        LE.due_date,
+        LE.return_date,
+        {LENDING_FEE_EXPRESSION} AS fee,
+        LE.created_at,
+        LE.updated_at
+    FROM lendings LE
+    WHERE LE.id = :id;
+"""
+
+LIST_LENDINGS_QUERY_START = f"""
     SELECT 
         LE.id,
         LE.user_id,
@@ -33,21 +67,96 @@ LIST_LENDINGS_QUERY_START = """
         LE.reservation_id,
         LE.due_date,
         LE.return_date,
-        LE.fee,
+        {LENDING_FEE_EXPRESSION} AS fee,
         LE.created_at,
         LE.updated_at,
         count(*) OVER() AS query_count
     FROM lendings LE
 """
 
-UPDATE_LENDING_BY_ID_QUERY = """
-    UPDATE lendings
-    SET return_date = :return_date,
-        fee = :fee
-    WHERE id = :id
-    RETURNING id, user_id, book_item_id, reservation_id, due_date, return_date, fee, created_at, updated_at;
+COMPLETE_LENDING_BY_ID_QUERY = f"""
+    UPDATE lendings LE
+    SET return_date = current_date,
+        fee = COALESCE({LENDING_FEE_EXPRESSION}, 0)
+    WHERE LE.id = :id
+        AND LE.return_date IS NULL
+    RETURNING
+        LE.id,
+        LE.user_id,
+        LE.book_item_id,
+        LE.reservation_id,
+        LE.due_date,
+        LE.return_date,
+        LE.fee,
+        LE.created_at,
+        LE.updated_at;
+"""
+
+# barcodes are resolved and lent in one statement, locking rows in id order so concurrent batches cannot deadlock
+CREATE_LENDINGS_BATCH_QUERY = """
+    WITH scanned AS (
+        SELECT barcode, scan_order
+        FROM unnest(CAST(:barcodes AS text[])) WITH ORDINALITY AS S(barcode, scan_order)
+    ), available_book_items AS (
+        SELECT id
+        FROM book_items
+        WHERE barcode = ANY(CAST(:barcodes AS text[]))
+            AND status = 'available'
+        ORDER BY id
+        FOR UPDATE
+    ), created_lendings AS (
+        INSERT INTO lendings (user_id, book_item_id, due_date)
+        SELECT CAST(:user_id AS integer), ABI.id, current_date + CAST(:lending_due_day AS integer) * INTERVAL '1 day'
+        FROM available_book_items ABI
+        RETURNING id, user_id, book_item_id, reservation_id, due_date, return_date, fee, created_at, updated_at
+    )
+    SELECT
+        S.barcode,
+        BI.id IS NOT NULL AS book_item_found,
+        CL.*
+    FROM scanned S
+    LEFT JOIN book_items BI ON BI.barcode = S.barcode
+    LEFT JOIN created_lendings CL ON CL.book_item_id = BI.id
+    ORDER BY S.scan_order;
+"""
+
+COMPLETE_LENDINGS_BATCH_QUERY = f"""
+    WITH scanned AS (
+        SELECT barcode, scan_order
+        FROM unnest(CAST(:barcodes AS text[])) WITH ORDINALITY AS S(barcode, scan_order)
+    ), completed_lendings AS (
+        UPDATE lendings LE
+        SET return_date = current_date,
+            fee = COALESCE({LENDING_FEE_EXPRESSION}, 0)
+        FROM book_items BI
+        WHERE BI.barcode = ANY(CAST(:barcodes AS text[]))
+            AND LE.book_item_id = BI.id
+            AND LE.return_date IS NULL
+            AND (CAST(:user_id AS integer) IS NULL OR LE.user_id = CAST(:user_id AS integer))
+        RETURNING
+            LE.id,
+            LE.user_id,
+            LE.book_item_id,
+            LE.reservation_id,
+            LE.due_date,
+            LE.return_date,
+            LE.fee,
+            LE.created_at,
+            LE.updated_at
+    )
+    SELECT
+        S.barcode,
+        BI.id IS NOT NULL AS book_item_found,
+        CL.*
+    FROM scanned S
+    LEFT JOIN book_items BI ON BI.barcode = S.barcode
+    LEFT JOIN completed_lendings CL ON CL.book_item_id = BI.id
+    ORDER BY S.scan_order;
 """
 
+# filters that only shape the query and are not bound as values
+LENDING_QUERY_ONLY_FILTERS = {"returned", "has_fee", "order_by_fee"}
+
 
 async def list_lendings_filtered_query(lending_filters: Dict, add_semicolon=True):
     where_query_parts = []
@@ -61,15 +170,21 @@ async def list_lendings_filtered_query(lending_filters: Dict, add_semicolon=True
     if lending_filters.get("reservation_id"):
         where_query_parts.append("LE.reservation_id = :reservation_id")
     if lending_filters.get("due_by"):
-        where_query_parts.append("LE.due_date < :due_by")
-    if returned := lending_filters.get("returned"):
-        where_query_parts.append(f"LE.return_date IS {'' if returned else 'NOT'} NULL")
+        # due dates never precede creation, so the created_at bound only prunes partitions
+        where_query_parts.append("LE.due_date < :due_by AND LE.created_at < CAST(:due_by AS date)")
+    if (returned := lending_filters.get("returned")) is not None:
+        where_query_parts.append(f"LE.return_date IS {'NOT' if returned else ''} NULL")
+    if (has_fee := lending_filters.get("has_fee")) is not None:
+        where_query_parts.append(f"COALESCE({LENDING_FEE_EXPRESSION}, 0) {'>' if has_fee else '='} 0")
 
     if where_query_parts:
         query += " WHERE "
         query += " AND ".join(where_query_parts)
 
-    query += " ORDER BY LE.id "
+    if lending_filters.get("order_by_fee"):
+        query += f" ORDER BY {LENDING_FEE_EXPRESSION} DESC NULLS LAST, LE.id "
+    else:
+        query += " ORDER BY LE.id "
 
     if lending_filters.get("limit") is not None:
         query += " LIMIT :limit "
@@ -85,46 +200,65 @@ async def list_lendings_filtered_query(lending_filters: Dict, add_semicolon=True
 class LendingsRepository(BaseRepository):
     def __init__(self, db: Database) -> None:
         super().__init__(db)
-        self.system_config_repo = SystemConfigRepository(db)
         self.users_repo = UsersRepository(db)
         self.book_items_repo = BookItemsRepository(db)
+        self.system_config_repo = SystemConfigRepository(db)
+
+    async def get_lending_user(
+        self, *, user_id: Optional[int] = None, library_card_number: Optional[str] = None
+    ) -> UserInDB:
+        if user_id:
+            user = await self.users_repo.get_user_by_id(id=user_id)
+        else:
+            user = await self.users_repo.get_user_by_library_card_number(library_card_number=library_card_number)
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="No user found with that id." if user_id else "No user found with that library card number.",
+            )
+        if user.status != UserStatus.active:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Given user is not active.",
+            )
+        return user
 
+    @retry_on_conflict()
     async def create_lending(self, *, new_lending: LendingCreate, reservation_id: Optional[int] = None) -> LendingInDB:
         async with self.db.transaction():
-            user = await self.users_repo.get_user_by_id(id=new_lending.user_id)
-            if not user:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="No user found with that id.",
-                )
-            if user.status != UserStatus.active:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Given user is not active.",
-                )
+            await self.get_lending_user(user_id=new_lending.user_id)
 
             book_item = await self.book_items_repo.get_book_item_by_id(id=new_lending.book_item_id)
             if not book_item:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
-                    detail="No user found with that id.",
+                    detail="No book item found with that id.",
+                )
+
+            system_config = await self.system_config_repo.get_config()
+            with db_function_errors_as_http():
+                created_lending_record = await self.db.fetch_one(
+                    query=CREATE_LENDING_QUERY,
+                    values={
+                        **new_lending.dict(),
+                        "reservation_id": reservation_id,
+                        "lending_due_day": system_config.lending_due_day,
+                    },
                 )
-            if book_item.status != BookItemStatus.available:
+            if not created_lending_record:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="Given book item is unavailable.",
                 )
-
-            created_lending_record = await self.db.fetch_one(
-                query=CREATE_LENDING_QUERY, values={**new_lending.dict(), "reservation_id": reservation_id}
-            )
-            return await self.populate_fee(lending=LendingInDB(**created_lending_record))
+            return LendingInDB(**created_lending_record)
 
     async def get_lending_by_id(self, *, id: int) -> LendingInDB:
-        async with self.db.transaction():
-            lending_record = await self.db.fetch_one(query=GET_LENDING_BY_ID_QUERY, values={"id": id})
-            if lending_record:
-                return await self.populate_fee(lending=LendingInDB(**lending_record))
+        system_config = await self.system_config_repo.get_config()
+        lending_record = await self.db.fetch_one(
+            query=GET_LENDING_BY_ID_QUERY, values={"id": id, "lending_daily_fee": system_config.lending_daily_fee}
+        )
+        if lending_record:
+            return LendingInDB(**lending_record)
 
     async def list_lendings(self, *, lending_filters: Dict, limit: int = 20, offset: int = 0) -> ListOfLendingsPublic:
         if lending_filters is None:
@@ -135,38 +269,92 @@ class LendingsRepository(BaseRepository):
 
         list_lendings_query = await list_lendings_filtered_query(lending_filters=lending_filters, add_semicolon=False)
 
+        system_config = await self.system_config_repo.get_config()
         lending_records = await self.db.fetch_all(
             query=list_lendings_query,
-            values=lending_filters,
+            values={
+                **{key: value for key, value in lending_filters.items() if key not in LENDING_QUERY_ONLY_FILTERS},
+                "lending_daily_fee": system_config.lending_daily_fee,
+            },
         )
 
         return ListOfLendingsPublic(
-            lendings=[
-                await self.populate_fee(lending=LendingInDB(**lending_record)) for lending_record in lending_records
-            ],
+            lendings=[LendingInDB(**lending_record) for lending_record in lending_records],
             lendings_count=lending_records[0].get("query_count") if lending_records else 0,
         )
 
     async def complete_lending(self, *, lending: LendingInDB) -> LendingInDB:
-        async with self.db.transaction():
-            if lending.return_date:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Lending is already completed.",
-                )
-            lending_with_fee = await self.populate_fee(lending=lending)
-            lending_record = await self.db.fetch_one(
-                query=UPDATE_LENDING_BY_ID_QUERY,
-                values={"id": lending.id, "return_date": date.today(), "fee": lending_with_fee.fee},
+        if lending.return_date:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Lending is already completed.",
             )
-            return LendingInDB(**lending_record)
+        system_config = await self.system_config_repo.get_config()
+        lending_record = await self.db.fetch_one(
+            query=COMPLETE_LENDING_BY_ID_QUERY,
+            values={"id": lending.id, "lending_daily_fee": system_config.lending_daily_fee},
+        )
+        if not lending_record:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Lending is already completed.",
+            )
+        return LendingInDB(**lending_record)
 
-    async def populate_fee(self, *, lending: LendingInDB) -> LendingInDB:
-        if lending.fee is not None:
-            return lending
+    @retry_on_conflict()
+    async def create_lendings_batch(self, *, lendings_batch: LendingBatchCreate) -> LendingBatchResultPublic:
+        user = await self.get_lending_user(
+            user_id=lendings_batch.user_id, library_card_number=lendings_batch.library_card_number
+        )
+        system_config = await self.system_config_repo.get_config()
+        # exceeding the user's lending limit fails the whole batch
+        with db_function_errors_as_http():
+            batch_records = await self.db.fetch_all(
+                query=CREATE_LENDINGS_BATCH_QUERY,
+                values={
+                    "barcodes": lendings_batch.barcodes,
+                    "user_id": user.id,
+                    "lending_due_day": system_config.lending_due_day,
+                },
+            )
+        return build_lending_batch_result(batch_records, done_status=LendingBatchItemStatus.created)
+
+    @retry_on_conflict()
+    async def complete_lendings_batch(self, *, lendings_batch: LendingBatchComplete) -> LendingBatchResultPublic:
+        user_id = None
+        if lendings_batch.user_id or lendings_batch.library_card_number:
+            user_id = (
+                await self.get_lending_user(
+                    user_id=lendings_batch.user_id, library_card_number=lendings_batch.library_card_number
+                )
+            ).id
+        system_config = await self.system_config_repo.get_config()
+        batch_records = await self.db.fetch_all(
+            query=COMPLETE_LENDINGS_BATCH_QUERY,
+            values={
+                "barcodes": lendings_batch.barcodes,
+                "user_id": user_id,
+                "lending_daily_fee": system_config.lending_daily_fee,
+            },
+        )
+        return build_lending_batch_result(batch_records, done_status=LendingBatchItemStatus.completed)
 
-        diff = date.today() - lending.due_date
-        if diff.days > 0:
-            lending.fee = diff.days * (await self.system_config_repo.get_config()).lending_daily_fee
 
-        return lending
+def build_lending_batch_result(batch_records: List, *, done_status: LendingBatchItemStatus) -> LendingBatchResultPublic:
+    not_done_status = (
+        LendingBatchItemStatus.unavailable
+        if done_status == LendingBatchItemStatus.created
+        else LendingBatchItemStatus.not_loaned
+    )
+    results = []
+    for batch_record in batch_records:
+        if batch_record["id"] is not None:
+            result = LendingBatchItemResult(
+                barcode=batch_record["barcode"], status=done_status, lending=LendingInDB(**batch_record)
+            )
+        elif not batch_record["book_item_found"]:
+            result = LendingBatchItemResult(barcode=batch_record["barcode"], status=LendingBatchItemStatus.not_found)
+        else:
+            result = LendingBatchItemResult(barcode=batch_record["barcode"], status=not_done_status)
+        results.append(result)
+    return LendingBatchResultPublic(results=results)
@@ -1,10 +1,10 @@
-from typing import List
+from typing import AbstractSet, List, Mapping, Optional
 
 from databases import Database
 
 from app.db.repositories.addresses import AddressesRepository
-from app.db.repositories.base import BaseRepository
-from app.models.address import AddressCreate
+from app.db.repositories.base import BaseRepository, in_ids_order, select_columns
+from app.models.address import AddressCreate, AddressPublic
 from app.models.library import LibraryInDB, LibraryPublic, LibraryCreate, LibraryUpdate
 
 CREATE_LIBRARY_QUERY = """
@@ -19,19 +19,37 @@ GET_LIBRARY_BY_ID_QUERY = """
     WHERE id = :id;
 """
 
+LIBRARY_COLUMNS = ("id", "name", "description", "created_at", "updated_at")
+
 LIST_LIBRARIES_QUERY = """
-    SELECT 
-        id, 
-        name,
-        description, 
-        created_at, 
-        updated_at
+    SELECT {columns}
     FROM libraries
     ORDER BY libraries.id
     LIMIT :limit
     OFFSET :offset;
 """
 
+GET_LIBRARIES_BY_IDS_QUERY = """
+    SELECT
+        L.id,
+        L.name,
+        L.description,
+        L.created_at,
+        L.updated_at,
+        A.id AS address_id,
+        A.street_addr AS address_street_addr,
+        A.city AS address_city,
+        A.state AS address_state,
+        A.zipcode AS address_zipcode,
+        A.country AS address_country,
+        A.created_at AS address_created_at,
+        A.updated_at AS address_updated_at
+    FROM libraries L
+    LEFT JOIN libraries_to_addresses LA ON LA.library_id = L.id
+    LEFT JOIN addresses A ON A.id = LA.address_id
+    WHERE L.id = ANY(CAST(:ids AS integer[]));
+"""
+
 COUNT_LIBRARY_ROWS_QUERY = """
     SELECT COUNT(*) FROM libraries;
 """
@@ -50,6 +68,12 @@ DELETE_LIBRARY_BY_ID_QUERY = """
 """
 
 
+def address_from_record(record: Mapping) -> Optional[AddressPublic]:
+    if record["address_id"] is None:
+        return None
+    return AddressPublic(**{field: record[f"address_{field}"] for field in AddressPublic.__fields__})
+
+
 class LibrariesRepository(BaseRepository):
     def __init__(self, db: Database) -> None:
         super().__init__(db)
@@ -82,14 +106,26 @@ class LibrariesRepository(BaseRepository):
         limit: int = 20,
         offset: int = 0,
         populate: bool = True,
+        fields: Optional[AbstractSet[str]] = None,
     ) -> List[LibraryInDB]:
-        library_records = await self.db.fetch_all(query=LIST_LIBRARIES_QUERY, values={"limit": limit, "offset": offset})
+        library_records = await self.db.fetch_all(
+            query=LIST_LIBRARIES_QUERY.format(columns=select_columns(LIBRARY_COLUMNS, fields)),
+            values={"limit": limit, "offset": offset},
+        )
         if populate:
             return [
-                await self.populate_library(library=LibraryInDB(**library_record)) for library_record in library_records
+                await self.populate_library(library=LibraryInDB(**library_record), fields=fields)
+                for library_record in library_records
             ]
         return [LibraryInDB(**library_record) for library_record in library_records]
 
+    async def get_libraries_by_ids(self, *, ids: List[int]) -> List[LibraryPublic]:
+        library_records = await self.db.fetch_all(query=GET_LIBRARIES_BY_IDS_QUERY, values={"ids": ids})
+        return [
+            LibraryPublic(**library_record, address=address_from_record(library_record))
+            for library_record in in_ids_order(library_records, ids)
+        ]
+
     async def libraries_count(self):
         cursor = await self.db.fetch_one(query=COUNT_LIBRARY_ROWS_QUERY)
         return cursor.get("count")
@@ -113,8 +149,14 @@ class LibrariesRepository(BaseRepository):
             await self.addresses_repo.delete_library_address(library=library)
             await self.db.execute(query=DELETE_LIBRARY_BY_ID_QUERY, values={"id": library.id})
 
-    async def populate_library(self, *, library: LibraryInDB) -> LibraryPublic:
+    async def populate_library(
+        self, *, library: LibraryInDB, fields: Optional[AbstractSet[str]] = None
+    ) -> LibraryPublic:
         return LibraryPublic(
             **library.dict(),
-            address=await self.addresses_repo.get_address_by_library_id(library_id=library.id),
+            address=(
+                await self.addresses_repo.get_address_by_library_id(library_id=library.id)
+                if fields is None or "address" in fields
+                else None
+            ),
         )
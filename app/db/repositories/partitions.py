@@ -0,0 +1,93 @@
+import datetime
+import re
+from typing import List
+
+from app.db.repositories.base import BaseRepository
+from app.models.partition import PartitionMaintenancePublic
+
+# table -> condition of rows that keep a partition attached, table names are only ever taken from here
+PARTITIONED_TABLES = {
+    "reservations": "status IN ('pending', 'waiting')",
+    "lendings": "return_date IS NULL",
+}
+
+ARCHIVE_SCHEMA = "archive"
+
+PARTITION_NAME_PATTERN = re.compile(r"^(?P<table>[a-z_]+)_y(?P<year>\d{4})$")
+
+LIST_PARTITIONS_QUERY = """
+    SELECT C.relname AS name
+    FROM pg_inherits I
+    JOIN pg_class C ON C.oid = I.inhrelid
+    WHERE I.inhparent = CAST(:table AS regclass)
+    ORDER BY C.relname;
+"""
+
+CREATE_PARTITION_QUERY = """
+    CREATE TABLE IF NOT EXISTS {partition} PARTITION OF {table}
+    FOR VALUES FROM ('{year}-01-01 00:00:00+00') TO ('{next_year}-01-01 00:00:00+00');
+"""
+
+HAS_ACTIVE_ROWS_QUERY = """
+    SELECT EXISTS (SELECT 1 FROM {partition} WHERE {active_condition});
+"""
+
+ARCHIVE_PARTITION_QUERIES = (
+    "ALTER TABLE {table} DETACH PARTITION {partition};",
+    "ALTER TABLE {partition} SET SCHEMA {archive_schema};",
+)
+
+
+class PartitionsRepository(BaseRepository):
+    """
+    Yearly created_at partitions of PARTITIONED_TABLES.
+    """
+
+    async def list_partition_years(self, *, table: str) -> List[int]:
+        partition_records = await self.db.fetch_all(query=LIST_PARTITIONS_QUERY, values={"table": table})
+        return [
+            int(match.group("year"))
+            for partition_record in partition_records
+            if (match := PARTITION_NAME_PATTERN.match(partition_record["name"]))
+        ]
+
+    async def create_partitions(self, *, table: str, until_year: int) -> List[str]:
+        years = await self.list_partition_years(table=table)
+        created = []
+        for year in range(max(years, default=until_year) + 1, until_year + 1):
+            partition = f"{table}_y{year}"
+            await self.db.execute(
+                query=CREATE_PARTITION_QUERY.format(table=table, partition=partition, year=year, next_year=year + 1)
+            )
+            created.append(partition)
+        return created
+
+    async def archive_partitions(self, *, table: str, before_year: int) -> List[str]:
+        """
+        Detach partitions older than `before_year` into ARCHIVE_SCHEMA, skipping any that still hold active rows.
+        """
+        archived = []
+        for year in await self.list_partition_years(table=table):
+            partition = f"{table}_y{year}"
+            if year >= before_year or await self.db.fetch_val(
+                query=HAS_ACTIVE_ROWS_QUERY.format(partition=partition, active_condition=PARTITIONED_TABLES[table])
+            ):
+                continue
+            async with self.db.transaction():
+                for query in ARCHIVE_PARTITION_QUERIES:
+                    await self.db.execute(
+                        query=query.format(table=table, partition=partition, archive_schema=ARCHIVE_SCHEMA)
+                    )
+            archived.append(partition)
+        return archived
+
+    async def maintain_partitions(self, *, years_ahead: int, archive_after_years: int) -> PartitionMaintenancePublic:
+        current_year = datetime.datetime.now(datetime.timezone.utc).year
+        maintenance = PartitionMaintenancePublic(created=[], archived=[])
+        for table in PARTITIONED_TABLES:
+            maintenance.created += await self.create_partitions(table=table, until_year=current_year + years_ahead)
+            if archive_after_years:
+                maintenance.archived += await self.archive_partitions(
+                    table=table, before_year=current_year - archive_after_years
+                )
+        return maintenance
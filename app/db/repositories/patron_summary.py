@@ -0,0 +1,71 @@
+from databases import Database
+
+from app.db.repositories.base import BaseRepository
+from app.db.repositories.lendings import LENDING_FEE_EXPRESSION
+from app.db.repositories.system_config import SystemConfigRepository
+
+# the whole summary is built as json by postgres, so it is sent to the client as is
+GET_PATRON_SUMMARY_QUERY = f"""
+    WITH profile AS (
+        SELECT id, email, username, email_verified, role, status, library_card_number, created_at, updated_at
+        FROM users
+        WHERE id = :user_id
+    ),
+    active_reservations AS (
+        SELECT
+            R.id,
+            R.book_id,
+            B.title AS book_title,
+            R.library_id,
+            R.status,
+            R.book_item_id,
+            R.due_date,
+            R.created_at
+        FROM reservations R
+        LEFT JOIN books B ON B.id = R.book_id
+        WHERE R.user_id = :user_id
+            AND R.status IN ('pending', 'waiting')
+    ),
+    active_lendings AS (
+        SELECT
+            LE.id,
+            LE.book_item_id,
+            BI.book_id,
+            B.title AS book_title,
+            LE.due_date,
+            COALESCE({LENDING_FEE_EXPRESSION}, 0) AS fee,
+            LE.accrued_fee,
+            LE.created_at
+        FROM lendings LE
+        LEFT JOIN book_items BI ON BI.id = LE.book_item_id
+        LEFT JOIN books B ON B.id = BI.book_id
+        WHERE LE.user_id = :user_id
+            AND LE.return_date IS NULL
+    )
+    SELECT json_build_object(
+        'user', (SELECT row_to_json(P) FROM profile P),
+        'reservations', COALESCE(
+            (SELECT json_agg(AR ORDER BY AR.created_at, AR.id) FROM active_reservations AR), '[]'
+        ),
+        'lendings', COALESCE(
+            (SELECT jsonb_agg(to_jsonb(AL) - 'accrued_fee' ORDER BY AL.due_date, AL.id) FROM active_lendings AL), '[]'
+        ),
+        -- the ledger balance plus whatever accrued on active lendings since the last accrual run
+        'outstanding_balance',
+            COALESCE((SELECT fee_balance FROM user_circulation_counters WHERE user_id = :user_id), 0)
+            + (SELECT COALESCE(sum(AL.fee - AL.accrued_fee), 0) FROM active_lendings AL)
+    )::text;
+"""
+
+
+class PatronSummaryRepository(BaseRepository):
+    def __init__(self, db: Database) -> None:
+        super().__init__(db)
+        self.system_config_repo = SystemConfigRepository(db)
+
+    async def get_patron_summary_json(self, *, user_id: int) -> str:
+        system_config = await self.system_config_repo.get_config()
+        return await self.db.fetch_val(
+            query=GET_PATRON_SUMMARY_QUERY,
+            values={"user_id": user_id, "lending_daily_fee": system_config.lending_daily_fee},
+        )
@@ -1,20 +1,36 @@
 import datetime
-from typing import Dict
+import logging
+from typing import Dict, List, Optional
 
 from databases import Database
 from fastapi import HTTPException, status
 
-from app.db.repositories.base import BaseRepository
+from app.core.config import RESERVATION_EXPIRY_BATCH_SIZE
+from app.db.repositories.base import BaseRepository, db_function_errors_as_http, retry_on_conflict
 from app.db.repositories.book_items import BookItemsRepository
 from app.db.repositories.books import BooksRepository
 from app.db.repositories.lendings import LendingsRepository
 from app.db.repositories.libraries import LibrariesRepository
+from app.db.repositories.system_config import SystemConfigRepository
 from app.db.repositories.users import UsersRepository
 from app.models.book_item import BookItemStatus, BookItemInternalUpdate
-from app.models.lending import LendingInDB, LendingCreate
-from app.models.reservation import ReservationCreate, ReservationInDB, ReservationStatus, ListOfReservationsPublic
+from app.models.lending import LendingInDB
+from app.models.reservation import (
+    ReservationCreate,
+    ReservationInDB,
+    ReservationStatus,
+    ListOfReservationsPublic,
+    ExpiredReservationsPublic,
+)
 from app.models.user import UserInDB, UserStatus
 
+logger = logging.getLogger(__name__)
+
+# NOTIFY channel fired with the book item id whenever a book item becomes available
+BOOK_ITEM_AVAILABLE_CHANNEL = "book_item_available"
+# NOTIFY channel fired with "<reservation id>:<due date>" on status or due date changes, due date is empty unless waiting
+RESERVATION_DUE_CHANGED_CHANNEL = "reservation_due_changed"
+
 CREATE_RESERVATION_QUERY = """
     INSERT INTO reservations (book_id, library_id, user_id, status)
     VALUES (:book_id, :library_id, :user_id, :status)
@@ -46,11 +62,105 @@ UPDATE_RESERVATION_BY_ID_QUERY = """
     UPDATE reservations
     SET book_item_id = :book_item_id,
         status = :status,
-        due_date = current_date + (SELECT reservation_due_day from system_config) * INTERVAL '1 day'
+        due_date = current_date + CAST(:reservation_due_day AS integer) * INTERVAL '1 day'
     WHERE id = :id
     RETURNING id, book_id, library_id, user_id, status, book_item_id, due_date, created_at, updated_at;
 """
 
+FULFILL_RESERVATION_QUERY = """
+    SELECT id, book_id, library_id, user_id, status, book_item_id, due_date, created_at, updated_at
+    FROM fulfill_reservation(:reservation_id, :book_item_id, CAST(:reservation_due_day AS integer));
+"""
+
+EXPIRE_RESERVATIONS_QUERY_TEMPLATE = """
+    WITH due_reservations AS (
+        SELECT id
+        FROM reservations
+        WHERE status = 'waiting'
+            AND due_date < :due_by
+            AND created_at < CAST(:due_by AS date)
+            {reservation_filter}
+        ORDER BY id
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    ), expired_reservations AS (
+        UPDATE reservations R
+        SET status = 'cancelled'
+        FROM due_reservations DR
+        WHERE R.id = DR.id
+        RETURNING R.id, R.book_item_id
+    ), released_book_items AS (
+        UPDATE book_items BI
+        SET status = 'available'
+        FROM expired_reservations ER
+        WHERE BI.id = ER.book_item_id
+            AND BI.status NOT IN ('lost', 'written_off')
+        RETURNING BI.id
+    )
+    SELECT
+        (SELECT count(*) FROM expired_reservations) AS reservations_count,
+        (SELECT count(*) FROM released_book_items) AS book_items_count,
+        ARRAY(SELECT id FROM expired_reservations) AS reservation_ids;
+"""
+
+EXPIRE_DUE_RESERVATIONS_QUERY = EXPIRE_RESERVATIONS_QUERY_TEMPLATE.format(reservation_filter="")
+
+EXPIRE_RESERVATIONS_BY_ID_QUERY = EXPIRE_RESERVATIONS_QUERY_TEMPLATE.format(
+    reservation_filter="AND id = ANY(CAST(:reservation_ids AS integer[]))"
+)
+
+LIST_WAITING_RESERVATION_DUE_DATES_QUERY = """
+    SELECT id, due_date
+    FROM reservations
+    WHERE status = 'waiting'
+        AND due_date IS NOT NULL;
+"""
+
+COMPLETE_RESERVATION_QUERY = """
+    SELECT id, user_id, book_item_id, reservation_id, due_date, return_date, fee, created_at, updated_at
+    FROM complete_reservation(:reservation_id, CAST(:lending_due_day AS integer));
+"""
+
+# locks skip rows another worker is matching, so concurrent matchers never assign the same item or reservation twice
+MATCH_BOOK_ITEM_QUERY = """
+    WITH available_book_item AS (
+        SELECT id, book_id, library_id
+        FROM book_items
+        WHERE id = :book_item_id
+            AND status = 'available'
+        FOR UPDATE SKIP LOCKED
+    ), oldest_pending_reservation AS (
+        SELECT R.id AS reservation_id, ABI.id AS book_item_id
+        FROM reservations R
+        JOIN available_book_item ABI ON R.book_id = ABI.book_id AND R.library_id = ABI.library_id
+        WHERE R.status = 'pending'
+            AND R.book_item_id IS NULL
+        ORDER BY R.created_at, R.id
+        LIMIT 1
+        FOR UPDATE OF R SKIP LOCKED
+    )
+    SELECT F.id, F.book_id, F.library_id, F.user_id, F.status, F.book_item_id, F.due_date, F.created_at, F.updated_at
+    FROM oldest_pending_reservation OPR
+    CROSS JOIN LATERAL fulfill_reservation(
+        OPR.reservation_id, OPR.book_item_id, CAST(:reservation_due_day AS integer)
+    ) F;
+"""
+
+LIST_MATCHABLE_BOOK_ITEM_IDS_QUERY = """
+    SELECT BI.id
+    FROM book_items BI
+    WHERE BI.status = 'available'
+        AND EXISTS (
+            SELECT 1
+            FROM reservations R
+            WHERE R.book_id = BI.book_id
+                AND R.library_id = BI.library_id
+                AND R.status = 'pending'
+                AND R.book_item_id IS NULL
+        )
+    ORDER BY BI.id;
+"""
+
 
 async def list_reservations_filtered_query(reservation_filters: Dict, add_semicolon=True):
     where_query_parts = []
@@ -68,7 +178,8 @@ async def list_reservations_filtered_query(reservation_filters: Dict, add_semico
     if reservation_filters.get("status"):
         where_query_parts.append("R.status = :status")
     if reservation_filters.get("due_by"):
-        where_query_parts.append("R.due_date < :due_by")
+        # due dates never precede creation, so the created_at bound only prunes partitions
+        where_query_parts.append("R.due_date < :due_by AND R.created_at < CAST(:due_by AS date)")
 
     if where_query_parts:
         query += " WHERE "
@@ -95,6 +206,7 @@ class ReservationsRepository(BaseRepository):
         self.book_items_repo = BookItemsRepository(db)
         self.libraries_repo = LibrariesRepository(db)
         self.lendings_repo = LendingsRepository(db)
+        self.system_config_repo = SystemConfigRepository(db)
 
     async def validate_user_and_library(self, reservation, requesting_user: UserInDB):
         if requesting_user.id != reservation.user_id:
@@ -127,9 +239,11 @@ class ReservationsRepository(BaseRepository):
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="No book found with that id.",
                 )
-            created_reservation_record = await self.db.fetch_one(
-                query=CREATE_RESERVATION_QUERY, values={**new_reservation.dict(), "status": ReservationStatus.pending}
-            )
+            with db_function_errors_as_http():
+                created_reservation_record = await self.db.fetch_one(
+                    query=CREATE_RESERVATION_QUERY,
+                    values={**new_reservation.dict(), "status": ReservationStatus.pending},
+                )
             return ReservationInDB(**created_reservation_record)
 
     async def get_reservation_by_id(self, *, id: int) -> ReservationInDB:
@@ -160,42 +274,19 @@ class ReservationsRepository(BaseRepository):
             reservations_count=reservation_records[0].get("query_count") if reservation_records else 0,
         )
 
+    @retry_on_conflict()
     async def fulfill_reservation(self, *, reservation: ReservationInDB, book_item_id: int) -> ReservationInDB:
-        async with self.db.transaction():
-            if reservation.status != ReservationStatus.pending:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Reservation is already {reservation.status}.",
-                )
-            if reservation.book_item_id:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Reservation is already fulfilled.",
-                )
-            book_item = await self.book_items_repo.get_book_item_by_id(id=book_item_id)
-            if not book_item:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="No book item found with that id.",
-                )
-            if book_item.status != BookItemStatus.available:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Given book item is unavailable.",
-                )
-            if book_item.library_id != reservation.library_id:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Given book item does not belong to reservation library.",
-                )
-            await self.book_items_repo.update_book_item(
-                book_item=book_item, book_item_update=BookItemInternalUpdate(status=BookItemStatus.reserved)
-            )
-            updated_reservation_record = await self.db.fetch_one(
-                query=UPDATE_RESERVATION_BY_ID_QUERY,
-                values={"id": reservation.id, "book_item_id": book_item_id, "status": ReservationStatus.waiting},
+        system_config = await self.system_config_repo.get_config()
+        with db_function_errors_as_http():
+            fulfilled_reservation_record = await self.db.fetch_one(
+                query=FULFILL_RESERVATION_QUERY,
+                values={
+                    "reservation_id": reservation.id,
+                    "book_item_id": book_item_id,
+                    "reservation_due_day": system_config.reservation_due_day,
+                },
             )
-            return ReservationInDB(**updated_reservation_record)
+        return ReservationInDB(**fulfilled_reservation_record)
 
     async def cancel_reservation(self, *, reservation: ReservationInDB) -> ReservationInDB:
         async with self.db.transaction():
@@ -210,52 +301,78 @@ class ReservationsRepository(BaseRepository):
                     book_item=book_item, book_item_update=BookItemInternalUpdate(status=BookItemStatus.available)
                 )
 
+            system_config = await self.system_config_repo.get_config()
             updated_reservation_record = await self.db.fetch_one(
                 query=UPDATE_RESERVATION_BY_ID_QUERY,
                 values={
                     "id": reservation.id,
                     "book_item_id": reservation.book_item_id,
                     "status": ReservationStatus.cancelled,
+                    "reservation_due_day": system_config.reservation_due_day,
                 },
             )
             return ReservationInDB(**updated_reservation_record)
 
+    @retry_on_conflict()
     async def complete_reservation(self, *, reservation: ReservationInDB) -> LendingInDB:
-        async with self.db.transaction():
-            if reservation.status in {ReservationStatus.cancelled, ReservationStatus.completed}:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Reservation is already {reservation.status}.",
-                )
-
-            book_item = await self.book_items_repo.get_book_item_by_id(id=reservation.book_item_id)
-            if not book_item or book_item.status in {BookItemStatus.lost, BookItemStatus.written_off}:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Reserved book item is unavailable.",
-                )
-            await self.book_items_repo.update_book_item(
-                book_item=book_item, book_item_update=BookItemInternalUpdate(status=BookItemStatus.available)
+        system_config = await self.system_config_repo.get_config()
+        with db_function_errors_as_http():
+            created_lending_record = await self.db.fetch_one(
+                query=COMPLETE_RESERVATION_QUERY,
+                values={"reservation_id": reservation.id, "lending_due_day": system_config.lending_due_day},
             )
-
-            updated_reservation_record = await self.db.fetch_one(
-                query=UPDATE_RESERVATION_BY_ID_QUERY,
-                values={
-                    "id": reservation.id,
-                    "book_item_id": reservation.book_item_id,
-                    "status": ReservationStatus.completed,
-                },
+        return LendingInDB(**created_lending_record)
+
+    @retry_on_conflict()
+    async def match_book_item(self, *, book_item_id: int) -> Optional[ReservationInDB]:
+        system_config = await self.system_config_repo.get_config()
+        matched_reservation_record = await self.db.fetch_one(
+            query=MATCH_BOOK_ITEM_QUERY,
+            values={"book_item_id": book_item_id, "reservation_due_day": system_config.reservation_due_day},
+        )
+        if matched_reservation_record:
+            return ReservationInDB(**matched_reservation_record)
+
+    async def match_available_book_items(self) -> int:
+        book_item_records = await self.db.fetch_all(query=LIST_MATCHABLE_BOOK_ITEM_IDS_QUERY)
+        matched_count = 0
+        for book_item_record in book_item_records:
+            try:
+                matched_reservation = await self.match_book_item(book_item_id=book_item_record["id"])
+            except Exception:
+                # one failing item must not keep the rest of the sweep from being matched
+                logger.exception("Failed to match book item %s", book_item_record["id"])
+                continue
+            if matched_reservation:
+                matched_count += 1
+        return matched_count
+
+    async def cancel_due_reservations(
+        self, *, batch_size: int = RESERVATION_EXPIRY_BATCH_SIZE
+    ) -> ExpiredReservationsPublic:
+        expired = ExpiredReservationsPublic(reservations_count=0, book_items_count=0)
+        while True:
+            batch_record = await self.db.fetch_one(
+                query=EXPIRE_DUE_RESERVATIONS_QUERY,
+                values={"due_by": datetime.date.today(), "batch_size": batch_size},
             )
-
-            new_lending = LendingCreate(user_id=reservation.user_id, book_item_id=reservation.book_item_id)
-            return await self.lendings_repo.create_lending(new_lending=new_lending, reservation_id=reservation.id)
-
-    async def cancel_due_reservations(self):
-        due_reservations = await self.list_reservations(
-            reservation_filters={"due_by": datetime.date.today(), "status": ReservationStatus.waiting},
-            limit=None,
-            offset=None,
+            expired.reservations_count += batch_record["reservations_count"]
+            expired.book_items_count += batch_record["book_items_count"]
+            expired.reservation_ids += batch_record["reservation_ids"]
+            if batch_record["reservations_count"] < batch_size:
+                return expired
+
+    async def expire_reservations(self, *, reservation_ids: List[int]) -> ExpiredReservationsPublic:
+        expired_record = await self.db.fetch_one(
+            query=EXPIRE_RESERVATIONS_BY_ID_QUERY,
+            values={
+                "due_by": datetime.date.today(),
+                "reservation_ids": reservation_ids,
+                "batch_size": len(reservation_ids),
+            },
         )
+        return ExpiredReservationsPublic(**expired_record)
 
-        for reservation in due_reservations.reservations:
-            await self.cancel_reservation(reservation=reservation)
+    async def list_waiting_reservation_due_dates(self) -> Dict[int, datetime.date]:
+        records = await self.db.fetch_all(query=LIST_WAITING_RESERVATION_DUE_DATES_QUERY)
+        return {record["id"]: record["due_date"] for record in records}
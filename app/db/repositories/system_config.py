@@ -1,9 +1,22 @@
+from typing import Optional
+
+from app.core.metrics import count_cache_lookup
 from app.db.repositories.base import BaseRepository
 from app.models.system_config import SystemConfigInDB, SystemConfigUpdate
 
+# NOTIFY channel fired by the system_config update trigger
+SYSTEM_CONFIG_CHANNEL = "system_config_changed"
 
 GET_SYSTEM_CONFIG_QUERY = """
-    SELECT id, reservation_due_day, lending_due_day, lending_daily_fee, created_at, updated_at
+    SELECT
+        id,
+        reservation_due_day,
+        lending_due_day,
+        lending_daily_fee,
+        max_active_lendings,
+        max_active_reservations,
+        created_at,
+        updated_at
     FROM system_config;
 """
 
@@ -11,18 +24,59 @@ UPDATE_SYSTEM_CONFIG_QUERY = """
     UPDATE system_config
     SET reservation_due_day = :reservation_due_day,
         lending_due_day = :lending_due_day,
-        lending_daily_fee = :lending_daily_fee
-    RETURNING id, reservation_due_day, lending_due_day, lending_daily_fee, created_at, updated_at;
+        lending_daily_fee = :lending_daily_fee,
+        max_active_lendings = :max_active_lendings,
+        max_active_reservations = :max_active_reservations
+    RETURNING
+        id,
+        reservation_due_day,
+        lending_due_day,
+        lending_daily_fee,
+        max_active_lendings,
+        max_active_reservations,
+        created_at,
+        updated_at;
 """
 
 
+class SystemConfigCache:
+    """
+    Process-wide copy of the single system_config row, invalidated through SYSTEM_CONFIG_CHANNEL.
+
+    `generation` changes on every invalidation so that a read racing an update never stores a stale row.
+    """
+
+    def __init__(self) -> None:
+        self.config: Optional[SystemConfigInDB] = None
+        self.generation = 0
+
+    def invalidate(self, *args) -> None:
+        self.config = None
+        self.generation += 1
+
+    def store(self, config: SystemConfigInDB, generation: int) -> None:
+        if generation == self.generation:
+            self.config = config
+
+
+system_config_cache = SystemConfigCache()
+
+
 class SystemConfigRepository(BaseRepository):
     async def get_config(self) -> SystemConfigInDB:
+        count_cache_lookup("system_config", hit=system_config_cache.config is not None)
+        if system_config_cache.config is not None:
+            return system_config_cache.config
+
+        generation = system_config_cache.generation
         system_config_record = await self.db.fetch_one(query=GET_SYSTEM_CONFIG_QUERY)
-        return SystemConfigInDB(**system_config_record)
+        system_config = SystemConfigInDB(**system_config_record)
+        system_config_cache.store(system_config, generation)
+        return system_config
 
     async def update_config(self, system_config_update: SystemConfigUpdate) -> SystemConfigInDB:
         updated_system_config_record = await self.db.fetch_one(
             query=UPDATE_SYSTEM_CONFIG_QUERY, values=system_config_update.dict()
         )
+        system_config_cache.invalidate()
         return SystemConfigInDB(**updated_system_config_record)
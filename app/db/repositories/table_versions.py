@@ -0,0 +1,22 @@
+from typing import Dict, Iterable
+
+from app.db.repositories.base import BaseRepository
+
+# NOTIFY channel fired by the bump_table_version triggers, the payload is the table name
+TABLE_VERSION_CHANNEL = "table_version_changed"
+
+# bumped once per statement by the bump_table_version triggers
+GET_TABLE_VERSIONS_QUERY = """
+    SELECT table_name, version
+    FROM table_versions
+    WHERE table_name = ANY(CAST(:table_names AS text[]))
+    ORDER BY table_name;
+"""
+
+
+class TableVersionsRepository(BaseRepository):
+    async def get_versions(self, *, table_names: Iterable[str]) -> Dict[str, int]:
+        version_records = await self.db.fetch_all(
+            query=GET_TABLE_VERSIONS_QUERY, values={"table_names": list(table_names)}
+        )
+        return {version_record["table_name"]: version_record["version"] for version_record in version_records}
@@ -5,7 +5,7 @@ from fastapi import HTTPException
 from starlette.status import HTTP_400_BAD_REQUEST
 from databases import Database
 
-from app.db.repositories.base import BaseRepository
+from app.db.repositories.base import BaseRepository, in_ids_order
 from app.db.repositories.profiles import ProfilesRepository
 from app.models.profile import ProfileCreate
 from app.models.user import (
@@ -102,6 +102,23 @@ LIST_USERS_QUERY = """
     OFFSET :offset;
 """
 
+GET_USERS_BY_IDS_QUERY = """
+    SELECT
+        id,
+        username,
+        email,
+        email_verified,
+        password,
+        salt,
+        status,
+        role,
+        library_card_number,
+        created_at,
+        updated_at
+    FROM users
+    WHERE id = ANY(CAST(:ids AS integer[]));
+"""
+
 COUNT_USER_ROWS_QUERY = """
     SELECT COUNT(*) FROM users;
 """
@@ -189,6 +206,10 @@ class UsersRepository(BaseRepository):
         user_records = await self.db.fetch_all(query=LIST_USERS_QUERY, values={"limit": limit, "offset": offset})
         return [UserInDB(**user_record) for user_record in user_records]
 
+    async def get_users_by_ids(self, *, ids: List[int]) -> List[UserInDB]:
+        user_records = await self.db.fetch_all(query=GET_USERS_BY_IDS_QUERY, values={"ids": ids})
+        return [UserInDB(**user_record) for user_record in in_ids_order(user_records, ids)]
+
     async def users_count(self) -> int:
         cursor = await self.db.fetch_one(query=COUNT_USER_ROWS_QUERY)
         return cursor.get("count")
@@ -1,20 +1,30 @@
 import os
 
 from fastapi import FastAPI
-from databases import Database
 from app.core.config import DATABASE_URL
+from app.core.metrics import DB_POOL_MAX_SIZE
+from app.db.notifications import DatabaseNotifications
+from app.db.timing import TimedDatabase
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def get_database_url() -> str:
+    return f"{DATABASE_URL}_test" if os.environ.get("TESTING") else str(DATABASE_URL)
+
+
 async def connect_to_db(app: FastAPI) -> None:
-    DB_URL = f"{DATABASE_URL}_test" if os.environ.get("TESTING") else DATABASE_URL
-    database = Database(DB_URL, min_size=2, max_size=10)
+    DB_URL = get_database_url()
+    database = TimedDatabase(DB_URL, min_size=2, max_size=10)
+    notifications = DatabaseNotifications(DB_URL)
 
     try:
         await database.connect()
+        await notifications.connect()
         app.state._db = database
+        DB_POOL_MAX_SIZE.set(database.options["max_size"])
+        app.state._db_notifications = notifications
     except Exception as e:
         logger.warning("--- DB CONNECTION ERROR ---")
         logger.warning(e)
@@ -23,6 +33,7 @@ async def connect_to_db(app: FastAPI) -> None:
 
 async def close_db_connection(app: FastAPI) -> None:
     try:
+        await app.state._db_notifications.disconnect()
         await app.state._db.disconnect()
     except Exception as e:
         logger.warning("--- DB DISCONNECT ERROR ---")
@@ -0,0 +1,121 @@
+import time
+import typing
+from contextlib import contextmanager
+
+from databases import Database
+from databases.core import Connection
+from databases.interfaces import DatabaseBackend
+from sqlalchemy.sql import ClauseElement
+
+from app.core.metrics import DB_POOL_CONNECTIONS_IN_USE, DB_POOL_WAIT, DB_QUERY_DURATION
+from app.core.timing import timed
+
+
+@contextmanager
+def timed_query(operation: str) -> typing.Iterator[None]:
+    start = time.perf_counter()
+    try:
+        with timed("db"):
+            yield
+    finally:
+        DB_QUERY_DURATION.labels(operation).observe(time.perf_counter() - start)
+
+
+class TimedBackendConnection:
+    """
+    Pooled connection of a Connection, recording time waiting for the pool as `pool`.
+
+    Connection calls acquire and release under its lock, once for all the tasks that enter it together,
+    so the in use gauge moves exactly once per connection taken from the pool.
+    """
+
+    def __init__(self, connection: typing.Any) -> None:
+        self._connection = connection
+
+    def __getattr__(self, name: str) -> typing.Any:
+        return getattr(self._connection, name)
+
+    async def acquire(self) -> None:
+        start = time.perf_counter()
+        with timed("pool"):
+            await self._connection.acquire()
+        DB_POOL_WAIT.observe(time.perf_counter() - start)
+        DB_POOL_CONNECTIONS_IN_USE.inc()
+
+    async def release(self) -> None:
+        try:
+            await self._connection.release()
+        finally:
+            DB_POOL_CONNECTIONS_IN_USE.dec()
+
+
+class TimedConnection(Connection):
+    """
+    Connection recording time waiting for the pool as `pool` and time running queries as `db`, both in
+    the request timings and in the metrics.
+    """
+
+    def __init__(self, backend: DatabaseBackend) -> None:
+        super().__init__(backend)
+        self._connection = TimedBackendConnection(self._connection)
+
+    async def fetch_all(
+        self, query: typing.Union[ClauseElement, str], values: dict = None
+    ) -> typing.List[typing.Mapping]:
+        with timed_query("fetch_all"):
+            return await super().fetch_all(query, values)
+
+    async def fetch_one(
+        self, query: typing.Union[ClauseElement, str], values: dict = None
+    ) -> typing.Optional[typing.Mapping]:
+        with timed_query("fetch_one"):
+            return await super().fetch_one(query, values)
+
+    async def fetch_val(
+        self, query: typing.Union[ClauseElement, str], values: dict = None, column: typing.Any = 0
+    ) -> typing.Any:
+        with timed_query("fetch_val"):
+            return await super().fetch_val(query, values, column=column)
+
+    async def execute(self, query: typing.Union[ClauseElement, str], values: dict = None) -> typing.Any:
+        with timed_query("execute"):
+            return await super().execute(query, values)
+
+    async def execute_many(self, query: typing.Union[ClauseElement, str], values: list) -> None:
+        with timed_query("execute_many"):
+            return await super().execute_many(query, values)
+
+    async def iterate(
+        self, query: typing.Union[ClauseElement, str], values: dict = None
+    ) -> typing.AsyncGenerator[typing.Any, None]:
+        # fetching only, not the time the caller spends between records
+        records = super().iterate(query, values).__aiter__()
+        count, duration = 1, 0.0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    with timed("db", count=count):
+                        record = await records.__anext__()
+                except StopAsyncIteration:
+                    return
+                finally:
+                    duration += time.perf_counter() - start
+                count = 0
+                yield record
+        finally:
+            DB_QUERY_DURATION.labels("iterate").observe(duration)
+            await records.aclose()
+
+
+class TimedDatabase(Database):
+    def connection(self) -> Connection:
+        if self._global_connection is not None:
+            return self._global_connection
+
+        try:
+            return self._connection_context.get()
+        except LookupError:
+            connection = TimedConnection(self._backend)
+            self._connection_context.set(connection)
+            return connection
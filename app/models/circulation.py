@@ -0,0 +1,35 @@
+from datetime import date
+from enum import Enum
+from typing import List, Optional
+
+from app.models.core import CoreModel
+
+
+class UserCirculationCounters(CoreModel):
+    active_lendings: int = 0
+    active_reservations: int = 0
+
+
+class UserCirculationPublic(UserCirculationCounters):
+    max_active_lendings: int
+    max_active_reservations: int
+
+
+class CirculationReportGrouping(str, Enum):
+    library = "library"
+    rack = "rack"
+
+
+class CirculationDailyStatsPublic(CoreModel):
+    day: date
+    library_id: Optional[int]
+    rack_id: Optional[int]
+    loans: int
+    returns: int
+    holds_placed: int
+    holds_expired: int
+    overdue: int
+
+
+class CirculationRollupRefreshPublic(CoreModel):
+    days: List[date]
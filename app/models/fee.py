@@ -0,0 +1,45 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Optional
+
+from app.models.core import CoreModel, IDModelMixin
+
+
+class FeeLedgerEntryInDB(IDModelMixin, CoreModel):
+    user_id: int
+    lending_id: int
+    library_id: Optional[int]
+    amount: Decimal
+    created_at: datetime
+
+
+class FeeLedgerEntryPublic(FeeLedgerEntryInDB):
+    pass
+
+
+class ListOfFeeLedgerEntriesPublic(CoreModel):
+    entries: List[FeeLedgerEntryPublic]
+    entries_count: int
+
+
+class UserFeeBalancePublic(CoreModel):
+    user_id: int
+    username: Optional[str]
+    library_card_number: Optional[str]
+    fee_balance: Decimal
+
+
+class ListOfUserFeeBalancesPublic(CoreModel):
+    balances: List[UserFeeBalancePublic]
+    balances_count: int
+
+
+class LibraryFeeTotalPublic(CoreModel):
+    library_id: Optional[int]
+    library_name: Optional[str]
+    outstanding_fees: Decimal
+
+
+class FeeAccrualPublic(CoreModel):
+    lendings_count: int
+    amount: Decimal
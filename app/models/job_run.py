@@ -0,0 +1,22 @@
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+
+from app.models.core import CoreModel, IDModelMixin
+
+
+class JobRunStatus(str, Enum):
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+
+class JobRunInDB(IDModelMixin, CoreModel):
+    job_name: str
+    scheduled_for: datetime
+    status: JobRunStatus
+    worker: str
+    started_at: datetime
+    finished_at: Optional[datetime]
+    duration_ms: Optional[int]
+    error: Optional[str]
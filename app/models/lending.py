@@ -1,7 +1,10 @@
 from datetime import date
 from decimal import Decimal
+from enum import Enum
 from typing import Optional, List
 
+from pydantic import conlist, root_validator, validator
+
 from app.models.core import DateTimeModelMixin, CoreModel, IDModelMixin
 
 
@@ -30,3 +33,45 @@ class LendingPublic(LendingInDB):
 class ListOfLendingsPublic(CoreModel):
     lendings: List[LendingPublic]
     lendings_count: int
+
+
+class LendingBatchItemStatus(str, Enum):
+    created = "created"
+    completed = "completed"
+    not_found = "not_found"
+    unavailable = "unavailable"
+    not_loaned = "not_loaned"
+
+
+class LendingBatchComplete(CoreModel):
+    barcodes: conlist(str, min_items=1, max_items=100)
+    user_id: Optional[int]
+    library_card_number: Optional[str]
+
+    @validator("barcodes")
+    def unique_barcodes(cls, v):
+        return list(dict.fromkeys(v))
+
+    @root_validator
+    def single_user_identifier(cls, values):
+        assert not (
+            values.get("user_id") and values.get("library_card_number")
+        ), "Give either user_id or library_card_number, not both"
+        return values
+
+
+class LendingBatchCreate(LendingBatchComplete):
+    @root_validator
+    def user_identifier_required(cls, values):
+        assert values.get("user_id") or values.get("library_card_number"), "user_id or library_card_number is required"
+        return values
+
+
+class LendingBatchItemResult(CoreModel):
+    barcode: str
+    status: LendingBatchItemStatus
+    lending: Optional[LendingPublic]
+
+
+class LendingBatchResultPublic(CoreModel):
+    results: List[LendingBatchItemResult]
@@ -0,0 +1,8 @@
+from typing import List
+
+from app.models.core import CoreModel
+
+
+class PartitionMaintenancePublic(CoreModel):
+    created: List[str]
+    archived: List[str]
@@ -0,0 +1,35 @@
+from datetime import date, datetime
+from decimal import Decimal
+from typing import List, Optional
+
+from app.models.core import CoreModel
+from app.models.reservation import ReservationStatus
+from app.models.user import UserPublic
+
+
+class PatronSummaryReservation(CoreModel):
+    id: int
+    book_id: Optional[int]
+    book_title: Optional[str]
+    library_id: Optional[int]
+    status: ReservationStatus
+    book_item_id: Optional[int]
+    due_date: Optional[date]
+    created_at: datetime
+
+
+class PatronSummaryLending(CoreModel):
+    id: int
+    book_item_id: Optional[int]
+    book_id: Optional[int]
+    book_title: Optional[str]
+    due_date: date
+    fee: Decimal
+    created_at: datetime
+
+
+class PatronSummaryPublic(CoreModel):
+    user: UserPublic
+    reservations: List[PatronSummaryReservation]
+    lendings: List[PatronSummaryLending]
+    outstanding_balance: Decimal
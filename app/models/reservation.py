@@ -41,3 +41,9 @@ class ReservationPublic(ReservationInDB):
 class ListOfReservationsPublic(CoreModel):
     reservations: List[ReservationPublic]
     reservations_count: int
+
+
+class ExpiredReservationsPublic(CoreModel):
+    reservations_count: int
+    book_items_count: int
+    reservation_ids: List[int] = []
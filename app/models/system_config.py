@@ -7,6 +7,8 @@ class SystemConfig(CoreModel):
     reservation_due_day: int
     lending_due_day: int
     lending_daily_fee: Decimal
+    max_active_lendings: int
+    max_active_reservations: int
 
 
 class SystemConfigUpdate(SystemConfig):
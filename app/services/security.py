@@ -2,6 +2,8 @@ import bcrypt
 
 from passlib.context import CryptContext
 
+from app.core.timing import timed
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
@@ -10,8 +12,10 @@ def generate_salt() -> str:
 
 
 def hash_password(password: str, salt: str) -> str:
-    return pwd_context.hash(password + salt)
+    with timed("hash"):
+        return pwd_context.hash(password + salt)
 
 
 def verify_password(password: str, salt: str, hashed_pw: str) -> bool:
-    return pwd_context.verify(password + salt, hashed_pw)
+    with timed("hash"):
+        return pwd_context.verify(password + salt, hashed_pw)
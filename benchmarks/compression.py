@@ -0,0 +1,64 @@
+"""
+Bytes on the wire and compression CPU cost of list responses for every available encoding.
+
+    python -m benchmarks.compression
+"""
+
+import random
+import time
+from typing import Callable, Dict
+
+from app.api.middleware.compression import available_compressors
+from app.api.responses import model_response
+from benchmarks.serialization import ENDPOINTS, PAGE_SIZES, REPEAT
+
+WORDS = (
+    "library catalog history novel science river winter garden letters war peace city night light "
+    "journey memory ocean empire stories children mountain secret machine language music family"
+).split()
+
+
+def with_prose(row: Dict, rng: random.Random) -> Dict:
+    # repeated placeholder text compresses far better than real descriptions do
+    if "description" in row:
+        row["description"] = " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 80)))
+        row["title"] = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 5))).title()
+    return row
+
+
+def compress(make_compressor: Callable, body: bytes) -> bytes:
+    compressor = make_compressor()
+    return compressor.compress(body) + compressor.finish()
+
+
+def milliseconds_per_response(make_compressor: Callable, body: bytes, *, number: int = 20) -> float:
+    timings = []
+    for _ in range(REPEAT):
+        started_at = time.perf_counter()
+        for _ in range(number):
+            compress(make_compressor, body)
+        timings.append(time.perf_counter() - started_at)
+    return min(timings) / number * 1000
+
+
+def main() -> None:
+    compressors = available_compressors()
+    print(f"{'endpoint':<26}{'rows':>6}{'encoding':>10}{'bytes':>10}{'ratio':>8}{'ms/resp':>10}{'MB/s':>8}")
+    for name, (model_type, field_name, build_row) in ENDPOINTS.items():
+        for page_size in PAGE_SIZES:
+            rng = random.Random(page_size)
+            rows = [with_prose(build_row(i), rng) for i in range(page_size)]
+            model = model_type(**{field_name: rows, f"{field_name}_count": page_size})
+            body = model_response(model).body
+            print(f"{name:<26}{page_size:>6}{'identity':>10}{len(body):>10}{1:>8.1f}{0:>10.2f}{'':>8}")
+            for encoding, make_compressor in compressors.items():
+                size = len(compress(make_compressor, body))
+                ms = milliseconds_per_response(make_compressor, body)
+                mb_per_second = len(body) / ms / 1000
+                print(
+                    f"{'':<26}{'':>6}{encoding:>10}{size:>10}{len(body) / size:>8.1f}{ms:>10.2f}{mb_per_second:>8.0f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Throughput of list responses on the default FastAPI path against model_response.
+
+    python -m benchmarks.serialization
+"""
+
+import asyncio
+import datetime
+import json
+import time
+from decimal import Decimal
+from typing import Callable, Dict, Type
+
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+from app.api.responses import model_response
+from app.models.book import ListOfBooksPublic
+from app.models.book_item import ListOfBookItemsPublic
+from app.models.lending import ListOfLendingsPublic
+
+PAGE_SIZES = (20, 100, 500)
+REPEAT = 5
+
+NOW = datetime.datetime.now(datetime.timezone.utc)
+
+
+def book(i: int) -> Dict:
+    return {
+        "id": i,
+        "isbn": None,
+        "title": f"Book {i}",
+        "description": "A book about benchmarks " * 4,
+        "publisher": "AsLib",
+        "page_count": 320,
+        "publish_date": datetime.date(2020, 1, 1),
+        "authors": ["First Author", "Second Author"],
+        "created_at": NOW,
+        "updated_at": NOW,
+    }
+
+
+def book_item(i: int) -> Dict:
+    return {
+        "id": i,
+        "barcode": f"barcode-{i}",
+        "condition": "good",
+        "library_id": 1,
+        "rack_id": 2,
+        "status": "available",
+        "book_id": i,
+        "created_at": NOW,
+        "updated_at": NOW,
+    }
+
+
+def lending(i: int) -> Dict:
+    return {
+        "id": i,
+        "user_id": 1,
+        "book_item_id": i,
+        "reservation_id": None,
+        "due_date": datetime.date(2021, 6, 1),
+        "return_date": None,
+        "fee": Decimal("12.50"),
+        "created_at": NOW,
+        "updated_at": NOW,
+    }
+
+
+ENDPOINTS = {
+    "books:list-books": (ListOfBooksPublic, "books", book),
+    "books:get-book-items": (ListOfBookItemsPublic, "book_items", book_item),
+    "lendings:list-lendings": (ListOfLendingsPublic, "lendings", lending),
+}
+
+
+def default_path(model_type: Type[BaseModel]) -> Callable:
+    # what FastAPI does with a model returned from a route with a response_model
+    field = create_response_field(name=f"Response_{model_type.__name__}", type_=model_type)
+
+    async def respond(model: BaseModel) -> JSONResponse:
+        return JSONResponse(content=await serialize_response(field=field, response_content=model, is_coroutine=True))
+
+    return respond
+
+
+async def orjson_path(model: BaseModel) -> JSONResponse:
+    return model_response(model)
+
+
+async def requests_per_second(respond: Callable, model: BaseModel, *, number: int = 20) -> float:
+    timings = []
+    for _ in range(REPEAT):
+        started_at = time.perf_counter()
+        for _ in range(number):
+            await respond(model)
+        timings.append(time.perf_counter() - started_at)
+    return number / min(timings)
+
+
+async def main() -> None:
+    print(f"{'endpoint':<26}{'rows':>6}{'default req/s':>16}{'orjson req/s':>16}{'speedup':>10}")
+    for name, (model_type, field_name, build_row) in ENDPOINTS.items():
+        respond = default_path(model_type)
+        for page_size in PAGE_SIZES:
+            model = model_type(
+                **{field_name: [build_row(i) for i in range(page_size)], f"{field_name}_count": page_size}
+            )
+            assert json.loads((await respond(model)).body) == json.loads((await orjson_path(model)).body)
+            default_rps = await requests_per_second(respond, model)
+            orjson_rps = await requests_per_second(orjson_path, model)
+            print(f"{name:<26}{page_size:>6}{default_rps:>16.0f}{orjson_rps:>16.0f}{orjson_rps / default_rps:>9.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
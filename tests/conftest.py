@@ -1,6 +1,6 @@
 import warnings
 import os
-from typing import List, Callable
+from typing import Callable, Dict, List, Optional, Sequence
 
 import pytest
 from asgi_lifespan import LifespanManager
@@ -151,3 +151,86 @@ def create_authorized_client(client: AsyncClient) -> Callable:
         return client
 
     return _create_authorized_client
+
+
+SEED_LIBRARY_QUERY = "INSERT INTO libraries (name) VALUES (:name) RETURNING id;"
+SEED_BOOK_QUERY = "INSERT INTO books (title) VALUES (:title) RETURNING id;"
+SEED_BOOK_ITEM_QUERY = """
+    INSERT INTO book_items (barcode, condition, status, book_id, library_id)
+    VALUES (:barcode, 'good', :status, :book_id, :library_id)
+    RETURNING id;
+"""
+SEED_LENDING_QUERY = """
+    INSERT INTO lendings (user_id, book_item_id, due_date)
+    VALUES (:user_id, :book_item_id, current_date + CAST(:due_in_days AS integer))
+    RETURNING id;
+"""
+SEED_RESERVATION_QUERY = """
+    INSERT INTO reservations (book_id, library_id, user_id, status)
+    VALUES (:book_id, :library_id, :user_id, 'pending')
+    RETURNING id;
+"""
+
+
+async def cleanup_circulation(db: Database, *, user_id: int, library_id: int, book_id: int) -> None:
+    library = {"library_id": library_id}
+    await db.execute("DELETE FROM fee_ledger WHERE library_id = :library_id;", library)
+    await db.execute(
+        "UPDATE user_circulation_counters SET fee_balance = 0 WHERE user_id = :user_id;", {"user_id": user_id}
+    )
+    await db.execute("DELETE FROM circulation_daily_stats WHERE library_id = :library_id;", library)
+    await db.execute(
+        "DELETE FROM lendings WHERE book_item_id IN (SELECT id FROM book_items WHERE library_id = :library_id);",
+        library,
+    )
+    await db.execute("DELETE FROM reservations WHERE library_id = :library_id;", library)
+    await db.execute("DELETE FROM book_items WHERE library_id = :library_id;", library)
+    await db.execute("DELETE FROM books WHERE id = :book_id;", {"book_id": book_id})
+    await db.execute("DELETE FROM libraries WHERE id = :library_id;", library)
+
+
+# Seed "<prefix> library", "<prefix> book" and its items "<prefix>-1", "<prefix>-2"... lent to the user from the
+# first item on, and remove all of it again after the test
+@pytest.fixture
+async def seed_circulation(client: AsyncClient, db: Database) -> Callable:
+    seeded: List[Dict] = []
+
+    async def _seed_circulation(
+        *,
+        prefix: str,
+        user_id: int,
+        lending_due_in_days: Sequence[int] = (),
+        book_items_count: Optional[int] = None,
+        book_item_statuses: Optional[Sequence[str]] = None,
+        reserve: bool = False,
+    ) -> Dict:
+        if book_item_statuses is None:
+            # not available, so that the hold matcher leaves the seeded reservation and lendings alone
+            book_item_statuses = ["loaned"] * (book_items_count or len(lending_due_in_days))
+
+        ids = {
+            "library_id": await db.fetch_val(SEED_LIBRARY_QUERY, {"name": f"{prefix} library"}),
+            "book_id": await db.fetch_val(SEED_BOOK_QUERY, {"title": f"{prefix} book"}),
+        }
+        seeded.append({"user_id": user_id, **ids})
+
+        circulation = {**ids}
+        circulation["book_item_ids"] = [
+            await db.fetch_val(SEED_BOOK_ITEM_QUERY, {"barcode": f"{prefix}-{i}", "status": status, **ids})
+            for i, status in enumerate(book_item_statuses, start=1)
+        ]
+        circulation["lending_ids"] = [
+            await db.fetch_val(
+                SEED_LENDING_QUERY, {"user_id": user_id, "book_item_id": book_item_id, "due_in_days": due_in_days}
+            )
+            for book_item_id, due_in_days in zip(circulation["book_item_ids"], lending_due_in_days)
+        ]
+        if reserve:
+            circulation["reservation_id"] = await db.fetch_val(SEED_RESERVATION_QUERY, {"user_id": user_id, **ids})
+        circulation["lending_daily_fee"] = await db.fetch_val("SELECT lending_daily_fee FROM system_config;")
+        return circulation
+
+    yield _seed_circulation
+
+    for circulation in seeded:
+        await cleanup_circulation(db, **circulation)
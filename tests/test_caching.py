@@ -0,0 +1,143 @@
+import asyncio
+
+import pytest
+
+from databases import Database
+from fastapi import FastAPI, status
+from httpx import AsyncClient
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.api.dependencies.caching import BOOK_LIST_TABLES, etag_matches, make_etag
+from app.api.response_cache import LRUCacheBackend, ResponseCache, ResponseCacheBackend, response_cache
+from app.db.repositories.books import BooksRepository
+from app.models.book import BookCreate, BookPublic, BookUpdate
+
+
+def request_with_if_none_match(value: str) -> Request:
+    return Request({"type": "http", "headers": [(b"if-none-match", value.encode())]})
+
+
+class TestETags:
+    def test_etag_changes_with_any_part(self) -> None:
+        assert make_etag("book", 1, "2021-06-24") == make_etag("book", 1, "2021-06-24")
+        assert make_etag("book", 1, "2021-06-24") != make_etag("book", 1, "2021-06-25")
+        assert make_etag("book", 1, "2021-06-24").startswith('W/"')
+
+    @pytest.mark.parametrize(
+        "if_none_match, matches",
+        (
+            ("*", True),
+            ("{etag}", True),
+            ('"other", {etag}', True),
+            ("{opaque_tag}", True),
+            ('W/"other"', False),
+        ),
+    )
+    def test_if_none_match_uses_weak_comparison(self, if_none_match: str, matches: bool) -> None:
+        etag = make_etag("book", 1)
+        request = request_with_if_none_match(if_none_match.format(etag=etag, opaque_tag=etag[2:]))
+        assert etag_matches(request, etag) is matches
+
+
+class TestResponseCache:
+    def test_lru_backend_evicts_least_recently_used(self) -> None:
+        backend = LRUCacheBackend(max_entries=2)
+        backend.set("a", b"a")
+        backend.set("b", b"b")
+        assert backend.get("a") == b"a"
+        backend.set("c", b"c")
+        assert backend.get("b") is None
+        assert backend.get("a") == b"a"
+        assert len(backend) == 2
+
+    def test_incomplete_backends_cannot_be_created(self) -> None:
+        class GetOnlyBackend(ResponseCacheBackend):
+            def get(self, key):
+                return None
+
+        with pytest.raises(TypeError):
+            GetOnlyBackend()
+
+    def test_keys_ignore_param_order_and_unset_params(self) -> None:
+        cache = ResponseCache(LRUCacheBackend(max_entries=8))
+        assert cache.make_key("books:list-books", BOOK_LIST_TABLES, {"page": 1, "intitle": "%a%"}) == cache.make_key(
+            "books:list-books", reversed(BOOK_LIST_TABLES), {"intitle": "%a%", "page": 1, "inisbn": None}
+        )
+        assert cache.make_key("books:list-books", BOOK_LIST_TABLES, {"page": 1}) != cache.make_key(
+            "books:list-books", BOOK_LIST_TABLES, {"page": 2}
+        )
+
+    def test_table_writes_only_invalidate_dependent_keys(self) -> None:
+        cache = ResponseCache(LRUCacheBackend(max_entries=8))
+        books_key = cache.make_key("books:list-books", ("books",), {"page": 1})
+        racks_key = cache.make_key("libraries:list-library-racks", ("racks",), {})
+        cache.store(books_key, Response(content=b"[]"))
+
+        cache.invalidate_table("racks")
+        assert cache.make_key("books:list-books", ("books",), {"page": 1}) == books_key
+        assert cache.get(books_key).body == b"[]"
+        assert cache.make_key("libraries:list-library-racks", ("racks",), {}) != racks_key
+
+        cache.invalidate_table("books")
+        assert cache.make_key("books:list-books", ("books",), {"page": 1}) != books_key
+
+    def test_reset_drops_every_entry(self) -> None:
+        cache = ResponseCache(LRUCacheBackend(max_entries=8))
+        key = cache.make_key("books:list-books", ("books",), {"page": 1})
+        cache.store(key, Response(content=b"[]"))
+        cache.invalidate()
+        assert cache.get(key) is None
+        assert cache.make_key("books:list-books", ("books",), {"page": 1}) != key
+
+
+@pytest.mark.asyncio
+class TestSharedBookListCache:
+    async def test_book_list_is_invalidated_by_book_writes(
+        self, app: FastAPI, authorized_client: AsyncClient, db: Database
+    ) -> None:
+        params = {"intitle": "shared cache book"}
+        key_params = {"page": 1, "intitle": "%shared cache book%"}
+        res = await authorized_client.get(app.url_path_for("books:list-books"), params=params)
+        assert res.status_code == status.HTTP_200_OK
+        assert res.json()["books_count"] == 0
+        cache_key = response_cache.make_key("books:list-books", BOOK_LIST_TABLES, key_params)
+        assert response_cache.get(cache_key) is not None
+
+        await BooksRepository(db).create_book(new_book=BookCreate(title="shared cache book"))
+        # the notification arrives on the listening connection after the commit
+        for _ in range(50):
+            if response_cache.make_key("books:list-books", BOOK_LIST_TABLES, key_params) != cache_key:
+                break
+            await asyncio.sleep(0.1)
+
+        res = await authorized_client.get(app.url_path_for("books:list-books"), params=params)
+        assert res.json()["books_count"] == 1
+
+
+@pytest.mark.asyncio
+class TestConditionalBookRequests:
+    async def test_unchanged_book_is_not_modified(
+        self, app: FastAPI, authorized_client: AsyncClient, db: Database
+    ) -> None:
+        books_repo = BooksRepository(db)
+        book = await books_repo.create_book(new_book=BookCreate(title="etag book"))
+
+        res = await authorized_client.get(app.url_path_for("books:get-book-by-id", book_id=book.id))
+        assert res.status_code == status.HTTP_200_OK
+        assert BookPublic(**res.json()).id == book.id
+        etag = res.headers["etag"]
+        assert res.headers["cache-control"].startswith("private")
+
+        res = await authorized_client.get(
+            app.url_path_for("books:get-book-by-id", book_id=book.id), headers={"If-None-Match": etag}
+        )
+        assert res.status_code == status.HTTP_304_NOT_MODIFIED
+        assert res.content == b""
+
+        await books_repo.update_book(book=book, book_update=BookUpdate(title="updated etag book"))
+        res = await authorized_client.get(
+            app.url_path_for("books:get-book-by-id", book_id=book.id), headers={"If-None-Match": etag}
+        )
+        assert res.status_code == status.HTTP_200_OK
+        assert res.headers["etag"] != etag
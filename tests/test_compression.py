@@ -0,0 +1,103 @@
+import pytest
+
+from httpx import AsyncClient
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from app.api.middleware.compression import CompressionMiddleware, negotiate_encoding, uncompressed
+
+LARGE_BODY = [{"id": i, "description": "A book about compression"} for i in range(100)]
+
+
+async def large(request) -> Response:
+    return JSONResponse(LARGE_BODY)
+
+
+async def small(request) -> Response:
+    return JSONResponse({"id": 1})
+
+
+@uncompressed
+async def opted_out(request) -> Response:
+    return JSONResponse(LARGE_BODY)
+
+
+async def stream(request) -> Response:
+    async def rows():
+        for i in range(10):
+            yield f'{{"id": {i}}}\n'
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+
+async def binary(request) -> Response:
+    return Response(b"\0" * 4096, media_type="image/png")
+
+
+@pytest.fixture
+async def compression_client() -> AsyncClient:
+    app = Starlette(
+        routes=[
+            Route("/large", large),
+            Route("/small", small),
+            Route("/opted-out", opted_out),
+            Route("/stream", stream),
+            Route("/binary", binary),
+        ]
+    )
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    async with AsyncClient(app=app, base_url="http://testserver", headers={"Accept-Encoding": "gzip"}) as client:
+        yield client
+
+
+class TestEncodingNegotiation:
+    @pytest.mark.parametrize(
+        "accept_encoding, encoding",
+        (
+            ("gzip", "gzip"),
+            ("gzip, br", "br"),
+            ("br;q=0.5, gzip", "gzip"),
+            ("gzip;q=0", None),
+            ("*", "br"),
+            ("*, br;q=0", "gzip"),
+            ("identity", None),
+            ("", None),
+        ),
+    )
+    def test_picks_highest_quality_then_preference(self, accept_encoding: str, encoding: str) -> None:
+        assert negotiate_encoding(accept_encoding, ["br", "gzip"]) == encoding
+
+
+@pytest.mark.asyncio
+class TestCompressionMiddleware:
+    async def test_large_bodies_are_compressed(self, compression_client: AsyncClient) -> None:
+        res = await compression_client.get("/large")
+        assert res.headers["content-encoding"] == "gzip"
+        assert res.headers["vary"] == "Accept-Encoding"
+        assert int(res.headers["content-length"]) < len(res.content)
+        assert res.json() == LARGE_BODY
+
+    async def test_small_bodies_are_sent_as_is(self, compression_client: AsyncClient) -> None:
+        res = await compression_client.get("/small")
+        assert "content-encoding" not in res.headers
+        assert res.json() == {"id": 1}
+
+    async def test_clients_without_accept_encoding_get_identity(self, compression_client: AsyncClient) -> None:
+        res = await compression_client.get("/large", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in res.headers
+        assert res.json() == LARGE_BODY
+
+    async def test_routes_can_opt_out(self, compression_client: AsyncClient) -> None:
+        res = await compression_client.get("/opted-out")
+        assert "content-encoding" not in res.headers
+
+    async def test_binary_bodies_are_not_compressed(self, compression_client: AsyncClient) -> None:
+        res = await compression_client.get("/binary")
+        assert "content-encoding" not in res.headers
+
+    async def test_streamed_bodies_are_compressed_chunk_by_chunk(self, compression_client: AsyncClient) -> None:
+        res = await compression_client.get("/stream")
+        assert res.headers["content-encoding"] == "gzip"
+        assert "content-length" not in res.headers
+        assert res.text.splitlines() == [f'{{"id": {i}}}' for i in range(10)]
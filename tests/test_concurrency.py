@@ -0,0 +1,215 @@
+import asyncio
+import contextvars
+from typing import Awaitable, Dict, List
+
+import pytest
+
+from databases import Database
+from fastapi import HTTPException
+from httpx import AsyncClient
+
+from app.db.repositories.lendings import LendingsRepository
+from app.db.repositories.reservations import ReservationsRepository
+from app.models.lending import LendingCreate, LendingInDB
+from app.models.reservation import ReservationCreate, ReservationInDB
+from app.models.user import UserInDB
+
+
+pytestmark = pytest.mark.asyncio
+
+BOOK_ITEMS_COUNT = 5
+REQUESTS_COUNT = 300
+
+SEED_QUERIES = (
+    """
+    INSERT INTO libraries (name)
+    VALUES ('concurrency library'), ('concurrency lending library');
+    """,
+    """
+    INSERT INTO books (title)
+    VALUES ('concurrency book');
+    """,
+    f"""
+    INSERT INTO book_items (barcode, condition, status, book_id, library_id)
+    SELECT
+        'concurrency-' || L.name || '-' || g,
+        'good',
+        'available',
+        (SELECT id FROM books WHERE title = 'concurrency book'),
+        L.id
+    FROM generate_series(1, {BOOK_ITEMS_COUNT}) g
+    CROSS JOIN libraries L
+    WHERE L.name LIKE 'concurrency %';
+    """,
+    f"""
+    INSERT INTO users (username, email, password, salt, status, role)
+    SELECT 'concurrency_user_' || g, 'concurrency_user_' || g || '@aslib.dev', 'password', 'salt', 'active', 'default'
+    FROM generate_series(1, {REQUESTS_COUNT}) g;
+    """,
+    """
+    INSERT INTO reservations (book_id, library_id, user_id, status)
+    SELECT
+        (SELECT id FROM books WHERE title = 'concurrency book'),
+        (SELECT id FROM libraries WHERE name = 'concurrency library'),
+        U.id,
+        'pending'
+    FROM users U
+    WHERE U.username LIKE 'concurrency_user_%';
+    """,
+)
+
+CLEANUP_QUERIES = (
+    "DELETE FROM lendings WHERE user_id IN (SELECT id FROM users WHERE username LIKE 'concurrency_user_%');",
+    "DELETE FROM reservations WHERE user_id IN (SELECT id FROM users WHERE username LIKE 'concurrency_user_%');",
+    "DELETE FROM book_items WHERE barcode LIKE 'concurrency-%';",
+    "DELETE FROM books WHERE title = 'concurrency book';",
+    "DELETE FROM libraries WHERE name LIKE 'concurrency %';",
+    "DELETE FROM users WHERE username LIKE 'concurrency_user_%';",
+)
+
+
+@pytest.fixture
+async def circulation_data(client: AsyncClient, db: Database) -> Dict:
+    # no available notifications, so that the hold matcher leaves the items to the tests racing for them
+    async with db.transaction():
+        await db.execute("ALTER TABLE book_items DISABLE TRIGGER notify_book_item_available_insert;")
+        for query in SEED_QUERIES:
+            await db.execute(query=query)
+        await db.execute("ALTER TABLE book_items ENABLE TRIGGER notify_book_item_available_insert;")
+
+    yield {
+        "reservations": [
+            ReservationInDB(**record)
+            for record in await db.fetch_all(
+                "SELECT * FROM reservations WHERE library_id = "
+                "(SELECT id FROM libraries WHERE name = 'concurrency library') ORDER BY id;"
+            )
+        ],
+        "reservation_book_item_ids": await book_item_ids(db, library_name="concurrency library"),
+        "lending_book_item_ids": await book_item_ids(db, library_name="concurrency lending library"),
+        "user_id": await db.fetch_val("SELECT id FROM users WHERE username = 'concurrency_user_1';"),
+    }
+
+    for query in CLEANUP_QUERIES:
+        await db.execute(query=query)
+
+
+async def book_item_ids(db: Database, *, library_name: str) -> List[int]:
+    records = await db.fetch_all(
+        query="""
+        SELECT BI.id FROM book_items BI JOIN libraries L ON L.id = BI.library_id
+        WHERE L.name = :library_name ORDER BY BI.id;
+        """,
+        values={"library_name": library_name},
+    )
+    return [record["id"] for record in records]
+
+
+async def run_in_parallel(coroutines: List[Awaitable]) -> List:
+    # every task gets a fresh context, and so its own pooled connection
+    tasks = [contextvars.Context().run(asyncio.ensure_future, coroutine) for coroutine in coroutines]
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception) and not isinstance(result, HTTPException):
+            raise result
+    return [result for result in results if not isinstance(result, Exception)]
+
+
+class TestConcurrentCirculation:
+    async def test_parallel_fulfillments_never_double_book(self, db: Database, circulation_data: Dict) -> None:
+        reservations_repo = ReservationsRepository(db)
+        book_item_ids = circulation_data["reservation_book_item_ids"]
+
+        fulfilled = await run_in_parallel(
+            [
+                reservations_repo.fulfill_reservation(
+                    reservation=reservation, book_item_id=book_item_ids[i % len(book_item_ids)]
+                )
+                for i, reservation in enumerate(circulation_data["reservations"])
+            ]
+        )
+
+        assert len(fulfilled) <= len(book_item_ids)
+        assert len({reservation.book_item_id for reservation in fulfilled}) == len(fulfilled)
+
+        bookings = await db.fetch_all(
+            query="""
+            SELECT book_item_id, count(*) AS bookings_count
+            FROM reservations
+            WHERE book_item_id = ANY(:book_item_ids) AND status = 'waiting'
+            GROUP BY book_item_id;
+            """,
+            values={"book_item_ids": book_item_ids},
+        )
+        assert sorted(booking["book_item_id"] for booking in bookings) == book_item_ids
+        assert all(booking["bookings_count"] == 1 for booking in bookings)
+
+    async def test_parallel_checkouts_never_double_lend(self, db: Database, circulation_data: Dict) -> None:
+        lendings_repo = LendingsRepository(db)
+        book_item_ids = circulation_data["lending_book_item_ids"]
+
+        lendings = await run_in_parallel(
+            [
+                lendings_repo.create_lending(
+                    new_lending=LendingCreate(
+                        user_id=circulation_data["user_id"], book_item_id=book_item_ids[i % len(book_item_ids)]
+                    )
+                )
+                for i in range(REQUESTS_COUNT)
+            ]
+        )
+
+        assert all(isinstance(lending, LendingInDB) for lending in lendings)
+        assert sorted(lending.book_item_id for lending in lendings) == book_item_ids
+
+    async def test_parallel_reservations_respect_user_limit(self, db: Database, circulation_data: Dict) -> None:
+        reservations_repo = ReservationsRepository(db)
+        user = UserInDB(
+            **await db.fetch_one("SELECT * FROM users WHERE id = :id;", {"id": circulation_data["user_id"]})
+        )
+        reservation = circulation_data["reservations"][0]
+        max_active_reservations = await db.fetch_val("SELECT max_active_reservations FROM system_config;")
+
+        reservations = await run_in_parallel(
+            [
+                reservations_repo.create_reservation(
+                    new_reservation=ReservationCreate(
+                        book_id=reservation.book_id, library_id=reservation.library_id, user_id=user.id
+                    ),
+                    requesting_user=user,
+                )
+                for _ in range(REQUESTS_COUNT)
+            ]
+        )
+
+        # the seeded pending reservation already counts against the limit
+        assert len(reservations) == max_active_reservations - 1
+        active_reservations = await db.fetch_val(
+            "SELECT active_reservations FROM user_circulation_counters WHERE user_id = :user_id;",
+            {"user_id": user.id},
+        )
+        assert active_reservations == max_active_reservations
+
+    async def test_fulfillment_is_not_limited_once_reserved(self, db: Database, circulation_data: Dict) -> None:
+        reservations_repo = ReservationsRepository(db)
+        reservation = circulation_data["reservations"][0]
+        max_active_reservations = await db.fetch_val("SELECT max_active_reservations FROM system_config;")
+
+        # the limit was lowered below the user's already active reservations
+        await db.execute("UPDATE system_config SET max_active_reservations = 0;")
+        try:
+            fulfilled = await reservations_repo.fulfill_reservation(
+                reservation=reservation, book_item_id=circulation_data["reservation_book_item_ids"][0]
+            )
+        finally:
+            await db.execute(
+                "UPDATE system_config SET max_active_reservations = :max_active_reservations;",
+                {"max_active_reservations": max_active_reservations},
+            )
+
+        assert fulfilled.status == "waiting"
+        active_reservations = await db.fetch_val(
+            "SELECT active_reservations FROM user_circulation_counters WHERE user_id = :user_id;",
+            {"user_id": reservation.user_id},
+        )
+        assert active_reservations == 1
@@ -0,0 +1,76 @@
+from typing import Callable, Dict, List
+
+import pytest
+
+from databases import Database
+from fastapi import FastAPI, HTTPException, status
+from httpx import AsyncClient
+
+from app.api.dependencies.expand import RelationLoader, get_expand_from_query
+from app.models.user import UserInDB
+
+
+@pytest.fixture
+async def expand_lendings(seed_circulation: Callable, test_user: UserInDB) -> Dict:
+    return await seed_circulation(prefix="expand", user_id=test_user.id, lending_due_in_days=(14, 14, 14))
+
+
+class TestExpandParsing:
+    def test_relations_are_parsed(self) -> None:
+        get_expand = get_expand_from_query("book", "user")
+        assert get_expand(expand="book, user,") == {"book", "user"}
+        assert get_expand(expand=None) == frozenset()
+
+    def test_unknown_relations_are_rejected(self) -> None:
+        with pytest.raises(HTTPException) as e:
+            get_expand_from_query("book")(expand="book,author")
+        assert e.value.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.asyncio
+class TestExpandLendings:
+    async def test_relations_are_embedded(
+        self, app: FastAPI, authorized_client: AsyncClient, test_user: UserInDB, expand_lendings: Dict
+    ) -> None:
+        res = await authorized_client.get(
+            app.url_path_for("lendings:list-current-user-lendings"),
+            params={"expand": "book,book_item,library,user"},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        lendings = res.json()["lendings"]
+        assert len(lendings) == 3
+        for lending in lendings:
+            assert lending["book_item"]["id"] == lending["book_item_id"]
+            assert lending["book"]["id"] == expand_lendings["book_id"]
+            assert lending["library"]["id"] == expand_lendings["library_id"]
+            assert lending["user"]["id"] == test_user.id
+            assert "password" not in lending["user"]
+
+    async def test_lendings_are_not_expanded_by_default(
+        self, app: FastAPI, authorized_client: AsyncClient, expand_lendings: Dict
+    ) -> None:
+        res = await authorized_client.get(app.url_path_for("lendings:list-current-user-lendings"))
+        assert res.status_code == status.HTTP_200_OK
+        assert all("book" not in lending for lending in res.json()["lendings"])
+
+    async def test_each_relation_is_loaded_once_per_page(
+        self, db: Database, test_user: UserInDB, expand_lendings: Dict, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        relation_loader = RelationLoader(db)
+        fetched: List[str] = []
+        fetch = relation_loader.fetch
+
+        async def counting_fetch(relation: str, ids: List[int]) -> List[Dict]:
+            fetched.append(relation)
+            return await fetch(relation, ids)
+
+        monkeypatch.setattr(relation_loader, "fetch", counting_fetch)
+        rows = [
+            dict(record)
+            for record in await db.fetch_all(
+                "SELECT * FROM lendings WHERE user_id = :user_id;", {"user_id": test_user.id}
+            )
+        ]
+        await relation_loader.expand(rows, {"book", "book_item", "library", "user"})
+
+        assert sorted(fetched) == ["book", "book_item", "library", "user"]
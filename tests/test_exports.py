@@ -0,0 +1,58 @@
+import csv
+import io
+import json
+from typing import Callable
+
+import pytest
+
+from databases import Database
+from fastapi import FastAPI, status
+from httpx import AsyncClient
+
+from app.db.repositories.books import BooksRepository
+from app.db.repositories.exports import BOOK_EXPORT_COLUMNS, USER_EXPORT_COLUMNS
+from app.models.book import BookCreate
+from app.models.user import UserInDB
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def admin_client(create_authorized_client: Callable, test_admin: UserInDB) -> AsyncClient:
+    return create_authorized_client(user=test_admin)
+
+
+class TestExports:
+    async def test_books_stream_as_ndjson_with_authors(
+        self, app: FastAPI, admin_client: AsyncClient, db: Database
+    ) -> None:
+        book = await BooksRepository(db).create_book(
+            new_book=BookCreate(title="export book", authors=["Export Author", "Another Author"])
+        )
+
+        res = await admin_client.get(app.url_path_for("exports:export-books"))
+        assert res.status_code == status.HTTP_200_OK
+        assert res.headers["content-type"] == "application/x-ndjson"
+        assert 'filename="books.ndjson"' in res.headers["content-disposition"]
+
+        rows = [json.loads(line) for line in res.text.splitlines()]
+        assert all(list(row) == list(BOOK_EXPORT_COLUMNS) for row in rows)
+        exported_book = next(row for row in rows if row["id"] == book.id)
+        assert exported_book["title"] == "export book"
+        assert exported_book["authors"] == ["Another Author", "Export Author"]
+
+    async def test_users_stream_as_csv_without_credentials(
+        self, app: FastAPI, admin_client: AsyncClient, test_admin: UserInDB
+    ) -> None:
+        res = await admin_client.get(app.url_path_for("exports:export-users"), params={"format": "csv"})
+        assert res.status_code == status.HTTP_200_OK
+        assert res.headers["content-type"].startswith("text/csv")
+
+        reader = csv.reader(io.StringIO(res.text))
+        assert tuple(next(reader)) == USER_EXPORT_COLUMNS
+        assert "password" not in USER_EXPORT_COLUMNS and "salt" not in USER_EXPORT_COLUMNS
+        assert str(test_admin.id) in {row[0] for row in reader}
+
+    async def test_users_export_requires_admin(self, app: FastAPI, authorized_client: AsyncClient) -> None:
+        res = await authorized_client.get(app.url_path_for("exports:export-users"))
+        assert res.status_code == status.HTTP_403_FORBIDDEN
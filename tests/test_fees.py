@@ -0,0 +1,178 @@
+from datetime import date
+from decimal import Decimal
+from typing import Callable, Dict, Optional
+
+import pytest
+
+from databases import Database
+from fastapi import FastAPI, status
+from httpx import AsyncClient
+
+from app.db.repositories.fees import FeesRepository
+from app.db.repositories.lendings import LendingsRepository
+from app.models.fee import LibraryFeeTotalPublic, ListOfFeeLedgerEntriesPublic, ListOfUserFeeBalancesPublic
+from app.models.lending import LendingInDB
+from app.models.user import UserInDB
+
+
+pytestmark = pytest.mark.asyncio
+
+OVERDUE_DAYS = 4
+
+# due in that many days, negative ones are overdue
+FEE_LENDINGS_DUE_IN_DAYS = (-5, -1, 0, 3)
+
+# fee_lendings seeding a single lending, OVERDUE_DAYS overdue
+with_one_overdue_lending = pytest.mark.parametrize("fee_lendings", [(-OVERDUE_DAYS,)], indirect=True)
+
+
+@pytest.fixture
+async def fee_lendings(
+    request: pytest.FixtureRequest, db: Database, seed_circulation: Callable, test_user: UserInDB
+) -> Dict:
+    due_in_days = getattr(request, "param", FEE_LENDINGS_DUE_IN_DAYS)
+    circulation = await seed_circulation(prefix="fees", user_id=test_user.id, lending_due_in_days=due_in_days)
+    return {
+        "lending_ids": dict(zip(due_in_days, circulation["lending_ids"])),
+        "lending_daily_fee": circulation["lending_daily_fee"],
+        "today": await db.fetch_val("SELECT current_date;"),
+    }
+
+
+def populate_fee(lending: LendingInDB, *, today: date, lending_daily_fee: Decimal) -> Optional[Decimal]:
+    # the per lending computation the SQL fee expression replaced
+    if lending.fee is not None:
+        return lending.fee
+    diff = today - lending.due_date
+    if diff.days > 0:
+        return diff.days * lending_daily_fee
+    return None
+
+
+async def fee_balance(db: Database, *, user_id: int) -> Decimal:
+    return await db.fetch_val(
+        "SELECT fee_balance FROM user_circulation_counters WHERE user_id = :user_id;", {"user_id": user_id}
+    )
+
+
+class TestFeeRoutes:
+    async def test_routes_exist(self, app: FastAPI, client: AsyncClient) -> None:
+        for route_name, path_params in (
+            ("fees:list-user-fee-balances", {}),
+            ("fees:list-library-fee-totals", {}),
+            ("fees:list-user-fee-ledger", {"user_id": 1}),
+        ):
+            res = await client.get(app.url_path_for(route_name, **path_params))
+            assert res.status_code != status.HTTP_404_NOT_FOUND
+
+
+@with_one_overdue_lending
+class TestFeeAccrual:
+    async def test_accrual_writes_ledger_and_balance_once(
+        self, db: Database, test_user: UserInDB, fee_lendings: Dict
+    ) -> None:
+        expected_fee = OVERDUE_DAYS * fee_lendings["lending_daily_fee"]
+        fees_repo = FeesRepository(db)
+
+        accrual = await fees_repo.accrue_fees()
+        assert accrual.lendings_count >= 1
+        assert await fee_balance(db, user_id=test_user.id) == expected_fee
+
+        await fees_repo.accrue_fees()
+        assert await fee_balance(db, user_id=test_user.id) == expected_fee
+        ledger = await fees_repo.list_user_fee_ledger(user_id=test_user.id)
+        assert ledger.entries_count == 1
+
+    async def test_completing_lending_settles_fee(
+        self, db: Database, test_user: UserInDB, fee_lendings: Dict
+    ) -> None:
+        expected_fee = OVERDUE_DAYS * fee_lendings["lending_daily_fee"]
+        lendings_repo = LendingsRepository(db)
+        lending = await lendings_repo.get_lending_by_id(id=fee_lendings["lending_ids"][-OVERDUE_DAYS])
+
+        completed_lending = await lendings_repo.complete_lending(lending=lending)
+        assert completed_lending.fee == expected_fee
+        assert await fee_balance(db, user_id=test_user.id) == expected_fee
+
+        # a completed lending is not accrued again
+        await FeesRepository(db).accrue_fees()
+        assert await fee_balance(db, user_id=test_user.id) == expected_fee
+
+
+class TestLendingFees:
+    async def test_fee_matches_the_per_lending_computation(self, db: Database, fee_lendings: Dict) -> None:
+        lendings_repo = LendingsRepository(db)
+        for lending_id in fee_lendings["lending_ids"].values():
+            lending = await lendings_repo.get_lending_by_id(id=lending_id)
+            expected_fee = populate_fee(
+                lending.copy(update={"fee": None}),
+                today=fee_lendings["today"],
+                lending_daily_fee=fee_lendings["lending_daily_fee"],
+            )
+            assert lending.fee == expected_fee
+
+    async def test_only_overdue_completions_are_charged(self, db: Database, fee_lendings: Dict) -> None:
+        lendings_repo = LendingsRepository(db)
+        for due_in_days, expected_fee in ((-5, 5 * fee_lendings["lending_daily_fee"]), (0, 0), (3, 0)):
+            lending = await lendings_repo.get_lending_by_id(id=fee_lendings["lending_ids"][due_in_days])
+            completed_lending = await lendings_repo.complete_lending(lending=lending)
+            assert completed_lending.fee == expected_fee
+
+    async def test_lendings_are_filtered_by_fee(self, db: Database, test_user: UserInDB, fee_lendings: Dict) -> None:
+        lendings_repo = LendingsRepository(db)
+        lending_ids = fee_lendings["lending_ids"]
+
+        for has_fee, due_in_days in ((True, (-5, -1)), (False, (0, 3))):
+            lendings = await lendings_repo.list_lendings(lending_filters={"user_id": test_user.id, "has_fee": has_fee})
+            assert sorted(lending.id for lending in lendings.lendings) == sorted(lending_ids[d] for d in due_in_days)
+            assert lendings.lendings_count == len(due_in_days)
+
+    async def test_lendings_are_ordered_by_fee(self, db: Database, test_user: UserInDB, fee_lendings: Dict) -> None:
+        lending_ids = fee_lendings["lending_ids"]
+
+        lendings = await LendingsRepository(db).list_lendings(
+            lending_filters={"user_id": test_user.id, "order_by_fee": True}
+        )
+        # lendings without a fee come last, by id
+        assert [lending.id for lending in lendings.lendings] == [
+            lending_ids[-5],
+            lending_ids[-1],
+            *sorted((lending_ids[0], lending_ids[3])),
+        ]
+
+
+class TestFeeReports:
+    @with_one_overdue_lending
+    async def test_librarian_can_list_fee_reports(
+        self,
+        app: FastAPI,
+        db: Database,
+        create_authorized_client: Callable,
+        test_librarian: UserInDB,
+        test_user: UserInDB,
+        fee_lendings: Dict,
+    ) -> None:
+        expected_fee = OVERDUE_DAYS * fee_lendings["lending_daily_fee"]
+        await FeesRepository(db).accrue_fees()
+        authorized_client = create_authorized_client(user=test_librarian)
+
+        res = await authorized_client.get(
+            app.url_path_for("fees:list-user-fee-balances"),
+            params={"min_balance": str(expected_fee)},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        balances = ListOfUserFeeBalancesPublic(**res.json())
+        assert test_user.id in [balance.user_id for balance in balances.balances]
+
+        res = await authorized_client.get(app.url_path_for("fees:list-library-fee-totals"))
+        assert res.status_code == status.HTTP_200_OK
+        totals = [LibraryFeeTotalPublic(**total) for total in res.json()]
+        assert "fees library" in [total.library_name for total in totals]
+
+        res = await authorized_client.get(app.url_path_for("fees:list-user-fee-ledger", user_id=test_user.id))
+        assert res.status_code == status.HTTP_200_OK
+        assert ListOfFeeLedgerEntriesPublic(**res.json()).entries_count == 1
+
+    async def test_default_user_cannot_list_fee_reports(self, app: FastAPI, authorized_client: AsyncClient) -> None:
+        res = await authorized_client.get(app.url_path_for("fees:list-user-fee-balances"))
+        assert res.status_code == status.HTTP_403_FORBIDDEN
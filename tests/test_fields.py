@@ -0,0 +1,81 @@
+import pytest
+
+from databases import Database
+from fastapi import FastAPI, HTTPException, status
+from httpx import AsyncClient
+
+from app.api.dependencies.fields import fields_include, get_fields_from_query
+from app.db.repositories.base import select_columns
+from app.db.repositories.books import BooksRepository
+from app.db.repositories.libraries import LibrariesRepository
+from app.models.book import BookCreate, BookPublic
+from app.models.library import LibraryCreate
+
+
+class TestFieldsParsing:
+    def test_fields_always_include_id(self) -> None:
+        assert get_fields_from_query(BookPublic)(" title,authors ,") == {"id", "title", "authors"}
+        assert get_fields_from_query(BookPublic)(None) is None
+
+    def test_unknown_fields_are_rejected(self) -> None:
+        with pytest.raises(HTTPException) as e:
+            get_fields_from_query(BookPublic)("title,password")
+        assert e.value.status_code == status.HTTP_400_BAD_REQUEST
+        assert "password" in e.value.detail
+
+    def test_select_list_keeps_column_order(self) -> None:
+        assert select_columns(("id", "title", "description"), {"title", "id"}, alias="B") == "B.id, B.title"
+        assert select_columns(("id", "title"), None) == "id, title"
+
+    def test_list_include_keeps_count(self) -> None:
+        assert fields_include({"id"}, list_field="books") == {"books": {"__all__": {"id"}}, "books_count": True}
+        assert fields_include(None, list_field="books") is None
+
+
+@pytest.mark.asyncio
+class TestSparseFieldsets:
+    async def test_book_list_returns_only_requested_fields(
+        self, app: FastAPI, authorized_client: AsyncClient, db: Database
+    ) -> None:
+        await BooksRepository(db).create_book(
+            new_book=BookCreate(title="sparse book", description="long description", authors=["Sparse Author"])
+        )
+
+        res = await authorized_client.get(
+            app.url_path_for("books:list-books"), params={"intitle": "sparse book", "fields": "title,authors"}
+        )
+        assert res.status_code == status.HTTP_200_OK
+        books = res.json()["books"]
+        assert books and all(set(book) == {"id", "title", "authors"} for book in books)
+        assert books[0]["authors"] == ["Sparse Author"]
+
+        res = await authorized_client.get(
+            app.url_path_for("books:list-books"), params={"intitle": "sparse book", "fields": "title"}
+        )
+        assert all(set(book) == {"id", "title"} for book in res.json()["books"])
+
+    async def test_book_fields_change_the_etag(
+        self, app: FastAPI, authorized_client: AsyncClient, db: Database
+    ) -> None:
+        book = await BooksRepository(db).create_book(new_book=BookCreate(title="sparse etag book"))
+        path = app.url_path_for("books:get-book-by-id", book_id=book.id)
+
+        full = await authorized_client.get(path)
+        sparse = await authorized_client.get(path, params={"fields": "title"})
+        assert sparse.json() == {"id": book.id, "title": "sparse etag book"}
+        assert sparse.headers["etag"] != full.headers["etag"]
+
+    async def test_library_without_address_field_skips_address(
+        self, app: FastAPI, authorized_client: AsyncClient, db: Database
+    ) -> None:
+        library = await LibrariesRepository(db).create_library(new_library=LibraryCreate(name="sparse library"))
+
+        res = await authorized_client.get(
+            app.url_path_for("libraries:get-library-by-id", library_id=library.id), params={"fields": "name"}
+        )
+        assert res.status_code == status.HTTP_200_OK
+        assert res.json() == {"id": library.id, "name": "sparse library"}
+
+    async def test_unknown_fields_are_a_bad_request(self, app: FastAPI, authorized_client: AsyncClient) -> None:
+        res = await authorized_client.get(app.url_path_for("books:list-books"), params={"fields": "title,secret"})
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,175 @@
+import asyncio
+import logging
+from typing import Dict, List, Mapping
+
+import pytest
+
+from databases import Database
+from httpx import AsyncClient
+
+from app.db.notifications import DatabaseNotifications
+from app.db.repositories.lendings import LendingsRepository
+from app.db.repositories.reservations import ReservationsRepository
+from app.models.user import UserInDB
+
+
+pytestmark = pytest.mark.asyncio
+
+SEED_QUERIES = (
+    "INSERT INTO libraries (name) VALUES ('matching library');",
+    "INSERT INTO books (title) VALUES ('matching book');",
+)
+
+INSERT_BOOK_ITEM_QUERY = """
+    INSERT INTO book_items (barcode, condition, status, book_id, library_id)
+    SELECT :barcode, 'good', :status, B.id, L.id
+    FROM books B, libraries L
+    WHERE B.title = 'matching book' AND L.name = 'matching library'
+    RETURNING id;
+"""
+
+INSERT_RESERVATION_QUERY = """
+    INSERT INTO reservations (book_id, library_id, user_id, status)
+    SELECT B.id, L.id, :user_id, 'pending'
+    FROM books B, libraries L
+    WHERE B.title = 'matching book' AND L.name = 'matching library'
+    RETURNING id;
+"""
+
+CLEANUP_QUERIES = (
+    "DELETE FROM lendings WHERE book_item_id IN (SELECT id FROM book_items WHERE barcode LIKE 'matching-%');",
+    "DELETE FROM reservations WHERE book_id = (SELECT id FROM books WHERE title = 'matching book');",
+    "DELETE FROM book_items WHERE barcode LIKE 'matching-%';",
+    "DELETE FROM books WHERE title = 'matching book';",
+    "DELETE FROM libraries WHERE name = 'matching library';",
+)
+
+
+@pytest.fixture
+async def matching_data(client: AsyncClient, db: Database) -> Dict:
+    for query in SEED_QUERIES:
+        await db.execute(query=query)
+
+    yield {"due_date": await db.fetch_val("SELECT current_date + reservation_due_day FROM system_config;")}
+
+    for query in CLEANUP_QUERIES:
+        await db.execute(query=query)
+
+
+async def insert_book_item(db: Database, *, barcode: str, status: str = "available", notify: bool = True) -> int:
+    if notify:
+        return await db.fetch_val(query=INSERT_BOOK_ITEM_QUERY, values={"barcode": barcode, "status": status})
+    # the trigger is only disabled within the transaction, as if the notification got lost
+    async with db.transaction():
+        await db.execute("ALTER TABLE book_items DISABLE TRIGGER notify_book_item_available_insert;")
+        book_item_id = await db.fetch_val(query=INSERT_BOOK_ITEM_QUERY, values={"barcode": barcode, "status": status})
+        await db.execute("ALTER TABLE book_items ENABLE TRIGGER notify_book_item_available_insert;")
+    return book_item_id
+
+
+async def wait_for_reservation(db: Database, *, reservation_id: int, status: str, timeout: float = 5.0) -> Mapping:
+    # matching runs in the notification handlers, after the notifying transaction commits
+    loop = asyncio.get_event_loop()
+    deadline = loop.time() + timeout
+    while True:
+        record = await db.fetch_one("SELECT * FROM reservations WHERE id = :id;", values={"id": reservation_id})
+        if record["status"] == status or loop.time() > deadline:
+            return record
+        await asyncio.sleep(0.05)
+
+
+async def book_item_statuses(db: Database, *, book_item_ids: List[int]) -> List[str]:
+    records = await db.fetch_all(
+        query="SELECT status FROM book_items WHERE id = ANY(:ids) ORDER BY id;", values={"ids": book_item_ids}
+    )
+    return [record["status"] for record in records]
+
+
+class TestHoldMatchingNotifications:
+    async def test_item_inserted_as_available_is_matched(
+        self, db: Database, matching_data: Dict, test_user: UserInDB
+    ) -> None:
+        reservation_id = await db.fetch_val(query=INSERT_RESERVATION_QUERY, values={"user_id": test_user.id})
+        book_item_id = await insert_book_item(db, barcode="matching-1")
+
+        reservation = await wait_for_reservation(db, reservation_id=reservation_id, status="waiting")
+        assert reservation["status"] == "waiting"
+        assert reservation["book_item_id"] == book_item_id
+        assert reservation["due_date"] == matching_data["due_date"]
+        assert await book_item_statuses(db, book_item_ids=[book_item_id]) == ["reserved"]
+
+    async def test_returned_item_is_matched(
+        self, db: Database, matching_data: Dict, test_user: UserInDB, test_user2: UserInDB
+    ) -> None:
+        book_item_id = await insert_book_item(db, barcode="matching-1", status="loaned")
+        await db.execute(
+            query="INSERT INTO lendings (user_id, book_item_id, due_date) VALUES (:user_id, :id, current_date);",
+            values={"user_id": test_user2.id, "id": book_item_id},
+        )
+        reservation_id = await db.fetch_val(query=INSERT_RESERVATION_QUERY, values={"user_id": test_user.id})
+
+        lendings_repo = LendingsRepository(db)
+        lending_id = await db.fetch_val(
+            query="SELECT id FROM lendings WHERE book_item_id = :book_item_id;", values={"book_item_id": book_item_id}
+        )
+        await lendings_repo.complete_lending(lending=await lendings_repo.get_lending_by_id(id=lending_id))
+
+        reservation = await wait_for_reservation(db, reservation_id=reservation_id, status="waiting")
+        assert reservation["status"] == "waiting"
+        assert reservation["book_item_id"] == book_item_id
+        assert reservation["due_date"] == matching_data["due_date"]
+
+    async def test_failing_callbacks_are_logged(self, caplog: pytest.LogCaptureFixture) -> None:
+        async def fail(payload: str) -> None:
+            raise RuntimeError(f"cannot handle {payload}")
+
+        notifications = DatabaseNotifications("postgresql://unused")
+        with caplog.at_level(logging.ERROR, logger="app.db.notifications"):
+            notifications._run_callback(fail, "1")
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+
+        assert caplog.records[-1].exc_info[1].args == ("cannot handle 1",)
+
+
+class TestHoldMatchingSweep:
+    async def test_sweep_matches_items_whose_notifications_were_missed(
+        self, db: Database, matching_data: Dict, test_user: UserInDB
+    ) -> None:
+        reservation_id = await db.fetch_val(query=INSERT_RESERVATION_QUERY, values={"user_id": test_user.id})
+        book_item_id = await insert_book_item(db, barcode="matching-1", notify=False)
+
+        assert await ReservationsRepository(db).match_available_book_items() >= 1
+
+        reservation = await db.fetch_one("SELECT * FROM reservations WHERE id = :id;", values={"id": reservation_id})
+        assert reservation["status"] == "waiting"
+        assert reservation["book_item_id"] == book_item_id
+        assert reservation["due_date"] == matching_data["due_date"]
+
+    async def test_sweep_goes_on_past_failing_items(
+        self,
+        db: Database,
+        matching_data: Dict,
+        test_user: UserInDB,
+        test_user2: UserInDB,
+        monkeypatch: pytest.MonkeyPatch,
+        caplog: pytest.LogCaptureFixture,
+    ) -> None:
+        for user in (test_user, test_user2):
+            await db.execute(query=INSERT_RESERVATION_QUERY, values={"user_id": user.id})
+        book_item_ids = [await insert_book_item(db, barcode=f"matching-{i}", notify=False) for i in range(1, 3)]
+
+        reservations_repo = ReservationsRepository(db)
+        match_book_item = reservations_repo.match_book_item
+
+        async def match_book_item_failing_first(*, book_item_id: int):
+            if book_item_id == book_item_ids[0]:
+                raise RuntimeError("matching failed")
+            return await match_book_item(book_item_id=book_item_id)
+
+        monkeypatch.setattr(reservations_repo, "match_book_item", match_book_item_failing_first)
+        with caplog.at_level(logging.ERROR, logger="app.db.repositories.reservations"):
+            assert await reservations_repo.match_available_book_items() >= 1
+
+        assert f"Failed to match book item {book_item_ids[0]}" in caplog.text
+        assert await book_item_statuses(db, book_item_ids=book_item_ids) == ["available", "reserved"]
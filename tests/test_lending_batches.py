@@ -0,0 +1,127 @@
+from typing import Callable, Dict
+
+import pytest
+
+from databases import Database
+from fastapi import FastAPI, status
+from httpx import AsyncClient
+
+from app.models.lending import LendingBatchItemStatus, LendingBatchResultPublic
+from app.models.user import UserInDB
+
+
+pytestmark = pytest.mark.asyncio
+
+OVERDUE_DAYS = 3
+
+
+@pytest.fixture
+async def batch_data(seed_circulation: Callable, test_user: UserInDB) -> Dict:
+    return await seed_circulation(prefix="batch", user_id=test_user.id, book_item_statuses=["available"] * 4 + ["lost"])
+
+
+@pytest.fixture
+def librarian_client(create_authorized_client: Callable, test_librarian: UserInDB) -> AsyncClient:
+    return create_authorized_client(user=test_librarian)
+
+
+def batch_statuses(result: LendingBatchResultPublic) -> Dict[str, LendingBatchItemStatus]:
+    return {item.barcode: item.status for item in result.results}
+
+
+class TestCreateLendingsBatch:
+    async def test_each_barcode_gets_its_own_status(
+        self, app: FastAPI, librarian_client: AsyncClient, batch_data: Dict, test_user: UserInDB
+    ) -> None:
+        barcodes = ["batch-1", "batch-x", "batch-5", "batch-2"]
+        res = await librarian_client.post(
+            app.url_path_for("lendings:create-lendings-batch"),
+            json={"lendings_batch": {"user_id": test_user.id, "barcodes": barcodes}},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        result = LendingBatchResultPublic(**res.json())
+        assert [item.barcode for item in result.results] == barcodes
+        assert batch_statuses(result) == {
+            "batch-1": LendingBatchItemStatus.created,
+            "batch-x": LendingBatchItemStatus.not_found,
+            "batch-5": LendingBatchItemStatus.unavailable,
+            "batch-2": LendingBatchItemStatus.created,
+        }
+        assert all(item.lending.user_id == test_user.id for item in result.results if item.lending)
+
+    async def test_exceeding_the_lending_limit_fails_the_whole_batch(
+        self, app: FastAPI, db: Database, librarian_client: AsyncClient, batch_data: Dict, test_user: UserInDB
+    ) -> None:
+        max_active_lendings = await db.fetch_val("SELECT max_active_lendings FROM system_config;")
+        active_lendings = await db.fetch_val(
+            "SELECT COALESCE((SELECT active_lendings FROM user_circulation_counters WHERE user_id = :user_id), 0);",
+            {"user_id": test_user.id},
+        )
+        await db.execute(
+            "UPDATE system_config SET max_active_lendings = :max_active_lendings;",
+            {"max_active_lendings": active_lendings + 1},
+        )
+        try:
+            res = await librarian_client.post(
+                app.url_path_for("lendings:create-lendings-batch"),
+                json={"lendings_batch": {"user_id": test_user.id, "barcodes": ["batch-1", "batch-2"]}},
+            )
+        finally:
+            await db.execute(
+                "UPDATE system_config SET max_active_lendings = :max_active_lendings;",
+                {"max_active_lendings": max_active_lendings},
+            )
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+        lendings_count = await db.fetch_val(
+            "SELECT count(*) FROM lendings LE JOIN book_items BI ON BI.id = LE.book_item_id "
+            "WHERE BI.barcode LIKE 'batch-%';"
+        )
+        assert lendings_count == 0
+
+    async def test_user_is_found_by_library_card_number(
+        self, app: FastAPI, librarian_client: AsyncClient, batch_data: Dict, test_librarian: UserInDB
+    ) -> None:
+        res = await librarian_client.post(
+            app.url_path_for("lendings:create-lendings-batch"),
+            json={
+                "lendings_batch": {"library_card_number": test_librarian.library_card_number, "barcodes": ["batch-1"]}
+            },
+        )
+        assert res.status_code == status.HTTP_200_OK
+        [item] = LendingBatchResultPublic(**res.json()).results
+        assert item.status == LendingBatchItemStatus.created
+        assert item.lending.user_id == test_librarian.id
+
+    async def test_unknown_library_card_number_is_not_found(
+        self, app: FastAPI, librarian_client: AsyncClient, batch_data: Dict
+    ) -> None:
+        res = await librarian_client.post(
+            app.url_path_for("lendings:create-lendings-batch"),
+            json={"lendings_batch": {"library_card_number": "0000000", "barcodes": ["batch-1"]}},
+        )
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+        assert res.json()["detail"] == "No user found with that library card number."
+
+
+class TestCompleteLendingsBatch:
+    async def test_completed_lendings_get_their_fee(
+        self, app: FastAPI, librarian_client: AsyncClient, seed_circulation: Callable, test_user: UserInDB
+    ) -> None:
+        circulation = await seed_circulation(
+            prefix="batch", user_id=test_user.id, lending_due_in_days=(-OVERDUE_DAYS,), book_items_count=2
+        )
+
+        res = await librarian_client.put(
+            app.url_path_for("lendings:complete-lendings-batch"),
+            json={"lendings_batch": {"user_id": test_user.id, "barcodes": ["batch-1", "batch-2"]}},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        result = LendingBatchResultPublic(**res.json())
+        assert batch_statuses(result) == {
+            "batch-1": LendingBatchItemStatus.completed,
+            "batch-2": LendingBatchItemStatus.not_loaned,
+        }
+        lending = result.results[0].lending
+        assert lending.return_date is not None
+        assert lending.fee == OVERDUE_DAYS * circulation["lending_daily_fee"]
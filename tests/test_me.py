@@ -0,0 +1,50 @@
+from decimal import Decimal
+from typing import Callable, Dict
+
+import pytest
+
+from fastapi import FastAPI, status
+from httpx import AsyncClient
+
+from app.models.patron_summary import PatronSummaryPublic
+from app.models.user import UserInDB
+
+
+pytestmark = pytest.mark.asyncio
+
+OVERDUE_DAYS = 3
+
+
+@pytest.fixture
+async def circulation_data(seed_circulation: Callable, test_user: UserInDB) -> Dict:
+    return await seed_circulation(
+        prefix="summary", user_id=test_user.id, lending_due_in_days=(-OVERDUE_DAYS,), book_items_count=2, reserve=True
+    )
+
+
+class TestMeRoutes:
+    async def test_routes_exist(self, app: FastAPI, client: AsyncClient) -> None:
+        res = await client.get(app.url_path_for("me:get-summary"))
+        assert res.status_code != status.HTTP_404_NOT_FOUND
+
+
+class TestPatronSummary:
+    async def test_user_cannot_get_summary_if_not_authenticated(self, app: FastAPI, client: AsyncClient) -> None:
+        res = await client.get(app.url_path_for("me:get-summary"))
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+    async def test_summary_contains_active_circulation_and_balance(
+        self, app: FastAPI, authorized_client: AsyncClient, test_user: UserInDB, circulation_data: Dict
+    ) -> None:
+        res = await authorized_client.get(app.url_path_for("me:get-summary"))
+        assert res.status_code == status.HTTP_200_OK
+        assert res.headers["content-type"] == "application/json"
+
+        summary = PatronSummaryPublic(**res.json())
+        assert summary.user.id == test_user.id
+        assert [reservation.book_title for reservation in summary.reservations] == ["summary book"]
+        assert [lending.book_title for lending in summary.lendings] == ["summary book"]
+
+        expected_fee = OVERDUE_DAYS * Decimal(circulation_data["lending_daily_fee"])
+        assert summary.lendings[0].fee == expected_fee
+        assert summary.outstanding_balance == expected_fee
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from fastapi import FastAPI, status
+from httpx import AsyncClient
+from prometheus_client import REGISTRY
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from app.api.middleware.metrics import UNMATCHED_ROUTE, MetricsMiddleware
+from app.core.metrics import EventLoopLagMonitor, count_cache_lookup
+
+
+pytestmark = pytest.mark.asyncio
+
+
+async def thing(request) -> Response:
+    return JSONResponse({"id": 1})
+
+
+@pytest.fixture
+async def metrics_client() -> AsyncClient:
+    app = Starlette(routes=[Route("/things/{thing_id}", thing, name="things:get-thing-by-id")])
+    app.add_middleware(MetricsMiddleware)
+    async with AsyncClient(app=app, base_url="http://testserver") as client:
+        yield client
+
+
+def requests_count(route: str, status_code: int) -> float:
+    labels = {"method": "GET", "route": route, "status": str(status_code)}
+    return REGISTRY.get_sample_value("aslib_http_requests_total", labels) or 0.0
+
+
+class TestMetricsMiddleware:
+    async def test_requests_are_labelled_by_route_name(self, metrics_client: AsyncClient) -> None:
+        before = requests_count("things:get-thing-by-id", status.HTTP_200_OK)
+        for thing_id in (1, 2):
+            await metrics_client.get(f"/things/{thing_id}")
+        assert requests_count("things:get-thing-by-id", status.HTTP_200_OK) == before + 2
+
+    async def test_unknown_paths_share_one_label(self, metrics_client: AsyncClient) -> None:
+        before = requests_count(UNMATCHED_ROUTE, status.HTTP_404_NOT_FOUND)
+        await metrics_client.get("/nothing/here")
+        assert requests_count(UNMATCHED_ROUTE, status.HTTP_404_NOT_FOUND) == before + 1
+
+
+class TestMetricsCollection:
+    async def test_event_loop_lag_is_sampled(self) -> None:
+        before = REGISTRY.get_sample_value("aslib_event_loop_lag_seconds_count") or 0.0
+        monitor = EventLoopLagMonitor(0.01)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+        assert REGISTRY.get_sample_value("aslib_event_loop_lag_seconds_count") > before
+
+    async def test_metrics_are_exposed(self, app: FastAPI, client: AsyncClient) -> None:
+        count_cache_lookup("response", hit=True)
+        res = await client.get(app.url_path_for("metrics:get-metrics"))
+        assert res.status_code == status.HTTP_200_OK
+        assert res.headers["content-type"].startswith("text/plain; version=0.0.4")
+        for name in ("aslib_http_requests_total", "aslib_db_query_duration_seconds", "aslib_cache_requests_total"):
+            assert name in res.text
@@ -0,0 +1,69 @@
+import pytest
+
+from databases import Database
+from fastapi import FastAPI, HTTPException, status
+from httpx import AsyncClient
+
+from app.api.dependencies.ids import parse_ids
+from app.core.config import MULTI_GET_LIMIT
+from app.db.repositories.base import in_ids_order
+from app.db.repositories.books import BooksRepository
+from app.models.book import BookCreate
+
+
+class TestIdsParsing:
+    def test_ids_keep_first_position_of_duplicates(self) -> None:
+        assert parse_ids("3,1, 3,2,") == [3, 1, 2]
+
+    @pytest.mark.parametrize(
+        "ids", ("a,1", "0", "-1,2", ",", "1,2147483648", ",".join(str(i) for i in range(1, MULTI_GET_LIMIT + 2)))
+    )
+    def test_invalid_or_too_many_ids_are_rejected(self, ids: str) -> None:
+        with pytest.raises(HTTPException) as e:
+            parse_ids(ids)
+        assert e.value.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_records_follow_requested_order(self) -> None:
+        records = [{"id": 1}, {"id": 2}, {"id": 3}]
+        assert in_ids_order(records, [3, 4, 1]) == [{"id": 3}, {"id": 1}]
+
+
+@pytest.mark.asyncio
+class TestMultiGet:
+    async def test_books_come_back_in_requested_order(
+        self, app: FastAPI, authorized_client: AsyncClient, db: Database
+    ) -> None:
+        books_repo = BooksRepository(db)
+        first = await books_repo.create_book(new_book=BookCreate(title="multi get 1", authors=["Multi Author"]))
+        second = await books_repo.create_book(new_book=BookCreate(title="multi get 2"))
+
+        res = await authorized_client.get(
+            app.url_path_for("books:list-books"), params={"ids": f"{second.id},999999,{first.id}"}
+        )
+        assert res.status_code == status.HTTP_200_OK
+        assert [book["id"] for book in res.json()["books"]] == [second.id, first.id]
+        assert res.json()["books_count"] == 2
+        assert res.json()["books"][1]["authors"] == ["Multi Author"]
+
+    async def test_books_filtered_by_author_keep_all_their_authors(
+        self, app: FastAPI, authorized_client: AsyncClient, db: Database
+    ) -> None:
+        await BooksRepository(db).create_book(
+            new_book=BookCreate(title="multi author book", authors=["First Multi Author", "Second Multi Author"])
+        )
+
+        res = await authorized_client.get(
+            app.url_path_for("books:list-books"), params={"intitle": "multi author book", "inauthor": "first multi"}
+        )
+        assert res.status_code == status.HTTP_200_OK
+        [book] = res.json()["books"]
+        assert sorted(book["authors"]) == ["First Multi Author", "Second Multi Author"]
+
+    async def test_book_items_need_ids(self, app: FastAPI, authorized_client: AsyncClient) -> None:
+        res = await authorized_client.get(app.url_path_for("book-items:get-book-items-by-ids"))
+        assert res.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    async def test_batches_over_the_cap_are_rejected(self, app: FastAPI, authorized_client: AsyncClient) -> None:
+        ids = ",".join(str(i) for i in range(1, MULTI_GET_LIMIT + 2))
+        res = await authorized_client.get(app.url_path_for("books:list-books"), params={"ids": ids})
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
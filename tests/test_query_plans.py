@@ -0,0 +1,206 @@
+import json
+from datetime import date
+from typing import Callable, Dict, Iterator, List, Set
+
+import pytest
+
+from databases import Database
+from httpx import AsyncClient
+
+from app.db.repositories.book_items import list_book_items_filtered_query
+from app.db.repositories.books import list_books_filtered_query
+from app.db.repositories.fees import LIST_USER_FEE_BALANCES_QUERY
+from app.db.repositories.lendings import LENDING_QUERY_ONLY_FILTERS, list_lendings_filtered_query
+from app.db.repositories.profiles import GET_PROFILE_BY_USER_ID_QUERY
+from app.db.repositories.racks import LIST_LIBRARY_RACKS_QUERY
+from app.db.repositories.reservations import list_reservations_filtered_query
+
+
+pytestmark = pytest.mark.asyncio
+
+
+SEED_QUERIES = (
+    """
+    INSERT INTO libraries (name)
+    SELECT 'query-plan library ' || g FROM generate_series(1, 100) g;
+    """,
+    """
+    INSERT INTO racks (name, library_id)
+    SELECT 'query-plan rack ' || g, (SELECT min(id) FROM libraries WHERE name LIKE 'query-plan %') + g % 100
+    FROM generate_series(1, 2000) g;
+    """,
+    """
+    INSERT INTO books (title)
+    SELECT 'query-plan book ' || g FROM generate_series(1, 5000) g;
+    """,
+    """
+    INSERT INTO book_items (barcode, condition, status, book_id, library_id, rack_id)
+    SELECT
+        'query-plan-' || g,
+        'good',
+        (ARRAY['available', 'reserved', 'loaned', 'lost', 'written_off'])[g % 5 + 1],
+        (SELECT min(id) FROM books WHERE title LIKE 'query-plan %') + g % 5000,
+        (SELECT min(id) FROM libraries WHERE name LIKE 'query-plan %') + g % 100,
+        (SELECT min(id) FROM racks WHERE name LIKE 'query-plan %') + g % 2000
+    FROM generate_series(1, 20000) g;
+    """,
+    """
+    INSERT INTO users (username, email, password, salt, status, role)
+    SELECT 'query_plan_' || g, 'query_plan_' || g || '@aslib.dev', 'password', 'salt', 'active', 'default'
+    FROM generate_series(1, 5000) g;
+    """,
+    """
+    INSERT INTO profiles (user_id)
+    SELECT id FROM users WHERE username LIKE 'query_plan_%';
+    """,
+    """
+    INSERT INTO reservations (book_id, library_id, user_id, status, due_date)
+    SELECT
+        (SELECT min(id) FROM books WHERE title LIKE 'query-plan %') + g % 5000,
+        (SELECT min(id) FROM libraries WHERE name LIKE 'query-plan %') + g % 100,
+        (SELECT min(id) FROM users WHERE username LIKE 'query_plan_%') + g % 5000,
+        CASE
+            WHEN g % 50 = 0 THEN 'waiting'
+            WHEN g % 50 = 1 THEN 'pending'
+            WHEN g % 2 = 0 THEN 'completed'
+            ELSE 'cancelled'
+        END,
+        current_date + (g % 30 - 15)
+    FROM generate_series(1, 20000) g;
+    """,
+    """
+    INSERT INTO lendings (user_id, book_item_id, due_date, return_date)
+    SELECT
+        (SELECT min(id) FROM users WHERE username LIKE 'query_plan_%') + g % 5000,
+        (SELECT min(id) FROM book_items WHERE barcode LIKE 'query-plan-%') + g % 20000,
+        current_date + (g % 30 - 15),
+        CASE WHEN g % 20 = 0 THEN NULL ELSE current_date - 20 END
+    FROM generate_series(1, 20000) g;
+    """,
+    "ANALYZE;",
+)
+
+
+async def seed_circulation_data(db: Database) -> Dict[str, int]:
+    for query in SEED_QUERIES:
+        await db.execute(query=query)
+
+    return {
+        "library_id": await db.fetch_val("SELECT min(id) FROM libraries WHERE name LIKE 'query-plan %';"),
+        "rack_id": await db.fetch_val("SELECT min(id) FROM racks WHERE name LIKE 'query-plan %';"),
+        "book_id": await db.fetch_val("SELECT min(id) FROM books WHERE title LIKE 'query-plan %';"),
+        "book_item_id": await db.fetch_val("SELECT min(id) FROM book_items WHERE barcode LIKE 'query-plan-%';"),
+        "user_id": await db.fetch_val("SELECT min(id) FROM users WHERE username LIKE 'query_plan_%';"),
+    }
+
+
+def iterate_plan_nodes(plan: Dict) -> Iterator[Dict]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from iterate_plan_nodes(child)
+
+
+async def get_sequential_scans(db: Database, *, query: str, values: Dict) -> Set[str]:
+    plan_record = await db.fetch_val(query=f"EXPLAIN (FORMAT JSON) {query}", values=values)
+    plan = json.loads(plan_record) if isinstance(plan_record, str) else plan_record
+    # scans of partitions are reported under their parent table
+    parent_records = await db.fetch_all(
+        "SELECT inhrelid::regclass::text AS partition, inhparent::regclass::text AS parent FROM pg_inherits;"
+    )
+    parents = {record["partition"]: record["parent"] for record in parent_records}
+    return {
+        parents.get(node.get("Relation Name"), node.get("Relation Name"))
+        for node in iterate_plan_nodes(plan[0]["Plan"])
+        if node.get("Node Type") == "Seq Scan"
+    }
+
+
+async def book_items_by_book(ids: Dict) -> Dict:
+    filters = {"book_id": ids["book_id"], "limit": 20, "offset": 0}
+    return {"query": await list_book_items_filtered_query(filters), "values": filters}
+
+
+async def book_items_by_library_and_status(ids: Dict) -> Dict:
+    filters = {"library_id": ids["library_id"], "status": "available", "limit": 20, "offset": 0}
+    return {"query": await list_book_items_filtered_query(filters), "values": filters}
+
+
+async def book_items_by_rack(ids: Dict) -> Dict:
+    filters = {"rack_id": ids["rack_id"], "limit": 20, "offset": 0}
+    return {"query": await list_book_items_filtered_query(filters), "values": filters}
+
+
+async def books_by_library(ids: Dict) -> Dict:
+    filters = {"library_id": ids["library_id"], "limit": 20, "offset": 0}
+    return {"query": await list_books_filtered_query(filters), "values": filters}
+
+
+async def due_reservations(ids: Dict) -> Dict:
+    filters = {"status": "waiting", "due_by": date.today(), "limit": 20, "offset": 0}
+    return {"query": await list_reservations_filtered_query(filters), "values": filters}
+
+
+async def reservations_by_user(ids: Dict) -> Dict:
+    filters = {"user_id": ids["user_id"], "limit": 20, "offset": 0}
+    return {"query": await list_reservations_filtered_query(filters), "values": filters}
+
+
+async def lendings_by_user(ids: Dict) -> Dict:
+    filters = {"user_id": ids["user_id"], "limit": 20, "offset": 0}
+    return {"query": await list_lendings_filtered_query(filters), "values": {**filters, "lending_daily_fee": 1}}
+
+
+async def lendings_by_book_item(ids: Dict) -> Dict:
+    filters = {"book_item_id": ids["book_item_id"], "limit": 20, "offset": 0}
+    return {"query": await list_lendings_filtered_query(filters), "values": {**filters, "lending_daily_fee": 1}}
+
+
+async def overdue_active_lendings(ids: Dict) -> Dict:
+    filters = {"due_by": date.today(), "returned": False, "limit": 20, "offset": 0}
+    return {
+        "query": await list_lendings_filtered_query(filters),
+        "values": {
+            **{key: value for key, value in filters.items() if key not in LENDING_QUERY_ONLY_FILTERS},
+            "lending_daily_fee": 1,
+        },
+    }
+
+
+async def users_owing_fees(ids: Dict) -> Dict:
+    return {"query": LIST_USER_FEE_BALANCES_QUERY, "values": {"min_balance": 100, "limit": 20, "offset": 0}}
+
+
+async def profile_by_user(ids: Dict) -> Dict:
+    return {"query": GET_PROFILE_BY_USER_ID_QUERY, "values": {"user_id": ids["user_id"]}}
+
+
+async def racks_by_library(ids: Dict) -> Dict:
+    return {"query": LIST_LIBRARY_RACKS_QUERY, "values": {"library_id": ids["library_id"]}}
+
+
+class TestRepositoryQueryPlans:
+    @pytest.mark.parametrize(
+        "build_query, tables",
+        (
+            (book_items_by_book, ["book_items"]),
+            (book_items_by_library_and_status, ["book_items"]),
+            (book_items_by_rack, ["book_items"]),
+            (books_by_library, ["book_items"]),
+            (due_reservations, ["reservations"]),
+            (reservations_by_user, ["reservations"]),
+            (lendings_by_user, ["lendings"]),
+            (lendings_by_book_item, ["lendings"]),
+            (overdue_active_lendings, ["lendings"]),
+            (users_owing_fees, ["user_circulation_counters"]),
+            (profile_by_user, ["profiles"]),
+            (racks_by_library, ["racks"]),
+        ),
+    )
+    async def test_repository_query_does_not_scan_sequentially(
+        self, client: AsyncClient, db: Database, build_query: Callable, tables: List[str]
+    ) -> None:
+        async with db.transaction(force_rollback=True):
+            ids = await seed_circulation_data(db)
+            sequential_scans = await get_sequential_scans(db, **await build_query(ids))
+
+        assert not sequential_scans.intersection(tables), f"Sequential scan on {sequential_scans}"
@@ -0,0 +1,74 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict
+
+import pytest
+
+from databases import Database
+from fastapi import FastAPI, status
+from httpx import AsyncClient
+
+from app.db.repositories.circulation_rollups import CirculationRollupsRepository
+from app.models.circulation import CirculationDailyStatsPublic
+from app.models.user import UserInDB
+
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+async def circulation_data(seed_circulation: Callable, test_user: UserInDB) -> Dict:
+    return await seed_circulation(
+        prefix="reports", user_id=test_user.id, lending_due_in_days=(-1,), book_items_count=2, reserve=True
+    )
+
+
+class TestReportRoutes:
+    async def test_routes_exist(self, app: FastAPI, client: AsyncClient) -> None:
+        res = await client.get(app.url_path_for("reports:get-circulation-report"))
+        assert res.status_code != status.HTTP_404_NOT_FOUND
+
+
+class TestCirculationReport:
+    async def test_report_serves_rolled_up_circulation(
+        self,
+        app: FastAPI,
+        db: Database,
+        create_authorized_client: Callable,
+        test_librarian: UserInDB,
+        circulation_data: Dict,
+    ) -> None:
+        # rollups are kept per UTC day
+        today = datetime.now(timezone.utc).date()
+        refresh = await CirculationRollupsRepository(db).refresh_rollups()
+        assert today in refresh.days
+
+        authorized_client = create_authorized_client(user=test_librarian)
+        res = await authorized_client.get(
+            app.url_path_for("reports:get-circulation-report"),
+            params={
+                "start_date": str(today),
+                "end_date": str(today),
+                "library_id": circulation_data["library_id"],
+            },
+        )
+        assert res.status_code == status.HTTP_200_OK
+        stats = [CirculationDailyStatsPublic(**day_stats) for day_stats in res.json()]
+        assert len(stats) == 1
+        assert stats[0].loans == 1
+        assert stats[0].holds_placed == 1
+        assert stats[0].overdue == 1
+        assert stats[0].returns == 0
+
+    async def test_report_rejects_invalid_date_ranges(
+        self, app: FastAPI, create_authorized_client: Callable, test_librarian: UserInDB
+    ) -> None:
+        authorized_client = create_authorized_client(user=test_librarian)
+        for start_date, end_date in (
+            (date.today(), date.today() - timedelta(days=1)),
+            (date.today() - timedelta(days=400), date.today()),
+        ):
+            res = await authorized_client.get(
+                app.url_path_for("reports:get-circulation-report"),
+                params={"start_date": str(start_date), "end_date": str(end_date)},
+            )
+            assert res.status_code == status.HTTP_400_BAD_REQUEST
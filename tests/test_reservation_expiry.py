@@ -0,0 +1,133 @@
+from datetime import date, datetime
+from typing import Dict
+
+import pytest
+
+from databases import Database
+from httpx import AsyncClient
+
+from app.core.reservation_expiry import ReservationExpiryTimer
+from app.db.repositories.reservations import ReservationsRepository
+from app.models.user import UserInDB
+
+
+DUE_RESERVATIONS_COUNT = 5
+
+SEED_QUERIES = (
+    "INSERT INTO libraries (name) VALUES ('expiry library');",
+    "INSERT INTO books (title) VALUES ('expiry book'), ('expiry pending book');",
+    f"""
+    INSERT INTO book_items (barcode, condition, status, book_id, library_id)
+    SELECT 'expiry-' || g, 'good', 'reserved', B.id, L.id
+    FROM generate_series(1, {DUE_RESERVATIONS_COUNT + 1}) g, books B, libraries L
+    WHERE B.title = 'expiry book' AND L.name = 'expiry library';
+    """,
+    # the last one is not due yet, and spreading them over two users keeps both under the reservation limit
+    f"""
+    INSERT INTO reservations (book_id, library_id, user_id, status, book_item_id, due_date, created_at)
+    SELECT
+        BI.book_id,
+        BI.library_id,
+        CASE WHEN BI.barcode IN ('expiry-1', 'expiry-2', 'expiry-3') THEN CAST(:user_id AS integer)
+            ELSE CAST(:user2_id AS integer) END,
+        'waiting',
+        BI.id,
+        CASE WHEN BI.barcode = 'expiry-{DUE_RESERVATIONS_COUNT + 1}' THEN current_date + 7 ELSE current_date - 1 END,
+        now() - INTERVAL '1 day'
+    FROM book_items BI
+    WHERE BI.barcode LIKE 'expiry-%';
+    """,
+    """
+    INSERT INTO reservations (book_id, library_id, user_id, status)
+    SELECT B.id, L.id, CAST(:user_id AS integer), 'pending'
+    FROM books B, libraries L
+    WHERE B.title = 'expiry pending book' AND L.name = 'expiry library';
+    """,
+)
+
+CLEANUP_QUERIES = (
+    "DELETE FROM reservations WHERE library_id = (SELECT id FROM libraries WHERE name = 'expiry library');",
+    "DELETE FROM book_items WHERE barcode LIKE 'expiry-%';",
+    "DELETE FROM books WHERE title LIKE 'expiry %';",
+    "DELETE FROM libraries WHERE name = 'expiry library';",
+)
+
+
+@pytest.fixture
+async def due_reservations(client: AsyncClient, db: Database, test_user: UserInDB, test_user2: UserInDB) -> None:
+    user_ids = {"user_id": test_user.id, "user2_id": test_user2.id}
+    for query in SEED_QUERIES:
+        values = {name: user_id for name, user_id in user_ids.items() if f":{name}" in query}
+        await db.execute(query=query, values=values or None)
+
+    yield
+
+    for query in CLEANUP_QUERIES:
+        await db.execute(query=query)
+
+
+class TestReservationExpiryTimer:
+    def test_reservation_expires_once_its_due_date_has_passed(self) -> None:
+        timer = ReservationExpiryTimer(db=None)
+        timer.handle_notification("1:2021-06-10")
+
+        assert timer.pop_due(datetime(2021, 6, 10, 23, 59)) == []
+        assert timer.seconds_until_next(datetime(2021, 6, 10, 23, 59)) == 60
+        assert timer.pop_due(datetime(2021, 6, 11, 0, 0)) == [1]
+        assert len(timer) == 0
+
+    def test_notifications_move_and_remove_deadlines(self) -> None:
+        timer = ReservationExpiryTimer(db=None)
+        timer.schedule(1, date(2021, 6, 10))
+        timer.schedule(2, date(2021, 6, 12))
+        timer.schedule(3, date(2021, 6, 9))
+
+        timer.handle_notification("2:2021-06-09")
+        timer.handle_notification("3:")
+
+        assert timer.pop_due(datetime(2021, 6, 11)) == [2, 1]
+        assert timer.seconds_until_next(datetime(2021, 6, 11)) is None
+
+    def test_skipped_reservations_are_retried_unless_moved_or_removed(self) -> None:
+        timer = ReservationExpiryTimer(db=None)
+        for reservation_id in (1, 2, 3):
+            timer.schedule(reservation_id, date(2021, 6, 10))
+        assert timer.pop_due(datetime(2021, 6, 11)) == [1, 2, 3]
+
+        # while the expiry query runs, 2 leaves waiting and 3 gets a new due date
+        timer.handle_notification("2:")
+        timer.handle_notification("3:2021-06-20")
+        timer.requeue([1, 2, 3], datetime(2021, 6, 11, 0, 1))
+
+        assert timer.pop_due(datetime(2021, 6, 11, 0, 1)) == [1]
+        assert len(timer) == 1
+
+
+@pytest.mark.asyncio
+class TestCancelDueReservations:
+    async def test_due_reservations_are_cancelled_in_batches(self, db: Database, due_reservations: None) -> None:
+        expired = await ReservationsRepository(db).cancel_due_reservations(batch_size=2)
+
+        assert expired.reservations_count >= DUE_RESERVATIONS_COUNT
+        assert expired.book_items_count >= DUE_RESERVATIONS_COUNT
+        records = await db.fetch_all(
+            """
+            SELECT BI.barcode, BI.status AS book_item_status, R.status AS reservation_status
+            FROM reservations R
+            JOIN book_items BI ON BI.id = R.book_item_id
+            WHERE BI.barcode LIKE 'expiry-%'
+            ORDER BY BI.id;
+            """
+        )
+        statuses = {record["barcode"]: (record["reservation_status"], record["book_item_status"]) for record in records}
+        assert statuses == {
+            **{f"expiry-{i}": ("cancelled", "available") for i in range(1, DUE_RESERVATIONS_COUNT + 1)},
+            f"expiry-{DUE_RESERVATIONS_COUNT + 1}": ("waiting", "reserved"),
+        }
+        pending_status = await db.fetch_val(
+            """
+            SELECT R.status FROM reservations R JOIN books B ON B.id = R.book_id
+            WHERE B.title = 'expiry pending book';
+            """
+        )
+        assert pending_status == "pending"
@@ -0,0 +1,32 @@
+import json
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+
+from app.api.responses import model_response
+from app.models.lending import ListOfLendingsPublic
+
+
+class TestModelResponse:
+    def test_model_response_matches_default_encoding(self) -> None:
+        now = datetime.now(timezone.utc)
+        lendings = ListOfLendingsPublic(
+            lendings=[
+                {
+                    "id": 1,
+                    "user_id": 1,
+                    "book_item_id": 1,
+                    "due_date": date(2021, 6, 1),
+                    "fee": Decimal("12.50"),
+                    "created_at": now,
+                    "updated_at": now,
+                }
+            ],
+            lendings_count=1,
+        )
+
+        response = model_response(lendings)
+
+        assert response.media_type == "application/json"
+        assert json.loads(response.body) == jsonable_encoder(lendings)
@@ -0,0 +1,39 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from app.core.scheduler import CronSchedule
+
+# a monday
+NOW = datetime(2021, 6, 14, 12, 41, 30, tzinfo=timezone.utc)
+
+
+class TestCronSchedule:
+    @pytest.mark.parametrize(
+        "expression, expected",
+        (
+            ("* * * * *", datetime(2021, 6, 14, 12, 42, tzinfo=timezone.utc)),
+            ("*/15 * * * *", datetime(2021, 6, 14, 12, 45, tzinfo=timezone.utc)),
+            ("5 0 * * *", datetime(2021, 6, 15, 0, 5, tzinfo=timezone.utc)),
+            ("0 9 * * 0", datetime(2021, 6, 20, 9, 0, tzinfo=timezone.utc)),
+            ("0 9 * * 7", datetime(2021, 6, 20, 9, 0, tzinfo=timezone.utc)),
+            ("0 9 1 * 1", datetime(2021, 6, 21, 9, 0, tzinfo=timezone.utc)),
+            ("0 0 1,15 * *", datetime(2021, 6, 15, 0, 0, tzinfo=timezone.utc)),
+            ("30 2 29 2 *", datetime(2024, 2, 29, 2, 30, tzinfo=timezone.utc)),
+            ("0 0 * 2-3 1-5", datetime(2022, 2, 1, 0, 0, tzinfo=timezone.utc)),
+        ),
+    )
+    def test_next_after_returns_next_matching_minute(self, expression: str, expected: datetime) -> None:
+        assert CronSchedule(expression).next_after(NOW) == expected
+
+    @pytest.mark.parametrize(
+        "expression",
+        ("* * * *", "60 * * * *", "* 24 * * *", "*/0 * * * *", "5-1 * * * *", "* * * * 8", "a * * * *"),
+    )
+    def test_invalid_expression_raises_error(self, expression: str) -> None:
+        with pytest.raises(ValueError):
+            CronSchedule(expression)
+
+    def test_impossible_date_raises_error(self) -> None:
+        with pytest.raises(ValueError):
+            CronSchedule("0 0 31 2 *").next_after(NOW)
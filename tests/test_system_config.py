@@ -0,0 +1,68 @@
+import asyncio
+from decimal import Decimal
+
+import pytest
+
+from databases import Database
+from httpx import AsyncClient
+
+from app.db.repositories.system_config import SystemConfigCache, SystemConfigRepository, system_config_cache
+from app.models.system_config import SystemConfigInDB
+
+
+def make_config(reservation_due_day: int) -> SystemConfigInDB:
+    return SystemConfigInDB(
+        id=1,
+        reservation_due_day=reservation_due_day,
+        lending_due_day=14,
+        lending_daily_fee=Decimal("0.5"),
+        max_active_lendings=10,
+        max_active_reservations=5,
+    )
+
+
+class TestSystemConfigCache:
+    def test_config_read_before_an_invalidation_is_not_stored(self) -> None:
+        cache = SystemConfigCache()
+        generation = cache.generation
+        cache.invalidate()
+
+        cache.store(make_config(3), generation)
+        assert cache.config is None
+
+        cache.store(make_config(4), cache.generation)
+        assert cache.config.reservation_due_day == 4
+
+    def test_invalidation_drops_the_stored_config(self) -> None:
+        cache = SystemConfigCache()
+        cache.store(make_config(3), cache.generation)
+
+        cache.invalidate()
+        assert cache.config is None
+
+
+@pytest.mark.asyncio
+class TestSharedSystemConfig:
+    async def test_config_is_reloaded_after_an_update_elsewhere(self, client: AsyncClient, db: Database) -> None:
+        system_config_repo = SystemConfigRepository(db)
+        reservation_due_day = (await system_config_repo.get_config()).reservation_due_day
+        assert system_config_cache.config is not None
+
+        # as another worker would, without touching this process's cache
+        await db.execute(
+            "UPDATE system_config SET reservation_due_day = :reservation_due_day;",
+            {"reservation_due_day": reservation_due_day + 1},
+        )
+        try:
+            # the notification arrives on the listening connection after the commit
+            for _ in range(50):
+                if system_config_cache.config is None:
+                    break
+                await asyncio.sleep(0.1)
+
+            assert (await system_config_repo.get_config()).reservation_due_day == reservation_due_day + 1
+        finally:
+            await db.execute(
+                "UPDATE system_config SET reservation_due_day = :reservation_due_day;",
+                {"reservation_due_day": reservation_due_day},
+            )
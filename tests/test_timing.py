@@ -0,0 +1,87 @@
+import asyncio
+import logging
+from typing import Dict
+
+import pytest
+
+from fastapi import FastAPI, status
+from httpx import AsyncClient
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+
+from app.api.middleware.timing import ServerTimingMiddleware
+from app.api.responses import ORJSONResponse
+from app.core.timing import RequestTimings, request_timings, timed
+
+
+async def timed_parts(request) -> Response:
+    with timed("db"):
+        await asyncio.sleep(0.01)
+    with timed("db"):
+        pass
+    with timed("hash"):
+        pass
+    return ORJSONResponse({"id": 1})
+
+
+@pytest.fixture
+async def timing_client() -> AsyncClient:
+    app = Starlette(routes=[Route("/timed", timed_parts)])
+    app.add_middleware(ServerTimingMiddleware)
+    async with AsyncClient(app=app, base_url="http://testserver") as client:
+        yield client
+
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    metrics = {}
+    for metric in header.split(","):
+        name, _, duration = metric.strip().partition(";dur=")
+        metrics[name] = float(duration)
+    return metrics
+
+
+class TestTimed:
+    def test_nothing_is_recorded_outside_of_requests(self) -> None:
+        with timed("db"):
+            pass
+        assert request_timings.get() is None
+
+    def test_durations_and_counts_add_up(self) -> None:
+        timings = RequestTimings()
+        token = request_timings.set(timings)
+        try:
+            with timed("db"):
+                pass
+            with timed("db", count=0):
+                pass
+        finally:
+            request_timings.reset(token)
+        assert timings.counts["db"] == 1
+        assert timings.durations["db"] >= 0
+
+
+@pytest.mark.asyncio
+class TestServerTimingMiddleware:
+    async def test_parts_are_reported_in_header(self, timing_client: AsyncClient) -> None:
+        res = await timing_client.get("/timed")
+        assert res.status_code == status.HTTP_200_OK
+        metrics = parse_server_timing(res.headers["server-timing"])
+        assert set(metrics) == {"db", "pool", "hash", "serialize", "total"}
+        assert metrics["db"] >= 10
+        assert metrics["total"] >= metrics["db"]
+
+    async def test_requests_are_logged(self, timing_client: AsyncClient, caplog: pytest.LogCaptureFixture) -> None:
+        with caplog.at_level(logging.INFO, logger="app.api.middleware.timing"):
+            await timing_client.get("/timed")
+        record = caplog.records[-1]
+        assert record.timing["path"] == "/timed"
+        assert record.timing["status"] == status.HTTP_200_OK
+        assert record.timing["db_queries"] == 2
+
+    async def test_repository_queries_are_timed(self, app: FastAPI, authorized_client: AsyncClient) -> None:
+        res = await authorized_client.get(app.url_path_for("books:list-books"))
+        assert res.status_code == status.HTTP_200_OK
+        metrics = parse_server_timing(res.headers["server-timing"])
+        assert metrics["db"] > 0
+        assert metrics["total"] >= metrics["db"]
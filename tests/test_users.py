@@ -23,6 +23,7 @@ from starlette.status import (
 from app.core.config import SECRET_KEY, JWT_ALGORITHM, JWT_AUDIENCE, ACCESS_TOKEN_EXPIRE_MINUTES
 
 from app.db.repositories.users import UsersRepository
+from app.models.circulation import UserCirculationPublic
 from app.models.user import UserInDB, UserPublic
 from app.services import jwt as jwt_service
 
@@ -197,6 +198,20 @@ class TestUserMe:
         assert user.username == test_user.username
         assert user.id == test_user.id
 
+    async def test_authenticated_user_can_retrieve_own_circulation(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        test_user: UserInDB,
+    ) -> None:
+        res = await authorized_client.get(app.url_path_for("users:get-current-user-circulation"))
+        assert res.status_code == HTTP_200_OK
+        circulation = UserCirculationPublic(**res.json())
+        assert circulation.active_lendings == 0
+        assert circulation.active_reservations == 0
+        assert circulation.max_active_lendings > 0
+        assert circulation.max_active_reservations > 0
+
     async def test_user_cannot_access_own_data_if_not_authenticated(
         self,
         app: FastAPI,